@@ -1,2 +1,11 @@
 from .visibility_graph import visibility_graph
-from .visibility_graph_brute import visibility_graph_brute as visibility_graph
+from .visibility_graph_brute import visibility_graph_brute
+from .parallel import visibility_graph_parallel, visibility_graph_brute_parallel
+from .dynamic import DynamicVisibilityGraph
+from .shortest_path import PathFinder
+from .compact import visibility_graph_compact
+from .streaming import visibility_edges, consume, EdgeWriter, read_edges
+from .cache import GraphCache
+from .visibility_polygon import visibility_polygon, visibility_polygons
+from .tiled import visibility_graph_tiled, TiledPathFinder
+from .lazy import LazyVisibilityGraph, LazyPathFinder
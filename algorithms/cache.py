@@ -0,0 +1,149 @@
+""" Content-addressed cache of visibility graphs. """
+import hashlib
+import os
+import struct
+from collections import OrderedDict
+from contextlib import suppress
+from functools import wraps
+from typing import Callable, NamedTuple, Optional, Union
+
+from algorithms.stats import Stats
+from geometry import Collection, CompactGraph
+from geometry.serialization import save_graph, load_graph
+
+# number of graphs kept in memory by default
+CACHE_SIZE = 32
+
+# extension of graph files in cache directory
+GRAPH_SUFFIX = '.graph'
+
+Graph = Union[Collection, CompactGraph]
+
+
+class CacheInfo(NamedTuple):
+    """ Statistics of cache (hits in memory and on disk, misses and current number of graphs in memory). """
+    hits: int
+    disk_hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class GraphCache:
+    """
+    Cache of graphs keyed by content hash of collection (see Collection.content_hash), name of algorithm and its
+    arguments, so repeated runs on scenes with identical content return at once.
+    Recently used graphs are kept in memory (up to maxsize of them) and, if directory is given, all graphs are
+    stored in it in binary format (see geometry.serialization), so they are shared by processes and runs.
+    """
+
+    def __init__(self, maxsize: int = CACHE_SIZE, directory: Optional[str] = None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.graphs: 'OrderedDict[str, Graph]' = OrderedDict()
+        self.hits = self.disk_hits = self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def wrap(self, algorithm: Callable[..., Graph], name: Optional[str] = None, compact: bool = False) \
+            -> Callable[..., Graph]:
+        """
+        Returns version of algorithm that uses cache. Name identifies algorithm in keys (qualified name of function
+        by default, so lambdas have to be named) and compact tells whether algorithm returns compact graphs.
+        Stats argument is not part of keys, hits are counted in stats instead of running algorithm.
+        """
+        name = name or self.name(algorithm)
+
+        @wraps(algorithm)
+        def cached(collection: Collection, stats: Optional[Stats] = None, **kwargs) -> Graph:
+            key = self.key(collection, name, **kwargs)
+            graph = self.get(key, compact)
+            if graph is not None:
+                if stats is not None:
+                    stats.count('cache hits')
+                return graph
+            graph = algorithm(collection, **kwargs) if stats is None else algorithm(collection, stats=stats, **kwargs)
+            self.put(key, graph)
+            return copy(graph)
+        return cached
+
+    @staticmethod
+    def name(algorithm: Callable[..., Graph]) -> str:
+        """ Returns default name of algorithm in keys (its qualified name). """
+        return f'{algorithm.__module__}.{algorithm.__qualname__}'
+
+    @staticmethod
+    def key(collection: Collection, name: str, **kwargs) -> str:
+        """ Returns key of graph created from collection by algorithm with given name and arguments. """
+        arguments = ','.join(f'{k}={v!r}' for k, v in sorted(kwargs.items()))
+        return hashlib.sha256(f'{collection.content_hash}:{name}:{arguments}'.encode()).hexdigest()
+
+    def get(self, key: str, compact: bool = False) -> Optional[Graph]:
+        """ Returns copy of cached graph with given key (loaded as compact graph if compact is set) or None. """
+        if key in self.graphs:
+            self.graphs.move_to_end(key)
+            self.hits += 1
+            return copy(self.graphs[key])
+
+        path = self.path(key)
+        graph = self.load(path, compact) if path is not None and os.path.exists(path) else None
+        if graph is not None:
+            self.disk_hits += 1
+            self.remember(key, graph)
+            return copy(graph)
+
+        self.misses += 1
+        return None
+
+    @staticmethod
+    def load(path: str, compact: bool = False) -> Optional[Graph]:
+        """
+        Loads graph from file in directory, or returns None if file is not valid (corrupted, truncated or written
+        in other format version) or cannot be read. Such files are removed, so that their graphs are built and
+        stored again.
+        """
+        try:
+            graph = load_graph(path, verify=True)
+            return graph if compact else graph.to_collection()
+        except (ValueError, KeyError, TypeError, struct.error, OSError):
+            with suppress(OSError):
+                os.remove(path)
+            return None
+
+    def put(self, key: str, graph: Graph):
+        """ Stores graph with given key in memory and in directory (if cache has one). """
+        self.remember(key, graph)
+        path = self.path(key)
+        if path is not None:
+            # graph is written under temporary name and renamed, so other processes never read partial files
+            temporary = f'{path}.{os.getpid()}.tmp'
+            save_graph(graph, temporary)
+            os.replace(temporary, path)
+
+    def remember(self, key: str, graph: Graph):
+        """ Stores graph in memory and evicts least recently used graphs above size limit. """
+        if self.maxsize <= 0:
+            return
+        self.graphs[key] = graph
+        self.graphs.move_to_end(key)
+        while len(self.graphs) > self.maxsize:
+            self.graphs.popitem(last=False)
+
+    def path(self, key: str) -> Optional[str]:
+        return os.path.join(self.directory, key + GRAPH_SUFFIX) if self.directory is not None else None
+
+    def info(self) -> CacheInfo:
+        """ Returns statistics of cache. """
+        return CacheInfo(self.hits, self.disk_hits, self.misses, self.maxsize, len(self.graphs))
+
+    def clear(self):
+        """ Removes graphs from memory (graphs in directory are kept) and resets statistics. """
+        self.graphs.clear()
+        self.hits = self.disk_hits = self.misses = 0
+
+
+def copy(graph: Graph) -> Graph:
+    """ Returns copy of graph that can be changed without changing cached one (compact graphs are shared). """
+    if isinstance(graph, Collection):
+        return Collection(points=set(graph.points), segments=set(graph.segments), polygons=set(graph.polygons))
+    return graph
@@ -0,0 +1,20 @@
+""" Construction of visibility graphs in compact form (see geometry.CompactGraph). """
+from array import array
+
+import numpy as np
+
+from algorithms.streaming import visibility_edges
+from geometry import Collection, CompactGraph
+
+
+def visibility_graph_compact(collection: Collection, reduced: bool = False, engine: str = 'brute') -> CompactGraph:
+    """
+    Generates visibility graph using given engine ('brute' or 'sweep'), with edges stored directly as pairs of
+    indices of points, so that no segments are created.
+    """
+    edges = array('i')
+    for batch in visibility_edges(collection, reduced, engine):
+        edges.frombytes(batch.tobytes())
+
+    return CompactGraph(list(collection.arrays.points), collection.arrays.coordinates.copy(),
+                        np.frombuffer(edges, dtype=np.int32).reshape(-1, 2))
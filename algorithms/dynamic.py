@@ -0,0 +1,119 @@
+""" Visibility graph that is updated incrementally when its source collection changes. """
+from collections import defaultdict
+from typing import Set, Union, Iterable
+
+import numpy as np
+
+from algorithms.visibility_graph_brute import visibility_graph_brute, obstructed, Sightlines, CHUNK_SIZE
+from geometry import Collection, Point, Segment, Polygon, batch
+
+
+class DynamicVisibilityGraph:
+    """
+    Visibility graph of source collection, that is kept up to date by subscribing to changes of the collection.
+    After each change only edges from changed points and edges crossing changed segments are evaluated.
+    All checks are done by brute force (see algorithms.visibility_graph on choice of engine).
+    """
+
+    def __init__(self, source: Collection):
+        self.source = source
+        self.graph = visibility_graph_brute(source)
+        self.sightlines = Sightlines(source)
+        self.points: Set[Point] = set(self.graph.points)
+        self.segments: Set[Segment] = self.obstacle_segments()
+        source.subscribe(self.on_change)
+
+    def close(self):
+        """ Stops following changes of source collection. """
+        self.source.unsubscribe(self.on_change)
+
+    def obstacle_segments(self) -> Set[Segment]:
+        """ Returns segments of source collection that are obstacles. """
+        return {seg for seg in self.source.all_segments if seg.p1 != seg.p2}
+
+    def on_change(self, element: Union[Point, Segment, Polygon], added: bool):
+        """ Updates graph after element was added to (or removed from) source collection. """
+        points = self.source.all_points
+        segments = self.obstacle_segments()
+
+        # interior angles change at points of changed polygon, so these points are evaluated again
+        polygons = {element} if isinstance(element, Polygon) else set()
+        changed = set(element.points) if polygons else set()
+
+        self.update(
+            added_points=points - self.points,
+            removed_points=self.points - points,
+            added_segments=segments - self.segments,
+            removed_segments=self.segments - segments,
+            changed_points=changed & points,
+            added_polygons=polygons if added else set(),
+            removed_polygons=set() if added else polygons
+        )
+        self.points, self.segments = points, segments
+
+    def update(self, added_points: Set[Point], removed_points: Set[Point], added_segments: Set[Segment],
+               removed_segments: Set[Segment], changed_points: Set[Point], added_polygons: Set[Polygon] = frozenset(),
+               removed_polygons: Set[Polygon] = frozenset()):
+        """ Updates graph (and prepared obstacles, see Sightlines.update) after given changes of source collection. """
+        graph = self.graph
+        sightlines = self.sightlines
+        sightlines.update(added_points, removed_points, added_segments, removed_segments, added_polygons,
+                          removed_polygons)
+        reevaluated = added_points | changed_points
+
+        # remove edges from points that were removed or will be evaluated again
+        dropped = removed_points | changed_points
+        graph.points -= removed_points
+        graph.points |= added_points
+        graph.segments = {s for s in graph.segments if s.p1 not in dropped and s.p2 not in dropped}
+
+        # remove edges blocked by new segments
+        if added_segments:
+            edges = list(graph.segments)
+            blocked = self.blocked(batch.segments_array(edges), batch.segments_array(added_segments))
+            graph.segments.difference_update(e for e, b in zip(edges, blocked) if b)
+
+        # add edges that were blocked by removed segments
+        if removed_segments:
+            graph.segments.update(self.unblocked(
+                [p for p in graph.points if p not in reevaluated], removed_segments, sightlines
+            ))
+
+        # add edges from new points and points that are evaluated again
+        for point in reevaluated:
+            for visible_point in sightlines.visible(point):
+                graph.segments.add(Segment(point, visible_point))
+
+    @staticmethod
+    def blocked(queries: np.ndarray, segments: np.ndarray) -> np.ndarray:
+        """ Returns mask of query segments that are obstructed by any of given segments (checked in chunks). """
+        chunk = max(1, CHUNK_SIZE // max(1, len(segments)))
+        return np.concatenate(
+            [obstructed(queries[i:i + chunk], segments).any(axis=1) for i in range(0, len(queries), chunk)]
+            or [np.zeros(0, dtype=bool)]
+        )
+
+    @staticmethod
+    def unblocked(points: Iterable[Point], removed: Set[Segment], sightlines: Sightlines) -> Iterable[Segment]:
+        """
+        Yields segments between given points, that were obstructed by removed segments and now are visible.
+        Such segments cross removed segments, so only points on opposite sides of each removed segment are paired
+        and only pairs crossing it are checked further, as points seen by brute force (pairs entering polygons
+        are skipped and obstacles are found in cells of spatial index, see Sightlines.visible).
+        """
+        rows = np.array([sightlines.rows[p] for p in points], dtype=np.int64)
+        coordinates = sightlines.coordinates[rows]
+        crossing = defaultdict(set)
+        for seg in removed:
+            a, b = (np.array(tuple(p), dtype=float) for p in seg)
+            side = batch.orient(a, b, coordinates)
+            first, second = sorted((np.flatnonzero(side > 0), np.flatnonzero(side < 0)), key=len)
+            segment = batch.segments_array([seg])
+            for i in first.tolist():
+                queries = np.hstack((np.broadcast_to(coordinates[i], (len(second), 2)), coordinates[second]))
+                crossing[i].update(second[obstructed(queries, segment)[:, 0]].tolist())
+
+        for i, others in crossing.items():
+            p1 = sightlines.points[rows[i]]
+            for p2 in sightlines.visible(p1, candidates=rows[sorted(others)]):
+                yield Segment(p1, p2)
@@ -0,0 +1,78 @@
+""" Visibility graph with edges computed on demand, for path queries that explore small part of it. """
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from algorithms.cache import CacheInfo
+from algorithms.shortest_path import PathFinder, prepare, visible_points
+from algorithms.visibility_graph_brute import polygon_cones
+from geometry import Collection, Point, dist
+
+# number of points whose neighbours are kept in memory by default
+NEIGHBOURS_CACHE_SIZE = 4096
+
+
+class LazyVisibilityGraph:
+    """
+    Visibility graph of obstacles in collection, whose edges are not computed up front. Neighbours of point are
+    found by given engine ('brute' or 'sweep', see shortest_path.prepare) the first time they are needed and recently
+    used ones are kept in memory (up to maxsize points), so that search that explores part of graph checks only
+    sightlines from explored points.
+    """
+
+    def __init__(self, collection: Collection, maxsize: int = NEIGHBOURS_CACHE_SIZE, reduced: bool = False,
+                 engine: str = 'brute'):
+        self.points: List[Point] = list(collection.all_points)
+        self.obstacles, self.sightlines = prepare(collection, engine, self.points)
+        self.maxsize = maxsize
+        self.reduced = reduced
+        self.numbers: Dict[Point, int] = {p: i for i, p in enumerate(self.points)}
+        self.computed: 'OrderedDict[Point, List[Tuple[int, float]]]' = OrderedDict()
+        self.hits = self.misses = 0
+
+    def neighbours(self, point: Point) -> List[Tuple[int, float]]:
+        """ Returns numbers of points visible from given point (that is point of graph) and distances to them. """
+        neighbours = self.computed.get(point)
+        if neighbours is not None:
+            self.hits += 1
+            self.computed.move_to_end(point)
+            return neighbours
+
+        self.misses += 1
+        neighbours = [
+            (self.numbers[p], dist(point, p))
+            for p in visible_points(point, self.obstacles, self.sightlines, self.reduced)
+        ]
+        if self.maxsize > 0:
+            self.computed[point] = neighbours
+            if len(self.computed) > self.maxsize:
+                self.computed.popitem(last=False)
+        return neighbours
+
+    def info(self) -> CacheInfo:
+        """ Returns statistics of computed neighbours (as statistics of cache, with no disk hits). """
+        return CacheInfo(self.hits, 0, self.misses, self.maxsize, len(self.computed))
+
+    def clear(self):
+        """ Forgets computed neighbours and resets statistics. """
+        self.computed.clear()
+        self.hits = self.misses = 0
+
+
+class LazyPathFinder(PathFinder):
+    """
+    Answers shortest path queries like PathFinder, but on lazy visibility graph (see LazyVisibilityGraph),
+    so that A* computes edges only of points it expands. Neighbours computed by one query are reused by next ones.
+    """
+
+    def __init__(self, collection: Collection, reduced: bool = False, maxsize: int = NEIGHBOURS_CACHE_SIZE,
+                 engine: str = 'brute'):
+        self.graph = LazyVisibilityGraph(collection, maxsize, reduced, engine)
+        self.collection = collection
+        self.reduced = reduced
+        self.cones = polygon_cones(collection.polygons)
+        self.obstacles, self.sightlines = self.graph.obstacles, self.graph.sightlines
+        self.points = self.graph.points
+        self.numbers = self.graph.numbers
+
+    def neighbours(self, point: Point) -> List[Tuple[int, float]]:
+        return list(self.graph.neighbours(point))
@@ -0,0 +1,87 @@
+""" Compares sweep visibility graph with brute force one on randomized scenes. """
+import argparse
+import random
+from typing import Set, Tuple, Optional
+
+from algorithms.visibility_graph import visibility_graph, Obstacles, visible_vertices
+from algorithms.visibility_graph_brute import visibility_graph_brute
+from geometry import Collection, Point, Segment, Polygon, pseudo_angle
+
+
+def compare(collection: Collection) -> Tuple[Set[Segment], Set[Segment]]:
+    """
+    Returns edges missing from sweep graph and edges it has in excess, compared to brute force graph.
+    Points visible from each point are compared separately, so that edge found from only one end is missing.
+    """
+    expected = visibility_graph_brute(collection).segments
+    obstacles = Obstacles.from_collection(collection)
+    missing, excess = set(), set()
+    for point in obstacles.points:
+        visible = {Segment(point, p) for p in visible_vertices(point, obstacles)}
+        neighbours = {s for s in expected if point in s}
+        missing |= neighbours - visible
+        excess |= visible - neighbours
+    return missing, excess
+
+
+def visibility_graph_checked(collection: Collection) -> Collection:
+    """ Generates visibility graph using sweep and raises ValueError if it differs from brute force graph. """
+    expected = visibility_graph_brute(collection)
+    actual = visibility_graph(collection)
+    if actual.segments != expected.segments:
+        raise ValueError(
+            f'Sweep graph differs from brute force graph, '
+            f'missing: {expected.segments - actual.segments}, excess: {actual.segments - expected.segments}'
+        )
+    return actual
+
+
+def random_scene(rng: random.Random, size: int = 10, grid: Optional[int] = 10) -> Collection:
+    """
+    Creates random scene with points, segments and star shaped polygons, that may cross each other.
+    If grid is given coordinates are integers from [0, grid], so that collinear points are common.
+    """
+    def coordinate() -> float:
+        return rng.randint(0, grid) if grid else rng.uniform(0, 100)
+
+    def point() -> Point:
+        return Point(coordinate(), coordinate())
+
+    collection = Collection()
+    for _ in range(rng.randint(0, size)):
+        collection.add(point())
+    for _ in range(rng.randint(0, size)):
+        collection.add(Segment(point(), point()))
+    for _ in range(rng.randint(0, size // 3)):
+        center = point()
+        points = []
+        for i in range(rng.randint(3, 6)):
+            p = point()
+            if p != center and p not in points:
+                points.append(p)
+        points.sort(key=lambda p: pseudo_angle(center, p))
+        if len(points) >= 3:
+            collection.add(Polygon(*points))
+    return collection
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scenes', type=int, default=100, help='number of scenes to check')
+    parser.add_argument('--size', type=int, default=10, help='maximal number of elements of each type')
+    parser.add_argument('--grid', type=int, default=10, help='size of integer grid (0 for float coordinates)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of first scene')
+    args = parser.parse_args()
+
+    failed = 0
+    for seed in range(args.seed, args.seed + args.scenes):
+        collection = random_scene(random.Random(seed), args.size, args.grid)
+        missing, excess = compare(collection)
+        if missing or excess:
+            failed += 1
+            print(f'seed {seed}: missing {sorted(missing, key=repr)}, excess {sorted(excess, key=repr)}')
+    print(f'{args.scenes - failed}/{args.scenes} scenes match')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+""" Multi-process construction of visibility graphs. """
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Tuple, Optional, Sequence, TypeVar
+
+from algorithms.visibility_graph import Obstacles, visible_vertices
+from algorithms.visibility_graph_brute import polygon_cones, polygon_tangents, \
+    visible_following, segment_table, tangent_array, cone_array
+from geometry import Collection, Segment, batch
+
+# number of tasks per worker, more tasks balance work better
+TASKS_PER_WORKER = 4
+
+# state of worker process, set once when worker starts (see init_worker)
+state = {}
+
+Item = TypeVar('Item')
+Result = TypeVar('Result')
+
+
+def visibility_graph_parallel(collection: Collection, workers: Optional[int] = None, reduced: bool = False) \
+        -> Collection:
+    """ Generates visibility graph using sweep, with source points sharded across worker processes. """
+    obstacles = Obstacles.from_collection(collection)
+    points = list(obstacles.points)
+    return run(points, sweep_task, dict(obstacles=obstacles, points=points, reduced=reduced), workers)
+
+
+def visibility_graph_brute_parallel(collection: Collection, workers: Optional[int] = None, reduced: bool = False) \
+        -> Collection:
+    """ Generates visibility graph using brute force, with pairs of points sharded across worker processes. """
+    points = collection.arrays.points
+    obstacles = [seg for seg in collection.all_segments if seg.p1 != seg.p2]
+    cones = polygon_cones(collection.polygons)
+    worker_state = dict(
+        points=points, coordinates=collection.arrays.coordinates, segments=batch.segments_array(obstacles),
+        wedges=cone_array(points, cones), table=segment_table(collection, obstacles),
+        angles=tangent_array(points, polygon_tangents(collection, cones)) if reduced else None
+    )
+    return run(points, brute_task, worker_state, workers)
+
+
+def run(points: List, task: Callable[[Sequence[int]], List[Tuple[int, int]]], worker_state: dict,
+        workers: Optional[int]) -> Collection:
+    """
+    Runs task on shards of indices of given points in worker processes (see map_tasks) and merges found edges
+    into graph. Besides given worker state, tasks get index of points by them.
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = workers * TASKS_PER_WORKER
+
+    # strided shards, so that brute force tasks (that check only following points) have equal sizes
+    shards = [range(k, len(points), tasks) for k in range(min(tasks, len(points)))]
+
+    graph = Collection(points=set(points))
+    worker_state = dict(worker_state, index={p: i for i, p in enumerate(points)})
+    for edges in map_tasks(task, shards, worker_state, workers):
+        graph.segments.update(Segment(points[i], points[j]) for i, j in edges)
+    return graph
+
+
+def map_tasks(task: Callable[[Item], Result], items: Iterable[Item], worker_state: dict,
+              workers: Optional[int] = None) -> Iterator[Result]:
+    """
+    Yields results of task for given items (in their order), computed by given number of worker processes (all
+    by default). Tasks read worker state from state, it is passed to each worker once (see init_worker) and it is
+    inherited without pickling where processes are forked.
+    """
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers, mp_context=context(), initializer=init_worker, initargs=(worker_state,)) \
+            as executor:
+        yield from executor.map(task, items)
+
+
+def context():
+    """ Returns multiprocessing context, that forks processes if possible. """
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+def init_worker(worker_state: dict):
+    """ Sets state of worker process. """
+    state.update(worker_state)
+
+
+def sweep_task(sources: Sequence[int]) -> List[Tuple[int, int]]:
+    """ Returns edges (as pairs of indices) visible from given points, using sweep. """
+    obstacles, points, index = state['obstacles'], state['points'], state['index']
+    chosen = [points[i] for i in sources]
+    return [
+        (i, index[visible_point])
+        for i, point, events in zip(sources, chosen, obstacles.angular_orders(chosen))
+        for visible_point in visible_vertices(point, obstacles, events, state['reduced'])
+    ]
+
+
+def brute_task(sources: Sequence[int]) -> List[Tuple[int, int]]:
+    """ Returns edges (as pairs of indices) from given points to following points, using brute force. """
+    points, index = state['points'], state['index']
+    return [
+        (i, index[visible_point])
+        for i in sources
+        for visible_point in visible_following(
+            i, points, state['coordinates'], state['segments'], state['wedges'], state['table'],
+            state['angles']
+        )
+    ]
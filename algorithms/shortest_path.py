@@ -0,0 +1,130 @@
+""" Shortest path queries on visibility graph. """
+import heapq
+import math
+from typing import List, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from algorithms.visibility_graph import Obstacles, visible_vertices
+from algorithms.visibility_graph_brute import Sightlines, obstructs, is_diagonal, polygon_cones
+from geometry import Collection, CompactGraph, Point, Segment, dist, batch
+
+
+class PathFinder:
+    """
+    Answers shortest path queries between arbitrary points, using visibility graph of obstacles built once.
+    Graph is stored as CSR adjacency: neighbours of i-th point are targets[offsets[i]:offsets[i+1]] and lengths
+    of edges to them are weights[offsets[i]:offsets[i+1]].
+    Start and goal are connected to the graph by computing only points visible from them.
+    """
+
+    def __init__(self, graph: Union[Collection, CompactGraph], collection: Collection, reduced: bool = False,
+                 engine: str = 'brute'):
+        """
+        Prepares queries on given visibility graph of obstacles in given collection.
+        If graph is reduced (see visibility_graph), points visible from start and goal are always computed,
+        since their edges may be missing from the graph.
+        Points visible from start and goal are found by given engine ('brute' or 'sweep').
+        """
+        if isinstance(graph, Collection):
+            graph = CompactGraph.from_collection(graph)
+        self.collection = collection
+        self.reduced = reduced
+        self.points: List[Point] = list(graph.points)
+        self.numbers: Dict[Point, int] = {p: i for i, p in enumerate(self.points)}
+        self.cones = polygon_cones(collection.polygons)
+        self.obstacles, self.sightlines = prepare(collection, engine, self.points)
+
+        # lengths of edges are stored next to targets
+        self.offsets, self.targets = graph.adjacency()
+        sources = np.repeat(np.arange(len(self.points)), np.diff(self.offsets))
+        self.weights = batch.dist(graph.coordinates[sources], graph.coordinates[self.targets])
+
+    def neighbours(self, point: Point) -> List[Tuple[int, float]]:
+        """ Returns numbers of points visible from given point (that is point of graph) and distances to them. """
+        i = self.numbers[point]
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return list(zip(self.targets[start:end].tolist(), self.weights[start:end].tolist()))
+
+    def end_neighbours(self, point: Point) -> List[Tuple[int, float]]:
+        """ Returns numbers of points visible from start or goal and distances to them. """
+        if point in self.numbers and not self.reduced:
+            return self.neighbours(point)
+        return [(self.numbers[p], dist(point, p)) for p in visible_points(point, self.obstacles, self.sightlines)]
+
+    def visible(self, p1: Point, p2: Point) -> bool:
+        """ Returns whether segment between given points is not obstructed by obstacles. """
+        s = Segment(p1, p2)
+        return not is_diagonal(s, self.cones) and not any(
+            obstructs(seg, s) for seg in self.collection.index.segments_crossing(p1, p2) if seg.p1 != seg.p2
+        )
+
+    def path(self, start: Point, goal: Point) -> Optional[List[Point]]:
+        """
+        Returns shortest path from start to goal (as list of its points), or None if goal can't be reached.
+        Uses A* with Euclidean distance to goal as heuristic.
+        """
+        if start == goal:
+            return [start]
+
+        # start and goal that are not points of graph are added as two extra nodes
+        position = self.points + [start, goal]
+        start_node = self.numbers.get(start, len(self.points))
+        goal_node = self.numbers.get(goal, len(self.points) + 1)
+        to_goal = dict(self.end_neighbours(goal)) if goal_node > len(self.points) or self.reduced else {}
+
+        distances = {start_node: 0.0}
+        previous = {}
+        heap = [(dist(start, goal), 0.0, start_node)]
+        while heap:
+            _, d, node = heapq.heappop(heap)
+            if node == goal_node:
+                return self.trace(previous, goal_node, position)
+            if d > distances[node]:
+                continue
+
+            # edges from node, including the edge to goal
+            edges = self.end_neighbours(start) if node == start_node else self.neighbours(position[node])
+            if node in to_goal:
+                edges.append((goal_node, to_goal[node]))
+            elif node == len(self.points) and goal_node > len(self.points) and self.visible(start, goal):
+                edges.append((goal_node, dist(start, goal)))
+
+            for target, weight in edges:
+                new_distance = d + weight
+                if new_distance < distances.get(target, math.inf):
+                    distances[target] = new_distance
+                    previous[target] = node
+                    heapq.heappush(heap, (new_distance + dist(position[target], goal), new_distance, target))
+        return None
+
+    @staticmethod
+    def trace(previous: Dict[int, int], node: int, position: List[Point]) -> List[Point]:
+        """ Returns points on path ending in given node, found by following previous nodes. """
+        path = [position[node]]
+        while node in previous:
+            node = previous[node]
+            path.append(position[node])
+        return path[::-1]
+
+
+def prepare(collection: Collection, engine: str, points: Optional[List[Point]] = None) \
+        -> Tuple[Optional[Obstacles], Optional[Sightlines]]:
+    """
+    Prepares obstacles of collection for queries of visible points (see visible_points) by given engine,
+    'brute' (default, see algorithms.visibility_graph on choice of engine) or 'sweep'. Points are points that can
+    be found by brute force.
+    """
+    if engine == 'brute':
+        return None, Sightlines(collection, points)
+    if engine == 'sweep':
+        return Obstacles.from_collection(collection), None
+    raise ValueError(f'Engine not supported: {engine}')
+
+
+def visible_points(point: Point, obstacles: Optional[Obstacles], sightlines: Optional[Sightlines],
+                   reduced: bool = False) -> List[Point]:
+    """ Returns points visible from given point, found by the engine obstacles were prepared for (see prepare). """
+    if sightlines is not None:
+        return sightlines.visible(point, reduced)
+    return list(visible_vertices(point, obstacles, reduced=reduced))
@@ -0,0 +1,53 @@
+""" Opt-in instrumentation of visibility graph algorithms. """
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Dict, Callable, Tuple, Optional, ContextManager
+
+from geometry import Collection
+
+
+@dataclass
+class Stats:
+    """
+    Counters of operations and times of phases of an algorithm run.
+    Algorithms take optional stats argument and update it only if it is given, so that disabled
+    instrumentation costs a single check at each counted place.
+    """
+    counters: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    times: Dict[str, float] = field(default_factory=lambda: defaultdict(float))
+
+    def count(self, name: str, value: int = 1):
+        """ Increases counter with given name. """
+        self.counters[name] += value
+
+    @contextmanager
+    def phase(self, name: str):
+        """ Adds time spent in context to phase with given name. """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[name] += time.perf_counter() - start
+
+    def lines(self):
+        """ Returns lines of human readable report. """
+        return [f'{name}: {value * 1000:.1f} ms' for name, value in self.times.items()] + \
+            [f'{name}: {value}' for name, value in sorted(self.counters.items())]
+
+    def __str__(self) -> str:
+        return '\n'.join(self.lines())
+
+
+def timed(stats: Optional[Stats], name: str) -> ContextManager:
+    """ Returns context that adds its time to phase of given stats, or does nothing if there are no stats. """
+    return stats.phase(name) if stats is not None else nullcontext()
+
+
+def instrumented(algorithm: Callable[..., Collection], collection: Collection, **kwargs) -> Tuple[Collection, Stats]:
+    """ Runs algorithm (that takes stats argument) on given collection and returns graph with its stats. """
+    stats = Stats()
+    with stats.phase('total'):
+        graph = algorithm(collection, stats=stats, **kwargs)
+    return graph, stats
@@ -0,0 +1,200 @@
+""" Status structure of the rotational sweep. """
+import math
+import random
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from algorithms.stats import Stats
+from geometry import Point, Segment, orient, batch
+
+# bound of rounding errors of distances from sweep point, relative to the largest coordinate
+DISTANCE_ERROR = 2.0 ** -40
+
+
+class Node:
+    """
+    Node of the treap, with values of its segment that do not change during the sweep: side of its line on which
+    the sweep point lies and bounds of distances of its points from the sweep point.
+    """
+    __slots__ = ('segment', 'side', 'near', 'far', 'priority', 'left', 'right', 'parent')
+
+    def __init__(self, segment: Segment, side: float, near: float, far: float, priority: float):
+        self.segment = segment
+        self.side = side
+        self.near = near
+        self.far = far
+        self.priority = priority
+        self.left: Optional[Node] = None
+        self.right: Optional[Node] = None
+        self.parent: Optional[Node] = None
+
+
+def in_front(a: Node, b: Node) -> bool:
+    """
+    Returns whether segment of node a is in front of segment of node b, as seen from the sweep point.
+    Segments must not cross and must be crossed by common ray from point, then the answer does not depend on the ray.
+    Segments whose distances from point do not overlap are compared by them, others by exact orientation tests
+    of their own ends (for pieces of split segments, rounded crossings, not original segments).
+    """
+    if a.far < b.near:
+        return True
+    if b.far < a.near:
+        return False
+
+    # if b lies on one side of line a, a is in front when point lies on the other side
+    s, t = a.segment, b.segment
+    o1 = 0 if t.p1 == s.p1 or t.p1 == s.p2 else orient(s.p1, s.p2, t.p1)
+    o2 = 0 if t.p2 == s.p1 or t.p2 == s.p2 else orient(s.p1, s.p2, t.p2)
+    if o1 * o2 >= 0 and (o1 != 0 or o2 != 0):
+        return (o1 or o2) * a.side < 0
+
+    # otherwise a lies on one side of line b, a is in front when point lies on the same side
+    o3 = 0 if s.p1 == t.p1 or s.p1 == t.p2 else orient(t.p1, t.p2, s.p1)
+    o4 = 0 if s.p2 == t.p1 or s.p2 == t.p2 else orient(t.p1, t.p2, s.p2)
+    return (o3 or o4) * b.side > 0
+
+
+def node_values(point: Point, segment: Segment) -> Tuple[float, float, float]:
+    """ Returns side of line of segment on which point lies and bounds of distances of points of segment from it. """
+    p1, p2 = segment
+    error = DISTANCE_ERROR * max(abs(point.x), abs(point.y), abs(p1.x), abs(p1.y), abs(p2.x), abs(p2.y))
+    near = distance_to_segment(point, p1, p2) - error
+    far = max(math.hypot(p1.x - point.x, p1.y - point.y), math.hypot(p2.x - point.x, p2.y - point.y)) + error
+    return orient(p1, p2, point), near, far
+
+
+def node_arrays(point: Point, segments: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ Vectorized version of node_values, for segments given as array (see geometry.batch). """
+    source = np.array(tuple(point), dtype=float)
+    p1, p2 = segments[:, :2], segments[:, 2:]
+    error = DISTANCE_ERROR * np.maximum(np.abs(segments).max(axis=1, initial=0), np.abs(source).max())
+    d = p2 - p1
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = np.nan_to_num(np.clip(((source - p1) * d).sum(axis=1) / (d * d).sum(axis=1), 0.0, 1.0))
+    near = batch.dist(p1 + t[:, None] * d, source) - error
+    far = np.maximum(batch.dist(p1, source), batch.dist(p2, source)) + error
+    return batch.orient(p1, p2, source), near, far
+
+
+def distance_to_segment(p: Point, a: Point, b: Point) -> float:
+    """ Returns distance of point p from segment between points a and b. """
+    dx, dy = b.x - a.x, b.y - a.y
+    t = max(0.0, min(1.0, ((p.x - a.x) * dx + (p.y - a.y) * dy) / (dx * dx + dy * dy)))
+    return math.hypot(a.x + t * dx - p.x, a.y + t * dy - p.y)
+
+
+class SweepStatus:
+    """
+    Segments crossed by the sweep ray, ordered by distance from the sweep point.
+    Implemented as treap, order is given by exact orientation tests (see in_front), so it never changes
+    while the ray rotates. Nodes are also kept by their segments and know their parents, so that segments
+    are removed without searching. Insert, remove and first take O(log n) expected time.
+    """
+
+    def __init__(self, point: Point, stats: Optional[Stats] = None):
+        self.point = point
+        self.stats = stats
+        self.root: Optional[Node] = None
+        self.nodes: Dict[Segment, Node] = {}
+        self.random = random.Random(0)
+        self.rows: Optional[Dict[Segment, int]] = None
+
+    def prepare(self, rows: Dict[Segment, int], segments: np.ndarray):
+        """
+        Computes values of nodes (see Node) of segments given by their rows of array at once, so that they are not
+        computed one by one when segments are added.
+        """
+        self.rows = rows
+        self.sides, self.nears, self.fars = (values.tolist() for values in node_arrays(self.point, segments))
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __iter__(self) -> Iterator[Segment]:
+        """ Iterates over segments from the closest one. """
+        stack, node = [], self.root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.segment
+            node = node.right
+
+    def first(self) -> Optional[Segment]:
+        """ Returns the closest segment (or None). """
+        node = self.root
+        if node is None:
+            return None
+        while node.left:
+            node = node.left
+        return node.segment
+
+    def add(self, segment: Segment):
+        """ Adds segment to status. """
+        if self.rows is not None and segment in self.rows:
+            k = self.rows[segment]
+            node = Node(segment, self.sides[k], self.nears[k], self.fars[k], self.random.random())
+        else:
+            node = Node(segment, *node_values(self.point, segment), self.random.random())
+        self.nodes[segment] = node
+        left, right = self._split(self.root, node)
+        self.root = self._merge(self._merge(left, node), right)
+        self.root.parent = None
+        if self.stats is not None:
+            self.stats.count('status inserts')
+
+    def remove(self, segment: Segment):
+        """ Removes segment from status, raises ValueError if it is not there. """
+        node = self.nodes.pop(segment, None)
+        if node is None:
+            raise ValueError(f'{segment} not in status')
+
+        merged = self._merge(node.left, node.right)
+        parent = node.parent
+        if merged is not None:
+            merged.parent = parent
+        if parent is None:
+            self.root = merged
+        elif parent.left is node:
+            parent.left = merged
+        else:
+            parent.right = merged
+        if self.stats is not None:
+            self.stats.count('status removes')
+
+    def _less(self, a: Node, b: Node) -> bool:
+        if self.stats is not None:
+            self.stats.count('comparisons')
+        return in_front(a, b)
+
+    def _split(self, node: Optional[Node], new: Node):
+        """ Splits tree into nodes with segments in front of segment of given node and the rest. """
+        if node is None:
+            return None, None
+        if self._less(node, new):
+            right, rest = self._split(node.right, new)
+            node.right = right
+            if right is not None:
+                right.parent = node
+            return node, rest
+        rest, left = self._split(node.left, new)
+        node.left = left
+        if left is not None:
+            left.parent = node
+        return rest, node
+
+    def _merge(self, left: Optional[Node], right: Optional[Node]) -> Optional[Node]:
+        """ Merges trees, all segments in left tree have to be in front of all in right tree. """
+        if left is None:
+            return right
+        if right is None:
+            return left
+        if left.priority > right.priority:
+            left.right = self._merge(left.right, right)
+            left.right.parent = left
+            return left
+        right.left = self._merge(left, right.left)
+        right.left.parent = right
+        return right
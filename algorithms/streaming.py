@@ -0,0 +1,124 @@
+""" Streaming construction of visibility graphs, edges are produced in batches and never kept all at once. """
+import os
+from typing import Iterator, Callable, BinaryIO, Optional
+
+import numpy as np
+
+from algorithms.stats import Stats, timed
+from algorithms.visibility_graph import Obstacles, visible_vertices
+from algorithms.visibility_graph_brute import polygon_cones, polygon_tangents, segment_table, tangent_array, \
+    visible_following, cone_array
+from geometry import Collection, batch
+
+# engines that can produce edges in batches
+ENGINES = ('sweep', 'brute')
+
+# number of edges written to file at once
+WRITE_CHUNK = 2 ** 16
+
+
+def visibility_edges(collection: Collection, reduced: bool = False, engine: str = 'brute',
+                     stats: Optional[Stats] = None) -> Iterator[np.ndarray]:
+    """
+    Yields edges of visibility graph, found using given engine ('brute' by default or 'sweep', see
+    algorithms.visibility_graph on choice of engine), in batches of edges from one source point. Each batch is
+    (K, 2) int32 array of indices of points in collection.arrays.points and each edge is yielded once. Next batch is computed only when it is requested, so slow consumers
+    are never flooded with edges and only O(n) memory is used besides the batch.
+    If stats are given, counts of operations and times of phases are added to them (as by the engine).
+    """
+    points = collection.arrays.points
+    numbers = {p: i for i, p in enumerate(points)}
+
+    if engine == 'sweep':
+        with timed(stats, 'preprocess'):
+            obstacles = Obstacles.from_collection(collection)
+            orders = obstacles.angular_orders(points)
+        for i, point in enumerate(points):
+            with timed(stats, 'sort'):
+                events = next(orders)
+            # each edge is found from both of its ends, it is yielded from the one with smaller index
+            with timed(stats, 'sweep'):
+                targets = [numbers[p] for p in visible_vertices(point, obstacles, events, reduced, stats)]
+            yield edges_from(i, [j for j in targets if j > i])
+        if stats is not None:
+            stats.count('sorts', len(points))
+
+    elif engine == 'brute':
+        with timed(stats, 'preprocess'):
+            obstacles = [seg for seg in collection.all_segments if seg.p1 != seg.p2]
+            segments = batch.segments_array(obstacles)
+            cones = polygon_cones(collection.polygons)
+            table = segment_table(collection, obstacles)
+            angles = tangent_array(points, polygon_tangents(collection, cones)) if reduced else None
+            coordinates, wedges = collection.arrays.coordinates, cone_array(points, cones)
+        for i in range(len(points)):
+            with timed(stats, 'check'):
+                visible = visible_following(i, points, coordinates, segments, wedges, table, angles, stats)
+                targets = [numbers[p] for p in visible]
+            yield edges_from(i, targets)
+
+    else:
+        raise ValueError(f'Engine not supported: {engine}')
+
+
+def edges_from(source: int, targets: list) -> np.ndarray:
+    """ Creates (K, 2) array of edges from source to given targets. """
+    edges = np.empty((len(targets), 2), dtype=np.int32)
+    edges[:, 0] = source
+    edges[:, 1] = targets
+    return edges
+
+
+def consume(batches: Iterator[np.ndarray], *consumers: Callable[[np.ndarray], None]) -> int:
+    """
+    Passes each batch of edges to all given consumers as soon as it is produced, returns number of edges.
+    Consumers (writers, path precomputation, exporters) can work while the graph is being built.
+    """
+    count = 0
+    for edges in batches:
+        for consumer in consumers:
+            consumer(edges)
+        count += len(edges)
+    return count
+
+
+class EdgeWriter:
+    """
+    Consumer that writes edges to binary file as int32 pairs (in native byte order), in chunks of given
+    number of edges, so that graphs larger than memory can be stored. Written file can be read with read_edges.
+    """
+
+    def __init__(self, file: BinaryIO, chunk: int = WRITE_CHUNK):
+        self.file = file
+        self.chunk = chunk
+        self.pending = []
+        self.pending_count = 0
+        self.count = 0
+
+    def __call__(self, edges: np.ndarray):
+        self.pending.append(np.asarray(edges, dtype=np.int32))
+        self.pending_count += len(edges)
+        if self.pending_count >= self.chunk:
+            self.flush()
+
+    def flush(self):
+        """ Writes pending edges to file. """
+        if self.pending:
+            data = np.concatenate(self.pending)
+            self.file.write(data.tobytes())
+            self.count += len(data)
+        self.pending, self.pending_count = [], 0
+        self.file.flush()
+
+    def __enter__(self) -> 'EdgeWriter':
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
+
+
+def read_edges(path: str) -> np.ndarray:
+    """ Returns (E, 2) array of edges written by EdgeWriter, mapped from file without reading it at once. """
+    if os.path.getsize(path) == 0:
+        return np.zeros((0, 2), dtype=np.int32)
+    return np.memmap(path, dtype=np.int32, mode='r').reshape(-1, 2)
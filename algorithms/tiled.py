@@ -0,0 +1,240 @@
+""" Visibility graphs of large scenes, built from local graphs of square tiles connected by portals. """
+import math
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from algorithms.parallel import map_tasks, state
+from algorithms.shortest_path import PathFinder, prepare, visible_points
+from algorithms.visibility_graph import visible_vertices, lies_inside
+from algorithms.visibility_graph_brute import visible_following
+from geometry import Collection, CompactGraph, Grid, Point, Polygon, dist
+from geometry.grid import Cell
+
+# average number of points of scene in tile of default size (tile size depends on density of points)
+POINTS_PER_TILE = 64
+
+# maximal number of tiles along the longer side of bounding box of scene, smaller default tiles are enlarged
+MAX_TILES_PER_AXIS = 128
+
+# default number of evenly spaced portals on each side of tile (besides portals in gaps between obstacles)
+PORTALS_PER_SIDE = 8
+
+# side of tile given by direction ('x' for bottom side, 'y' for left side) and tile
+Side = Tuple[str, int, int]
+
+
+class Tiling:
+    """
+    Partition of bounding box of scene into square tiles. Tiles are closed, so points on their sides belong to more
+    tiles. Adjacent tiles share portals, points on their common side that do not lie on any obstacle. Every gap between
+    obstacles crossing the side has portal in it, so that paths between tiles are never blocked by missing portals.
+    Default tile size is chosen so that tiles have POINTS_PER_TILE points on average, but there are never more than
+    MAX_TILES_PER_AXIS tiles along the longer side of bounding box of scene (smaller given size raises ValueError).
+    Scene without points has no tiles.
+    Sightlines in tiles are checked by given engine ('brute' or 'sweep', see shortest_path.prepare).
+    """
+
+    def __init__(self, collection: Collection, tile_size: Optional[float] = None, portals: int = PORTALS_PER_SIDE,
+                 engine: str = 'brute'):
+        # bounding box of scene
+        points = collection.all_points
+        lower = Point(min((p.x for p in points), default=0), min((p.y for p in points), default=0))
+        upper = Point(max((p.x for p in points), default=0), max((p.y for p in points), default=0))
+        extent = max(upper.x - lower.x, upper.y - lower.y)
+
+        if tile_size is None:
+            # area of bounding box with points spread evenly (or length of it, if points lie on one line)
+            area, count = (upper.x - lower.x) * (upper.y - lower.y), max(1, len(points))
+            size = math.sqrt(area * POINTS_PER_TILE / count) if area else extent * POINTS_PER_TILE / count
+            tile_size = max(size, extent / MAX_TILES_PER_AXIS) or 1.0
+        elif not tile_size > 0:
+            raise ValueError(f'Tile size must be positive: {tile_size}')
+        elif extent / tile_size > MAX_TILES_PER_AXIS:
+            raise ValueError(f'Tile size {tile_size} gives more than {MAX_TILES_PER_AXIS} tiles along side of scene')
+        self.tile_size = tile_size
+        self.engine = engine
+        self.index = Grid(self.tile_size)
+        for seg in collection.all_segments:
+            if seg.p1 != seg.p2:
+                self.index.add_segment(seg)
+        for p in collection.all_points:
+            self.index.add_point(p)
+
+        # polygons at their points, their interior angles are needed in tiles that contain the points
+        self.polygons: Dict[Point, List[Polygon]] = defaultdict(list)
+        for poly in collection.polygons:
+            for p in set(poly.points):
+                self.polygons[p].append(poly)
+
+        # tiles of bounding box of scene with one more tile around it (paths may go around obstacles on its sides),
+        # and portals on sides shared by them
+        self.tiles: List[Cell] = []
+        self.portals: Dict[Side, List[Point]] = {}
+        if not points:
+            return
+        low, high = self.tile(lower), self.tile(upper)
+        low, high = (low[0] - 1, low[1] - 1), (high[0] + 1, high[1] + 1)
+        self.tiles = [(i, j) for i in range(low[0], high[0] + 1) for j in range(low[1], high[1] + 1)]
+        for i, j in self.tiles:
+            if j > low[1]:
+                self.portals['x', i, j] = self.side_portals(('x', i, j), portals)
+            if i > low[0]:
+                self.portals['y', i, j] = self.side_portals(('y', i, j), portals)
+
+    def tile(self, p: Point) -> Cell:
+        """ Returns tile that contains given point (the one to the top right if point lies on sides). """
+        return math.floor(p.x / self.tile_size), math.floor(p.y / self.tile_size)
+
+    def side_portals(self, side: Side, count: int) -> List[Point]:
+        """
+        Returns portals on given side: evenly spaced ones and ones in the middle of gaps between obstacles crossing
+        the side, except those lying on obstacles.
+        """
+        direction, i, j = side
+        size = self.tile_size
+        axis, other = (0, 1) if direction == 'x' else (1, 0)
+        line = (j if direction == 'x' else i) * size
+        start = (i if direction == 'x' else j) * size
+
+        # positions of obstacles crossing the side, measured along it
+        crossings = [start, start + size]
+        segments = self.index.segments.get((i, j), {})
+        for seg in segments:
+            a, b = seg.p1[other] - line, seg.p2[other] - line
+            if a * b > 0:
+                continue
+            if a == b == 0:
+                crossings.extend(min(max(p[axis], start), start + size) for p in seg)
+            else:
+                position = seg.p1[axis] + (seg.p2[axis] - seg.p1[axis]) * a / (a - b)
+                if start <= position <= start + size:
+                    crossings.append(position)
+        crossings.sort()
+
+        positions = {start + (k + 0.5) * size / count for k in range(count)}
+        positions.update((c1 + c2) / 2 for c1, c2 in zip(crossings, crossings[1:]) if c1 < c2)
+        portals = [Point(s, line) if direction == 'x' else Point(line, s) for s in sorted(positions)]
+        return [p for p in portals if not any(p in seg or lies_inside(p, seg) for seg in segments)]
+
+    def points(self, tile: Cell) -> List[Point]:
+        """ Returns points of scene in given (closed) tile and portals on its sides. """
+        i, j = tile
+        size = self.tile_size
+        found = set()
+        for cell in ((i, j), (i + 1, j), (i, j + 1), (i + 1, j + 1)):
+            found.update(
+                p for p in self.index.points.get(cell, ())
+                if i * size <= p.x <= (i + 1) * size and j * size <= p.y <= (j + 1) * size
+            )
+        for side in (('x', i, j), ('x', i, j + 1), ('y', i, j), ('y', i + 1, j)):
+            found.update(self.portals.get(side, ()))
+        return list(found)
+
+    def collection(self, tile: Cell, points: List[Point]) -> Collection:
+        """ Returns collection of obstacles crossing given tile, with given points of tile. """
+        polygons = {poly for p in points for poly in self.polygons.get(p, ())}
+        return Collection(points=set(points), segments=set(self.index.segments.get(tile, ())), polygons=polygons)
+
+    def local_edges(self, tile: Cell) -> List[Tuple[Point, Point]]:
+        """
+        Returns edges of visibility graph of points of given tile (see points). Edges between points of tile lie
+        in the tile, so only obstacles crossing it are needed to find them.
+        """
+        points = self.points(tile)
+        inside = set(points)
+        obstacles, sightlines = prepare(self.collection(tile, points), self.engine, points)
+        if sightlines is not None:
+            return [
+                (point, visible_point)
+                for i, point in enumerate(points)
+                for visible_point in visible_following(
+                    i, points, sightlines.coordinates, sightlines.segments, sightlines.wedges, sightlines.table
+                )
+            ]
+        return [
+            (point, visible_point)
+            for point, events in zip(points, obstacles.angular_orders(points))
+            for visible_point in visible_vertices(point, obstacles, events)
+            if visible_point in inside and point < visible_point
+        ]
+
+    def visible_points(self, point: Point) -> List[Point]:
+        """ Returns points of tile containing given point (see points), that are visible from it. """
+        tile = self.tile(point)
+        points = self.points(tile)
+        inside = set(points)
+        obstacles, sightlines = prepare(self.collection(tile, points), self.engine, points)
+        return [p for p in visible_points(point, obstacles, sightlines) if p in inside]
+
+
+def visibility_graph_tiled(collection: Collection, tile_size: Optional[float] = None,
+                           portals: int = PORTALS_PER_SIDE, workers: Optional[int] = None,
+                           engine: str = 'brute') -> CompactGraph:
+    """
+    Generates graph of visibility between points of scene in the same tile and portals of tiles (see Tiling).
+    Tiles are processed in parallel, each in time that depends only on the m points in it (O(m^2 log m) with the
+    sweep), so time and memory grow with number of tiles instead of with square of number of points. Paths in graph
+    may be longer than shortest paths, since they go between tiles through portals.
+    """
+    return tiled_graph(Tiling(collection, tile_size, portals, engine), workers)
+
+
+def tiled_graph(tiling: Tiling, workers: Optional[int] = None) -> CompactGraph:
+    """ Generates graph of given tiling, with tiles processed by given number of processes (all by default). """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return merge(tiling, map(tiling.local_edges, tiling.tiles))
+    return merge(tiling, map_tasks(tile_task, tiling.tiles, dict(tiling=tiling), workers))
+
+
+def merge(tiling: Tiling, results: Iterable[List[Tuple[Point, Point]]]) -> CompactGraph:
+    """ Creates graph from edges of tiles, edges found in two tiles (along their common side) are stored once. """
+    points = list(set(p for points in tiling.index.points.values() for p in points).union(*tiling.portals.values()))
+    numbers = {p: i for i, p in enumerate(points)}
+    edges = [np.array([(numbers[p1], numbers[p2]) for p1, p2 in edges], dtype=np.int32).reshape(-1, 2)
+             for edges in results]
+    edges = np.unique(np.sort(np.concatenate(edges), axis=1), axis=0) if edges else np.empty((0, 2), dtype=np.int32)
+    return CompactGraph.from_edges(points, edges)
+
+
+def tile_task(tile: Cell) -> List[Tuple[Point, Point]]:
+    """ Returns edges between points of given tile (of tiling in state of worker process, see map_tasks). """
+    return state['tiling'].local_edges(tile)
+
+
+class TiledPathFinder(PathFinder):
+    """
+    Answers path queries using tiled visibility graph (see visibility_graph_tiled). Start and goal are connected
+    to points of their tiles, and found path is shortened by replacing its parts with direct sightlines, which are
+    checked only for points of the path (they may cross many tiles). Paths are not always shortest, start and goal
+    should lie in tiles around scene (see Tiling).
+    """
+
+    def __init__(self, collection: Collection, tile_size: Optional[float] = None, portals: int = PORTALS_PER_SIDE,
+                 workers: Optional[int] = None, engine: str = 'brute'):
+        self.tiling = Tiling(collection, tile_size, portals, engine)
+        super().__init__(tiled_graph(self.tiling, workers), collection, engine=engine)
+
+    def end_neighbours(self, point: Point) -> List[Tuple[int, float]]:
+        if point in self.numbers:
+            return self.neighbours(point)
+        return [(self.numbers[p], dist(point, p)) for p in self.tiling.visible_points(point)]
+
+    def path(self, start: Point, goal: Point) -> Optional[List[Point]]:
+        path = super().path(start, goal)
+        return self.stitch(path) if path is not None else None
+
+    def stitch(self, path: List[Point]) -> List[Point]:
+        """ Returns path shortened by going from each of its points directly to the furthest visible one. """
+        stitched = [path[0]]
+        i = 0
+        while i < len(path) - 1:
+            j = len(path) - 1
+            while j > i + 1 and not self.visible(path[i], path[j]):
+                j -= 1
+            stitched.append(path[j])
+            i = j
+        return stitched
@@ -1,115 +1,355 @@
+"""
+Visibility graph built by the rotational sweep in O(n^2 log n).
+
+Choice of engine: brute force (algorithms.visibility_graph_brute) is the default engine everywhere (GUI, runner,
+streaming, compact, dynamic and tiled graphs, path queries) and the sweep is used only when asked for (engine 'sweep').
+Despite its better complexity, the sweep handles every event in Python (status treap and exact orientation tests),
+while brute force checks whole batches of sightlines with vectorized numpy operations and finds obstacles in spatial
+index, so that its cubic number of checks stays cheap. Measured on benchmark scenes, brute force is 3-5 times faster
+at 500 points (1.3 s against 6.3 s on 'convex' scene) and 5-10 times faster at 2000 points (9.5 s against 93 s
+on 'convex', 10 s against 56 s on 'segments'), so the sweep does not catch up at sizes that fit in memory.
+Both engines give the same graphs (see algorithms.oracle), so the choice only affects time and should be measured
+again (python -m benchmarks) before the default is changed.
+"""
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
+from dataclasses import dataclass, field
+from fractions import Fraction
 from functools import cmp_to_key
 from itertools import chain
-from typing import Iterator, Iterable, Callable, List, Dict, Union
+from typing import Callable, Iterator, Iterable, List, Dict, Tuple, Optional, FrozenSet, Set
+
+import numpy as np
 
-from sortedcontainers import SortedList
+from geometry import Collection, Point, Segment, parametric_intersection, dist, orient, batch, Grid
+from algorithms.stats import Stats, timed
+from algorithms.status import SweepStatus
+from algorithms.visibility_graph_brute import polygon_cones, polygon_tangents, is_diagonal, is_tangent, CHUNK_SIZE
 
-from geometry import Collection, Point, Segment, intersection, dist, angle_to_xaxis, orient, angle_between_points
+# pseudo angles closer than that may be in wrong order because of rounding (their error is few times 2^-53)
+ANGLE_TOLERANCE = 2.0 ** -40
 
 
-def visibility_graph(collection: Collection) -> Collection:
-    """ Generates visibility graph from in O(n^2 log n). """
+def visibility_graph(collection: Collection, reduced: bool = False, stats: Optional[Stats] = None) -> Collection:
+    """
+    Generates visibility graph in O(n^2 log n), used only when asked for (see choice of engine above).
+    Reduced graph has only edges that can be part of shortest paths (see is_tangent).
+    If stats are given, counts of operations and times of phases are added to them.
+    """
 
-    # create dict that maps point to segments that it belongs to
-    segments = defaultdict(list)
-    for seg in collection.all_segments:
-        segments[seg.p1].append(seg)
-        segments[seg.p2].append(seg)
+    # prepare obstacles
+    with timed(stats, 'preprocess'):
+        obstacles = Obstacles.from_collection(collection)
 
     # output graph
-    graph = Collection(points=collection.all_points)
+    graph = Collection(points=set(obstacles.points))
+
+    # for each point (angular orders of other points are computed together)
+    points = list(graph.points)
+    orders = obstacles.angular_orders(points)
+    for point in points:
+        with timed(stats, 'sort'):
+            events = next(orders)
 
-    # for each point
-    for point in graph.points:
-        # for each point visible from point
-        for visible_point in visible_vertices(point, graph.points, segments):
-            # create edge in graph
-            graph.segments.add(Segment(point, visible_point))
+        # find points visible from point
+        with timed(stats, 'sweep'):
+            visible = list(visible_vertices(point, obstacles, events, reduced, stats))
 
+        # create edges in graph
+        with timed(stats, 'output'):
+            graph.segments.update(Segment(point, visible_point) for visible_point in visible)
+
+    if stats is not None:
+        stats.count('sorts', len(points))
     return graph
 
 
-def visible_vertices(point: Point, points: Iterable[Point], segments: Dict[Point, List[Segment]]) -> Iterator[Point]:
-    """ Yields points from given points that can be seen from given start point. """
+@dataclass
+class Obstacles:
+    """
+    Obstacles prepared for the sweep.
+    Segments are split, so that they do not cross and no point lies inside of any of them (see split_segments).
+    Vertices (points and ends of segments) are also kept in array shared by all sweeps and segments in spatial index.
+    Pieces of segments and their original segments are kept in arrays too (rows of pieces are given by rows), so that
+    values that depend only on sweep point are computed for all of them at once.
+    """
+    points: FrozenSet[Point]
+    segments: Dict[Point, List[Segment]]
+    origins: Dict[Segment, Segment]
+    cones: Dict[Point, List[Tuple[Point, Point]]]
+    tangents: Dict[Point, Tuple[Point, Point]] = field(default_factory=dict)
+    vertices: List[Point] = field(init=False)
+    coordinates: np.ndarray = field(init=False)
+    index: Grid = field(init=False)
+    rows: Dict[Segment, int] = field(init=False)
+    pieces: np.ndarray = field(init=False)
+    lines: np.ndarray = field(init=False)
+
+    def __post_init__(self):
+        self.vertices = list(self.points.union(self.segments))
+        self.coordinates = batch.points_array(self.vertices)
+        self.index = Grid.build(self.origins)
+        self.rows = {seg: k for k, seg in enumerate(self.origins)}
+        self.pieces = batch.segments_array(self.origins)
+        self.lines = batch.segments_array(self.origins.values())
+
+    @classmethod
+    def from_collection(cls, collection: Collection) -> 'Obstacles':
+        """ Prepares obstacles from segments and polygons of given collection. """
+        points = collection.all_points
+
+        # create dict that maps point to segments that it belongs to
+        # (index of collection is used if no segment was split and all have positive length)
+        origins = split_segments(collection.all_segments, points)
+        if len(origins) == len(collection.all_segments) and all(piece == seg for piece, seg in origins.items()):
+            segments = collection.incident
+        else:
+            segments = defaultdict(list)
+            for seg in origins:
+                segments[seg.p1].append(seg)
+                segments[seg.p2].append(seg)
+
+        # get interior angles of polygons for each point
+        cones = polygon_cones(collection.polygons)
+        return cls(points, segments, origins, cones, polygon_tangents(collection, cones))
+
+    def angular_orders(self, points: List[Point]) -> Iterator[List[Point]]:
+        """
+        Yields, for each of given points, vertices sorted first by angle and then by distance from that point.
+        Orders are computed in chunks of points at once, using pseudo angles.
+        """
+        rows = max(1, CHUNK_SIZE // max(1, len(self.vertices)))
+        for start in range(0, len(points), rows):
+            sources = batch.points_array(points[start:start + rows])[:, None, :]
+            angles = batch.pseudo_angle(sources, self.coordinates)
+            distances = batch.dist(sources, self.coordinates)
+            orders = np.lexsort((distances, angles))
+
+            # source itself (at distance 0) is left out, pseudo angles are rounded, so points with close ones are
+            # ordered again using exact orientation
+            vertices = self.vertices
+            for source, order, row, row_angles in zip(points[start:start + rows], orders, distances, angles):
+                order = order[row[order] != 0]
+                events = [vertices[i] for i in order.tolist()]
+                close = np.flatnonzero(np.diff(row_angles[order]) <= ANGLE_TOLERANCE)
+                if len(close):
+                    reorder_close(source, events, close.tolist())
+                yield events
+
+    def crossing_starting_ray(self, point: Point) -> List[Segment]:
+        """ Returns segments that cross ray going from point along x-axis, or end on it coming from below. """
+        crossing = []
+        for seg in self.index.segments_crossing(point, Point(point.x + 1, point.y), 'ray'):
+            lower, upper = sorted(seg, key=lambda p: p.y)
+            if lower.y < point.y and (
+                    (upper.y == point.y and upper.x > point.x)
+                    or (upper.y > point.y and orient(lower, upper, point) > 0)):
+                crossing.append(seg)
+        return crossing
+
+
+def visible_vertices(point: Point, obstacles: Obstacles, events: Optional[List[Point]] = None,
+                     reduced: bool = False, stats: Optional[Stats] = None) -> Iterator[Point]:
+    """
+    Yields points of obstacles that can be seen from given start point.
+    Events are vertices of obstacles in angular order (see Obstacles.angular_orders), computed if not given.
+    If reduced, only points of segments that can be part of shortest paths are yielded (see is_tangent).
+    If stats are given, counts of operations are added to them.
+    Orientation tests are exact, but obstacles that cross are split at rounded crossings (see crossing), so result
+    equals the brute force one only if no point or sightline lies within rounding error of split obstacle.
+    """
+    points, segments = obstacles.points, obstacles.segments
+
+    # no shortest path goes through reflex polygon points
+    if reduced and point in obstacles.tangents and orient(point, *obstacles.tangents[point]) < 0:
+        return
+
+    # sort points and ends of segments first by angle and then by distance from point
+    if events is None:
+        events = next(obstacles.angular_orders([point]))
+
+    # group points lying on the same ray and create status from segments that cross starting ray
+    groups, order = group_events(point, events, stats)
+    on_ray = on_ray_test(point, order, obstacles)
+    crossing = {seg for seg in obstacles.crossing_starting_ray(point) if not on_ray(seg, seg.p1)}
+    status = SweepStatus(point, stats)
+    status.prepare(obstacles.rows, obstacles.pieces)
+    for seg in crossing:
+        status.add(seg)
+
+    # for each group of points (they are sorted by angle)
+    for k, group in enumerate(groups):
+
+        # find the closest segment on the ray and side of its line on which point lies
+        front = status.first()
+        if front:
+            side = orient(*front, point)
+
+        # point is visible if it does not lie behind the closest segment and no segment ends before it on the ray
+        # (segments lying on the ray do not block it)
+        blocked = False
+        for p in group:
+            if not blocked and p in points and (not reduced or is_tangent(Segment(point, p), obstacles.tangents)):
+                if stats is not None and front:
+                    stats.count('intersection tests')
+                if (not front or orient(*front, p) * side >= 0) and not is_diagonal(Segment(point, p), obstacles.cones):
+                    yield p
+            elif stats is not None:
+                stats.count('early outs')
+            if any(not on_ray(seg, p) for seg in segments.get(p, ())):
+                blocked = True
+
+        update_status(status, k, group, order, segments, crossing, on_ray)
+
 
-    # remove point from points
-    points = filter(lambda x: x != point, points)
+def group_events(point: Point, events: List[Point], stats: Optional[Stats] = None) \
+        -> Tuple[List[List[Point]], Dict[Point, int]]:
+    """
+    Groups events (in angular order) lying on the same ray from point and sorts groups by distance.
+    Returns groups and dict that maps events to numbers of their groups.
+    """
+    # points created by splitting segments may have rounded angles, so they are not sorted already
+    groups = []
+    for p in events:
+        if groups and same_direction(point, groups[-1][0], p):
+            groups[-1].append(p)
+        else:
+            groups.append([p])
+    for group in groups:
+        if len(group) > 1:
+            group.sort(key=lambda x: dist(point, x))
+            if stats is not None:
+                stats.count('sorts')
+    return groups, {p: k for k, group in enumerate(groups) for p in group}
 
-    # sort points first by angle and then by distance from point
-    points = sorted(points, key=lambda x: (angle_to_xaxis(point, x), dist(point, x)))
 
-    # create sorted list from segments that cross starting ray
-    # list is sorted using ray that has to be updated
-    ray = Segment(point, Point(point.x + 1, point.y))
-    status = SortedList(
-        iterable=(
-            seg
-            for seg in set(chain(*segments.values()))
-            if intersection(*ray, *seg, restriction_1='ray', restriction_2='segment') and point not in seg
-        ),
-        key=status_key(lambda: ray)
+def on_ray_test(point: Point, order: Dict[Point, int], obstacles: Obstacles) -> Callable[[Segment, Point], bool]:
+    """
+    Returns function that tells whether segment (given with one of its ends) lies on line going through point,
+    such segments are never crossed by rays. Order maps events to their groups (see group_events).
+    Lines of original segments going through point are found for all segments at once.
+    """
+    lines, rows = obstacles.lines, obstacles.rows
+    collinear = (batch.orient(lines[:, :2], lines[:, 2:], np.array(tuple(point), dtype=float)) == 0).tolist()
+
+    def on_ray(seg: Segment, p: Point) -> bool:
+        other = seg.p1 if seg.p2 == p else seg.p2
+        return other == point or order[other] == order[p] or collinear[rows[seg]]
+    return on_ray
+
+
+def update_status(status: SweepStatus, k: int, group: List[Point], order: Dict[Point, int],
+                  segments: Dict[Point, List[Segment]], crossing: Set[Segment],
+                  on_ray: Callable[[Segment, Point], bool]):
+    """ Updates status after the ray passed k-th group of events. """
+    # segments start or end at the ray, depending on which end is visited first
+    # (segments that cross starting ray are visited in reversed order)
+    started, ended = [], []
+    for p in group:
+        for seg in segments.get(p, ()):
+            if on_ray(seg, p):
+                continue
+            other = seg.p1 if seg.p2 == p else seg.p2
+            if (order[other] > k) != (seg in crossing):
+                started.append(seg)
+            else:
+                ended.append(seg)
+
+    for seg in ended:
+        status.remove(seg)
+    for seg in started:
+        status.add(seg)
+
+
+def reorder_close(point: Point, events: List[Point], positions: List[int]):
+    """ Sorts again runs of events, where each given position starts pair of events with close pseudo angles. """
+    key = cmp_to_key(lambda a, b: compare_angles(point, a, b))
+    k = 0
+    while k < len(positions):
+        end = k
+        while end + 1 < len(positions) and positions[end + 1] == positions[end] + 1:
+            end += 1
+        first, last = positions[k], positions[end] + 2
+        events[first:last] = sorted(events[first:last], key=key)
+        k = end + 1
+
+
+def compare_angles(point: Point, a: Point, b: Point) -> int:
+    """ Compares angles of points a and b around given point, measured counterclockwise from x-axis. """
+    upper_a = a.y > point.y or (a.y == point.y and a.x > point.x)
+    upper_b = b.y > point.y or (b.y == point.y and b.x > point.x)
+    if upper_a != upper_b:
+        return -1 if upper_a else 1
+    o = orient(point, a, b)
+    return -1 if o > 0 else 1 if o < 0 else 0
+
+
+def same_direction(point: Point, a: Point, b: Point) -> bool:
+    """ Returns whether points a and b lie on the same ray starting at point. """
+    return orient(point, a, b) == 0 and (a.x - point.x) * (b.x - point.x) + (a.y - point.y) * (b.y - point.y) > 0
+
+
+def split_segments(segments: Iterable[Segment], points: Iterable[Point]) -> Dict[Segment, Segment]:
+    """
+    Splits segments in points where they cross or touch each other and in given points lying inside of them.
+    Returns dict that maps resulting segments, that have disjoint interiors and no point inside, to original ones.
+    """
+
+    # segments of length 0 are not obstacles
+    segments = [seg for seg in set(segments) if seg.p1 != seg.p2]
+    points = sorted(set(points).union(chain(*segments)))
+    points_x = [p.x for p in points]
+
+    # points in which segments have to be split
+    cuts = defaultdict(set)
+
+    # sort segments by left end, so that only segments overlapping on x-axis are compared
+    segments.sort(key=lambda s: min(s.p1.x, s.p2.x))
+    for i, a in enumerate(segments):
+        left, right = sorted((a.p1.x, a.p2.x))
+
+        # points inside of segment
+        for p in points[bisect_left(points_x, left):bisect_right(points_x, right)]:
+            if lies_inside(p, a):
+                cuts[a].add(p)
+
+        # crossings with other segments
+        for b in segments[i+1:]:
+            if min(b.p1.x, b.p2.x) > right:
+                break
+            p = crossing(a, b)
+            if p is not None:
+                cuts[a].add(p)
+                cuts[b].add(p)
+
+    # split segments
+    result = {}
+    for seg in segments:
+        p1, p2 = seg
+        ordered = sorted(cuts[seg], key=lambda p: dist(p1, p))
+        for a, b in zip([p1] + ordered, ordered + [p2]):
+            if a != b:
+                result[Segment(a, b)] = seg
+    return result
+
+
+def lies_inside(p: Point, seg: Segment) -> bool:
+    """ Returns whether point lies inside of segment (excluding its ends). """
+    a, b = seg
+    return (
+        orient(a, b, p) == 0 and p != a and p != b
+        and min(a.x, b.x) <= p.x <= max(a.x, b.x) and min(a.y, b.y) <= p.y <= max(a.y, b.y)
     )
 
-    # for each point (they are sorted by angle)
-    for p in points:
-
-        # update ray
-        ray = Segment(point, p)
-
-        # if p is visible yield it
-        if status.bisect_left(p) == 0:
-            yield p
-
-        # remove segments from this point
-        for seg in segments[p]:
-            if orient(point, p, seg.p1 if seg.p2 == p else seg.p2) < 0:
-                status.remove(seg)
-
-        # add segments to this point
-        for seg in segments[p]:
-            if orient(point, p, seg.p1 if seg.p2 == p else seg.p2) > 0:
-                status.add(seg)
-
-
-def status_key(ray_getter: Callable[[], Segment]):
-    """ Creates comparision for status structure key that pulls current ray from given function. """
-
-    def compare(a: Union[Point, Segment], b: Union[Point, Segment]):
-        # get current ray
-        ray = ray_getter()
-
-        if isinstance(a, Point) and isinstance(b, Point):
-            return dist(ray.p1, a) - dist(ray.p2, b)
-
-        if isinstance(a, Point) and isinstance(b, Segment):
-            pb = intersection(*ray, *b, restriction_1='ray', restriction_2='segment')
-            dist_a = dist(ray.p1, a)
-            dist_b = dist(ray.p1, pb)
-            if dist_a == dist_b:
-                return -1
-            return dist_a - dist_b
-
-        if isinstance(a, Segment) and isinstance(b, Point):
-            pa = intersection(*ray, *a, restriction_1='ray', restriction_2='segment')
-            dist_a = dist(ray.p1, pa)
-            dist_b = dist(ray.p1, b)
-            if dist_a == dist_b:
-                return 1
-            return dist_a - dist_b
-
-        if isinstance(a, Segment) and isinstance(b, Segment):
-            pa = intersection(*ray, *a, restriction_1='ray', restriction_2='segment')
-            pb = intersection(*ray, *b, restriction_1='ray', restriction_2='segment')
-            dist_a = dist(ray.p1, pa)
-            dist_b = dist(ray.p1, pb)
-            if dist_a == dist_b:
-                pa2 = a.p1 if a.p2 == pa else a.p2
-                pb2 = b.p1 if b.p2 == pb else b.p2
-                return angle_between_points(ray.p1, ray.p2, pa2) - angle_between_points(ray.p1, ray.p2, pb2)
-            return dist_a - dist_b
-
-        raise ValueError(f'Comparator got unexpected types: {type(a)}, {type(b)}')
-
-    # noinspection PyTypeChecker
-    return cmp_to_key(compare)
+
+def crossing(a: Segment, b: Segment) -> Optional[Point]:
+    """
+    Returns point in which insides of given segments cross (or None).
+    Point is calculated exactly and then rounded, so that crossings of many segments in one point are equal.
+    Pieces of segments split at it are therefore not exactly on their segments.
+    """
+    if orient(*a, b.p1) * orient(*a, b.p2) >= 0 or orient(*b, a.p1) * orient(*b, a.p2) >= 0:
+        return None
+    p1, p2, p3, p4 = (Point(Fraction(p.x), Fraction(p.y)) for p in chain(a, b))
+    t, _ = parametric_intersection(p1, p2, p3, p4)
+    return Point(float(p1.x + t * (p2.x - p1.x)), float(p1.y + t * (p2.y - p1.y)))
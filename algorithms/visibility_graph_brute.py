@@ -1,70 +1,448 @@
 from collections import defaultdict
-from itertools import combinations
-from typing import Dict, List
+from typing import Dict, List, Tuple, Iterable, Iterator, Optional
 
-from geometry import Segment, intersection, Collection, Point, Polygon, angle_to_xaxis, orient
+import numpy as np
 
+from algorithms.stats import Stats, timed
+from geometry import Segment, Collection, Point, Polygon, orient, inside_angle, batch
+from geometry.grid import SegmentTable
 
-def visibility_graph_brute(collection: Collection) -> Collection:
-    """ Generates visibility graph in O(n^3) """
+# maximal number of segment pairs checked at once
+CHUNK_SIZE = 2 ** 20
+
+# minimal number of obstacles for which candidates are found in spatial index, fewer segments are checked all at
+# once faster (measured on benchmark scenes, index starts to pay off between 150 and 250 segments)
+INDEX_MIN_SEGMENTS = 192
+
+# maximal number of segments from point checked at once using spatial index (each has few candidate obstacles)
+INDEX_CHUNK_SIZE = 2 ** 14
+
+# length (in cells of spatial index) of the first parts around ends of segments checked for obstacles
+NEAR_CELLS = 1
+
+# segments not longer than that (in cells of spatial index) are checked whole at once, without growing parts
+SHORT_CELLS = 4
+
+
+def visibility_graph_brute(collection: Collection, reduced: bool = False, stats: Optional[Stats] = None) \
+        -> Collection:
+    """
+    Generates visibility graph in O(n^3)
+    Reduced graph has only edges that can be part of shortest paths (see is_tangent), shortest paths in it
+    are the same as in full graph, as long as obstacles do not cross each other.
+    If stats are given, counts of operations and times of phases are added to them.
+    """
 
     # create graph
-    graph = Collection(points=collection.all_points)
+    graph = Collection(points=set(collection.all_points))
 
-    # get all segments
-    segments = collection.all_segments
+    with timed(stats, 'preprocess'):
+        # get all segments (segments of length 0 are not obstacles)
+        obstacles = [seg for seg in collection.all_segments if seg.p1 != seg.p2]
+        segments = batch.segments_array(obstacles)
 
-    # get polygons for each point
-    polygons = defaultdict(list)
-    for poly in collection.polygons:
-        for p in poly.points:
-            polygons[p].append(poly)
+        # many segments are filtered using spatial index of collection
+        table = segment_table(collection, obstacles)
 
-    # for each pair of points
-    for p1, p2 in combinations(collection.all_points, 2):
-        s = Segment(p1, p2)
+        # flat arrays of points are cached by collection
+        points, coordinates = collection.arrays.points, collection.arrays.coordinates
 
-        # if this segment is a diagonal of polygon ignore it
-        # if is_diagonal(s, polygons):
-        #     continue
+        # get interior angles of polygons for each point
+        cones = polygon_cones(collection.polygons)
+        wedges = cone_array(points, cones)
+        angles = tangent_array(points, polygon_tangents(collection, cones)) if reduced else None
 
-        # if segment intersects with any other segment
-        if any(
-                intersection(*s, *seg, restriction_1='segment', restriction_2='segment')
-                for seg in segments
-                if (p1 not in seg) and (p2 not in seg)
-        ):
-            continue
+    # for each pair of points
+    for i, p1 in enumerate(points):
+        with timed(stats, 'check'):
+            visible = list(visible_following(i, points, coordinates, segments, wedges, table, angles, stats))
 
         # add to graph
-        graph.segments.add(s)
+        with timed(stats, 'output'):
+            graph.segments.update(Segment(p1, p2) for p2 in visible)
 
     return graph
 
 
-def is_diagonal(s: Segment, polygons: Dict[Point, List[Polygon]]) -> bool:
-    """ Returns whether given segment is a diagonal of any polygon. """
-    # FIXME: that does not work always
+def visible_following(i: int, points: List[Point], coordinates: np.ndarray, segments: np.ndarray,
+                      wedges: Optional[np.ndarray] = None, table: Optional[SegmentTable] = None,
+                      angles: Optional[np.ndarray] = None, stats: Optional[Stats] = None) -> Iterator[Point]:
+    """
+    Yields points following i-th point in given list, that can be seen from it.
+    Coordinates are array of given points and segments are array of obstacles (see geometry.batch).
+    Checks are done from the cheapest: segments entering interior of polygon at one of their ends (wedges of points
+    are given by cone_array) and segments that are not tangent at both ends (if angles of points are given,
+    see tangent_array) are skipped before obstacles are checked.
+    If table of spatial index is given, segments are checked only against obstacles in cells they touch.
+    """
+    # segments from point are checked at once in chunks
+    chunk = max(1, CHUNK_SIZE // max(1, len(segments))) if table is None else INDEX_CHUNK_SIZE
+    wedge = wedges[i:i + 1] if wedges is not None else None
+    angle = angles[i] if angles is not None else None
+    for start in range(i + 1, len(points), chunk):
+        candidates = np.arange(start, min(start + chunk, len(points)))
+        visible = visible_candidates(coordinates[i], candidates, coordinates, segments, wedge, wedges, angle, angles,
+                                     table, stats)
+        for k in visible.tolist():
+            yield points[k]
+
+
+def visible_candidates(source: np.ndarray, candidates: np.ndarray, coordinates: np.ndarray, segments: np.ndarray,
+                       wedge: Optional[np.ndarray] = None, wedges: Optional[np.ndarray] = None,
+                       angle: Optional[np.ndarray] = None, angles: Optional[np.ndarray] = None,
+                       table: Optional[SegmentTable] = None, stats: Optional[Stats] = None) -> np.ndarray:
+    """
+    Returns candidates (indices of coordinates) that can be seen from source point (array of its coordinates).
+    Wedge and angle are rows of cone_array and tangent_array for source, wedges and angles are their arrays for
+    coordinates, checks are done as in visible_following.
+    """
+    ends = coordinates[candidates]
+
+    # segments going through interior of polygon are skipped
+    if wedges is not None:
+        outside = ~diagonal_mask(np.broadcast_to(source, ends.shape), ends, wedge)
+        outside[outside] = ~diagonal_mask(ends[outside], source, wedges[candidates[outside]])
+        ends, candidates = ends[outside], candidates[outside]
+        if stats is not None:
+            stats.count('early outs', len(outside) - len(candidates))
+
+    # segments that are not tangent are skipped
+    if angles is not None:
+        p = np.broadcast_to(source, ends.shape)
+        tangent = tangent_mask(p, ends, angle) & tangent_mask(ends, p, angles[candidates])
+        ends, candidates = ends[tangent], candidates[tangent]
+        if stats is not None:
+            stats.count('early outs', len(tangent) - len(candidates))
+
+    # if segment is blocked by any other segment
+    queries = np.hstack((np.broadcast_to(source, ends.shape), ends))
+    if table is None:
+        blocked = obstructed(queries, segments).any(axis=1)
+        tests = len(queries) * len(segments)
+    else:
+        blocked, tests = obstructed_candidates(queries, segments, table)
+    if stats is not None:
+        stats.count('intersection tests', tests)
+    return candidates[~blocked]
+
+
+class Sightlines:
+    """
+    Obstacles of collection prepared for brute force queries of points of collection visible from any point
+    (like visible_vertices of the sweep, but vectorized, see algorithms.visibility_graph on choice of engine).
+    Prepared arrays can be updated after changes of collection (see update), table of spatial index and tangents
+    of polygons are prepared on first query that needs them.
+    """
+
+    def __init__(self, collection: Collection, points: Optional[List[Point]] = None):
+        """ Prepares queries of given points (all points of collection by default). """
+        self.collection = collection
+        if points is None:
+            points, coordinates = collection.arrays.points, collection.arrays.coordinates
+        else:
+            coordinates = batch.points_array(points)
+        # arrays are copied, since they are changed in place by updates
+        self.points, self.coordinates = list(points), coordinates.copy()
+        self.rows = {p: k for k, p in enumerate(self.points)}
+        self.obstacles = [seg for seg in collection.all_segments if seg.p1 != seg.p2]
+        self.segments = batch.segments_array(self.obstacles)
+        self.segment_rows = {seg: k for k, seg in enumerate(self.obstacles)}
+        self.cones = polygon_cones(collection.polygons)
+        self.wedges = cone_array(self.points, self.cones)
+        self._table, self._tangents, self._angles = None, None, None
+        self._prepared = False
+
+    @property
+    def table(self) -> Optional[SegmentTable]:
+        """ Table of spatial index of obstacles (see segment_table), prepared again after obstacles change. """
+        if not self._prepared:
+            self._table, self._prepared = segment_table(self.collection, self.obstacles), True
+        return self._table
+
+    @property
+    def tangents(self) -> Dict[Point, Tuple[Point, Point]]:
+        """ Tangents of polygons (see polygon_tangents), prepared again after collection changes. """
+        if self._tangents is None:
+            self._tangents = polygon_tangents(self.collection, self.cones)
+        return self._tangents
+
+    @property
+    def angles(self) -> np.ndarray:
+        """ Array of tangents of points (see tangent_array), prepared again after collection changes. """
+        if self._angles is None:
+            self._angles = tangent_array(self.points, self.tangents)
+        return self._angles
+
+    def visible(self, point: Point, reduced: bool = False, candidates: Optional[np.ndarray] = None) -> List[Point]:
+        """
+        Returns points that can be seen from given point (other than point itself).
+        If reduced, only points of segments that can be part of shortest paths are returned (see is_tangent).
+        If candidates (rows of points) are given, only they are checked.
+        """
+        wedge = cone_array([point], self.cones)
+        angle = tangent_array([point], self.tangents)[0] if reduced else None
+        source = np.array(tuple(point), dtype=float)
+        if candidates is None:
+            candidates = np.arange(len(self.points))
+        candidates = candidates[(self.coordinates[candidates] != source).any(axis=1)]
+        chunk = max(1, CHUNK_SIZE // max(1, len(self.segments))) if self.table is None else INDEX_CHUNK_SIZE
+        return [
+            self.points[k]
+            for start in range(0, len(candidates), chunk)
+            for k in visible_candidates(
+                source, candidates[start:start + chunk], self.coordinates, self.segments, wedge, self.wedges, angle,
+                self.angles if reduced else None, self.table
+            ).tolist()
+        ]
+
+    def update(self, added_points: Iterable[Point] = (), removed_points: Iterable[Point] = (),
+               added_segments: Iterable[Segment] = (), removed_segments: Iterable[Segment] = (),
+               added_polygons: Iterable[Polygon] = (), removed_polygons: Iterable[Polygon] = ()):
+        """
+        Updates prepared arrays after given changes of collection, instead of preparing them again.
+        Removed rows are replaced by the last ones, so rows of other points and segments may change.
+        """
+        self.coordinates, moved = swap_remove(self.points, self.rows, removed_points, self.coordinates)
+        self.segments, _ = swap_remove(self.obstacles, self.segment_rows, removed_segments, self.segments)
+
+        # cones change only at points of changed polygons
+        changed = set(moved)
+        for polygons, added in ((removed_polygons, False), (added_polygons, True)):
+            for p, point_cones in polygon_cones(polygons).items():
+                changed.add(p)
+                if added:
+                    self.cones[p].extend(point_cones)
+                    continue
+                for cone in point_cones:
+                    self.cones[p].remove(cone)
+                if not self.cones[p]:
+                    del self.cones[p]
+
+        # new rows are appended
+        added_points = [p for p in added_points if p not in self.rows]
+        added_segments = [seg for seg in added_segments if seg.p1 != seg.p2 and seg not in self.segment_rows]
+        for p in added_points:
+            self.rows[p] = len(self.points)
+            self.points.append(p)
+        for seg in added_segments:
+            self.segment_rows[seg] = len(self.obstacles)
+            self.obstacles.append(seg)
+        self.coordinates = np.concatenate((self.coordinates, batch.points_array(added_points)))
+        self.segments = np.concatenate((self.segments, batch.segments_array(added_segments)))
+
+        # wedges of new points and points with changed cones are computed again
+        if not self.cones:
+            self.wedges = None
+        elif self.wedges is None or self.wedges.shape[1] < max(len(c) for c in self.cones.values()):
+            self.wedges = cone_array(self.points, self.cones)
+        else:
+            size = self.wedges.shape[1]
+            self.wedges = np.concatenate((
+                self.wedges[:len(self.points) - len(added_points)], np.full((len(added_points), size, 4), np.nan)
+            ))
+            for k in (self.rows[p] for p in changed.union(added_points) if p in self.rows):
+                self.wedges[k] = np.nan
+                for m, (a, c) in enumerate(self.cones[self.points[k]] if self.points[k] in self.cones else ()):
+                    self.wedges[k, m] = (*a, *c)
+
+        if removed_segments or added_segments:
+            self._table, self._prepared = None, False
+        self._tangents, self._angles = None, None
+
 
-    for poly in polygons[s.p1]:
-        # ignore if second point is not in this polygon
-        if s.p2 not in poly.points:
+def swap_remove(items: List, rows: Dict, removed: Iterable, array: np.ndarray) -> Tuple[np.ndarray, List]:
+    """
+    Removes given items from list (in place) and corresponding rows of array, by moving the last items in their
+    places. Rows maps items to their indices and is updated. Returns array without removed rows and moved items.
+    """
+    moved = []
+    for item in removed:
+        k = rows.pop(item, None)
+        if k is None:
             continue
+        last = items.pop()
+        if k < len(items):
+            items[k], rows[last] = last, k
+            array[k] = array[len(items)]
+            moved.append(last)
+    return array[:len(items)], moved
 
-        # ignore if segment is an edge of polygon
-        if s in poly.segments:
+
+def obstructed(queries: np.ndarray, segments: np.ndarray) -> np.ndarray:
+    """ Vectorized version of obstructs, returns (M, N) mask of segments that obstruct query segments. """
+    return obstructed_pairs(queries[:, None, :], segments)
+
+
+def segment_table(collection: Collection, obstacles: List[Segment]) -> Optional[SegmentTable]:
+    """ Returns table of spatial index of collection with given obstacles, if there are enough of them. """
+    if len(obstacles) < INDEX_MIN_SEGMENTS:
+        return None
+    return collection.index.table({seg: k for k, seg in enumerate(obstacles)})
+
+
+def obstructed_candidates(queries: np.ndarray, segments: np.ndarray, table: SegmentTable) \
+        -> Tuple[np.ndarray, int]:
+    """
+    Returns mask of query segments obstructed by any of segments found in cells they touch
+    and number of checked pairs.
+    Most blocked segments are blocked close to their ends, so obstacles are checked in parts of segments growing
+    from both ends (each twice as long as the previous one) and segments blocked in some part are not checked further.
+    Short segments (see SHORT_CELLS) touch few cells, so they are checked whole at once.
+    """
+    p, w = queries[:, :2], queries[:, 2:]
+    length = batch.dist(p, w)
+    short = length <= SHORT_CELLS * table.cell_size
+    blocked = np.zeros(len(queries), dtype=bool)
+    lines, start, tests = np.arange(len(queries)), np.zeros(len(queries)), 0
+    reach = NEAR_CELLS * table.cell_size
+    while len(lines):
+        # parts of segments between parameters start and end from both ends (parameters go up to the middle)
+        with np.errstate(divide='ignore'):
+            end = np.where(short[lines], 0.5, np.minimum(0.5, reach / length[lines]))
+        a, d = p[lines], w[lines] - p[lines]
+        parts = np.concatenate((
+            np.hstack((a + d * start[:, None], a + d * end[:, None])),
+            np.hstack((a + d * (1 - end)[:, None], a + d * (1 - start)[:, None]))
+        ))
+        k, j = table.candidates(parts)
+        blocked[lines] = obstructed_some(queries[lines], segments, k % len(lines), j)
+        tests += len(k)
+
+        unfinished = ~blocked[lines] & (end < 0.5)
+        lines, start, reach = lines[unfinished], end[unfinished], reach * 2
+    return blocked, tests
+
+
+def obstructed_some(queries: np.ndarray, segments: np.ndarray, k: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """ Returns mask of query segments obstructed by any of paired segments (k-th query with j-th segment). """
+    mask = obstructed_pairs(queries[k], segments[j])
+    return np.bincount(k[mask], minlength=len(queries)) > 0
+
+
+def obstructed_pairs(queries: np.ndarray, segments: np.ndarray) -> np.ndarray:
+    """ Vectorized version of obstructs, returns mask of segments that obstruct corresponding query segments. """
+    p, w, a, b = queries[..., :2], queries[..., 2:], segments[..., :2], segments[..., 2:]
+    o1 = batch.orient(p, w, a)
+    o2 = batch.orient(p, w, b)
+    o3 = batch.orient(a, b, p)
+    o4 = batch.orient(a, b, w)
+    return ~(o1 * o2 > 0) & ~((o1 == 0) & (o2 == 0)) & ~(o3 * o4 > 0) & (o3 != 0) & (o4 != 0)
+
+
+def obstructs(seg: Segment, s: Segment) -> bool:
+    """
+    Returns whether segment seg has common point with segment s other than ends of s.
+    Segments lying on the same line as s do not obstruct it, so that s can go along them.
+    """
+    p, w = s
+    a, b = seg
+    o1 = orient(p, w, a)
+    o2 = orient(p, w, b)
+
+    # segments do not intersect or lie on the same line
+    if o1 * o2 > 0 or (o1 == 0 and o2 == 0):
+        return False
+    o3 = orient(a, b, p)
+    o4 = orient(a, b, w)
+    if o3 * o4 > 0:
+        return False
+
+    # segments intersect in single point, which is end of s only if it lies on line of seg
+    return o3 != 0 and o4 != 0
+
+
+def polygon_cones(polygons: Iterable[Polygon]) -> Dict[Point, List[Tuple[Point, Point]]]:
+    """
+    Returns dict that maps polygon points to interior angles of polygons at them.
+    Each angle is given as pair of points (a, c), so that interior is counterclockwise from [p, a] to [p, c].
+    """
+    cones = defaultdict(list)
+    for poly in polygons:
+        points = poly.points
+        area = poly.area
+        if area == 0:
             continue
+        for i, p in enumerate(points):
+            prev, nxt = points[i-1], points[(i+1) % len(points)]
+            cones[p].append((nxt, prev) if area > 0 else (prev, nxt))
+    return cones
+
+
+def cone_array(points: List[Point], cones: Dict[Point, List[Tuple[Point, Point]]]) -> Optional[np.ndarray]:
+    """
+    Returns (N, K, 4) array of interior angles (see polygon_cones) of given points, padded with NaN to the largest
+    number K of angles at one point, or None if there are no polygons.
+    """
+    if not cones:
+        return None
+    size = max(len(point_cones) for point_cones in cones.values())
+    wedges = np.full((len(points), size, 4), np.nan)
+    for n, p in enumerate(points):
+        for m, (a, c) in enumerate(cones.get(p, ())):
+            wedges[n, m] = (*a, *c)
+    return wedges
+
 
-        # ignore if segment is an outer diagonal
-        i1 = poly.points.index(s.p1)
-        i2 = poly.points.index(s.p2)
-        if i1 > i2:
-            i1, i2 = i2, i1
-        if orient(poly.points[i1], poly.points[i2], poly.points[i2-1]) > 0:
+def polygon_tangents(collection: Collection, cones: Dict[Point, List[Tuple[Point, Point]]]) \
+        -> Dict[Point, Tuple[Point, Point]]:
+    """
+    Returns dict that maps polygon points, around which shortest paths can only bend along one polygon,
+    to their interior angles (as in polygon_cones). Points at which other segments end or which lie inside
+    of other segments are left out, since paths may bend there around other obstacles.
+    """
+    tangents = {}
+    for p, point_cones in cones.items():
+        incident = [seg for seg in collection.incident.get(p, ()) if seg.p1 != seg.p2]
+        if len(point_cones) != 1 or len(incident) != 2:
             continue
-        if orient(poly.points[i2], poly.points[i1], poly.points[i1-1]) > 0:
+        if any(
+                p not in seg and orient(*seg, p) == 0
+                and min(seg.p1.x, seg.p2.x) <= p.x <= max(seg.p1.x, seg.p2.x)
+                and min(seg.p1.y, seg.p2.y) <= p.y <= max(seg.p1.y, seg.p2.y)
+                for seg in collection.index.segments_crossing(p, p)
+        ):
             continue
+        tangents[p] = point_cones[0]
+    return tangents
+
+
+def is_tangent(s: Segment, tangents: Dict[Point, Tuple[Point, Point]]) -> bool:
+    """
+    Returns whether given segment can be part of shortest path, that is at both of its ends it does not lie
+    between polygon sides (on the line) and does not end in reflex polygon point.
+    """
+    for p, w in ((s.p1, s.p2), (s.p2, s.p1)):
+        if p in tangents:
+            a, c = tangents[p]
+            if orient(p, a, c) < 0 or orient(p, w, a) * orient(p, w, c) < 0:
+                return False
+    return True
+
+
+def tangent_array(points: List[Point], tangents: Dict[Point, Tuple[Point, Point]]) -> np.ndarray:
+    """ Returns (N, 4) array of interior angles (see polygon_tangents) of given points, NaN for other points. """
+    return np.array([(*tangents[p][0], *tangents[p][1]) if p in tangents else (np.nan,) * 4 for p in points],
+                    dtype=float).reshape(-1, 4)
+
+
+def tangent_mask(p: np.ndarray, w: np.ndarray, angles: np.ndarray) -> np.ndarray:
+    """ Vectorized version of is_tangent at one end, angles are rows of tangent_array for points p. """
+    a, c = angles[..., :2], angles[..., 2:]
+    tangent = (batch.orient(p, a, c) >= 0) & (batch.orient(p, w, a) * batch.orient(p, w, c) >= 0)
+    return np.isnan(angles[..., 0]) | tangent
+
+
+def diagonal_mask(p: np.ndarray, w: np.ndarray, wedges: np.ndarray) -> np.ndarray:
+    """ Vectorized version of is_diagonal at one end, wedges are rows of cone_array for points p. """
+    a, c = wedges[..., :2], wedges[..., 2:]
+    inside = batch.inside_angle(a, p[..., None, :], c, w[..., None, :]) & ~np.isnan(wedges[..., 0])
+    return inside.any(axis=-1)
 
-        return True
 
+def is_diagonal(s: Segment, cones: Dict[Point, List[Tuple[Point, Point]]]) -> bool:
+    """ Returns whether given segment enters interior of any polygon at one of its ends. """
+    for p, w in ((s.p1, s.p2), (s.p2, s.p1)):
+        for a, c in cones.get(p, ()):
+            if inside_angle(a, p, c, w):
+                return True
     return False
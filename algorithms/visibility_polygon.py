@@ -0,0 +1,91 @@
+""" Regions visible from single points (visibility polygons), computed by the rotational sweep. """
+from typing import Iterator, List, Optional, Sequence
+
+from algorithms.status import SweepStatus
+from algorithms.visibility_graph import Obstacles, group_events, on_ray_test, update_status, lies_inside
+from geometry import Collection, Point, Segment, Polygon, intersection
+
+# margin of box enclosing obstacles and query points, relative to its size
+BOX_MARGIN = 0.1
+
+
+def visibility_polygon(collection: Collection, point: Point) -> Polygon:
+    """ Returns region visible from given point (see visibility_polygons). """
+    return next(visibility_polygons(collection, [point]))
+
+
+def visibility_polygons(collection: Collection, points: Sequence[Point]) -> Iterator[Polygon]:
+    """
+    Yields regions visible from given points, in O(n log n) time each. Obstacles are prepared once and angular orders
+    of their vertices are computed for many points at once.
+    Regions are bounded by box slightly larger than obstacles and points, vertices of regions are in counterclockwise
+    order. Points must not lie on segments or sides of polygons (points in polygons see their interiors).
+    """
+    points = list(points)
+    obstacles = Obstacles.from_collection(enclosed(collection, points))
+    for point, events in zip(points, obstacles.angular_orders(points)):
+        yield Polygon(*visible_region(point, obstacles, events))
+
+
+def enclosed(collection: Collection, points: Sequence[Point]) -> Collection:
+    """ Returns collection with segments of box that encloses obstacles of given collection and given points. """
+    coordinates = list(collection.all_points) + list(points)
+    if not coordinates:
+        return collection
+    min_x, max_x = min(p.x for p in coordinates), max(p.x for p in coordinates)
+    min_y, max_y = min(p.y for p in coordinates), max(p.y for p in coordinates)
+    margin = max(max_x - min_x, max_y - min_y) * BOX_MARGIN or 1.0
+    corners = [
+        Point(min_x - margin, min_y - margin), Point(max_x + margin, min_y - margin),
+        Point(max_x + margin, max_y + margin), Point(min_x - margin, max_y + margin),
+    ]
+    box = {Segment(corners[i - 1], corners[i]) for i in range(len(corners))}
+    return Collection(points=set(collection.points), segments=collection.segments | box,
+                      polygons=set(collection.polygons))
+
+
+def visible_region(point: Point, obstacles: Obstacles, events: Optional[List[Point]] = None) -> List[Point]:
+    """
+    Returns vertices (in counterclockwise order) of region visible from given point, which must be enclosed
+    by obstacles, so that every ray from point hits some segment.
+    Events are vertices of obstacles in angular order (see Obstacles.angular_orders), computed if not given.
+    Raises ValueError if point lies on segment.
+    """
+    if any(point in seg or lies_inside(point, seg) for seg in obstacles.index.segments_crossing(point, point)):
+        raise ValueError(f'Point lies on obstacle: {point}')
+
+    if events is None:
+        events = next(obstacles.angular_orders([point]))
+    groups, order = group_events(point, events)
+    on_ray = on_ray_test(point, order, obstacles)
+    crossing = {seg for seg in obstacles.crossing_starting_ray(point) if not on_ray(seg, seg.p1)}
+    status = SweepStatus(point)
+    status.prepare(obstacles.rows, obstacles.pieces)
+    for seg in crossing:
+        status.add(seg)
+
+    # boundary of region follows the closest segment, it has vertices on rays where the closest segment changes
+    region = []
+    for k, group in enumerate(groups):
+        before = status.first()
+        update_status(status, k, group, order, obstacles.segments, crossing, on_ray)
+        after = status.first()
+        if before is None or after is None:
+            raise ValueError(f'Point is not enclosed by obstacles: {point}')
+        if before != after:
+            for seg in (before, after):
+                p = hit(point, group, seg)
+                if not region or region[-1] != p:
+                    region.append(p)
+
+    if len(region) > 1 and region[0] == region[-1]:
+        region.pop()
+    return region
+
+
+def hit(point: Point, group: List[Point], seg: Segment) -> Point:
+    """ Returns point in which ray from point through given group of events hits segment. """
+    for p in group:
+        if p in seg:
+            return p
+    return intersection(seg.p1, seg.p2, point, group[0])
@@ -5,3 +5,4 @@ from .algorithm_service import AlgorithmService
 from .draw_service import DrawService
 from .points_service import PointsCreateService
 from .remove_service import RemoveService
+from .dynamic_service import DynamicGraphService
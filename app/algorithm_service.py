@@ -1,20 +1,166 @@
-from typing import Callable
+import threading
+from queue import Queue, Empty
+from typing import Callable, Optional, Iterator, Union
 
 import arcade
+import numpy as np
 
+from algorithms.cache import GraphCache
+from algorithms.stats import Stats, timed
 from app.draw_service import DrawService
-from geometry import Collection
+from geometry import Collection, Point, Segment, Polygon
+
+STATS_COLOR = arcade.color.GRAY
+STATS_FONT_SIZE = 10
+
+# minimal time between updates of displayed graph while it is built (each update uploads whole graph again)
+REFRESH_INTERVAL = 0.25
+
+
+class Run:
+    """
+    Computation of graph in worker thread. Worker puts batches of edges and finally the graph (or error) to results.
+    Only runs that yield batches are cancellable: their worker checks cancelled between batches. Other runs can't be
+    interrupted, they always run to the end.
+    """
+
+    def __init__(self, target: Callable[['Run'], None], cancellable: bool):
+        self.results: Queue = Queue()
+        self.cancelled = threading.Event()
+        self.cancellable = cancellable
+        self.thread = threading.Thread(target=target, args=(self,), daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def busy(self) -> bool:
+        """ Returns whether run can't be cancelled and is still computing. """
+        return not self.cancellable and self.thread.is_alive()
 
 
 class AlgorithmService(DrawService):
-    """ Service that applies given algorithm to data and displays results. """
+    """
+    Service that applies given algorithm to data and displays results.
+    Graph is computed in worker thread from snapshot of source collection, so the editor stays responsive,
+    and is computed again from new snapshot if source collection changes meanwhile.
+    If edges function is given (like algorithms.visibility_edges), graph is built from batches of edges it yields
+    (instead of by algorithm) and they are displayed as they come.
+    Only runs of edges function can be cancelled (between batches). Runs of algorithm can't be interrupted, so
+    a restart requested while one of them computes waits until it finishes, and at most one of them runs at a time.
+    If show_stats is set, algorithm (or edges function) has to take stats argument and its stats are displayed
+    as well.
+    If cache is given, graph is computed again only when content of source collection changed.
+    """
 
-    def __init__(self, key: int, source_collection: Collection, algorithm: Callable[[Collection], Collection]):
+    def __init__(self, key: int, source_collection: Collection, algorithm: Callable[..., Collection],
+                 show_stats: bool = False, cache: Optional[GraphCache] = None,
+                 edges: Optional[Callable[..., Iterator[np.ndarray]]] = None):
         super().__init__(Collection(), dict(color=arcade.color.CATALINA_BLUE))
         self.key = key
         self.source_collection = source_collection
         self.algorithm = algorithm
+        self.show_stats = show_stats
+        self.cache = cache
+        self.cache_key = GraphCache.name(algorithm)
+        self.cache_lock = threading.Lock()
+        self.edges = edges
+        self.stats: Optional[Stats] = None
+        self.run: Optional[Run] = None
+        self.changed = False
+        self.since_refresh = 0.0
+        source_collection.subscribe(self.on_change)
 
     def on_key_release(self, symbol: int, modifiers: int):
         if symbol == self.key:
-            self.collection = self.algorithm(self.source_collection)
+            if self.run is not None and self.run.busy():
+                self.changed = True
+            else:
+                self.start()
+
+    def on_change(self, element: Union[Point, Segment, Polygon], added: bool):
+        # computation is restarted in next update, so that many changes at once restart it once
+        self.changed = self.run is not None
+
+    def start(self):
+        """ Cancels running computation and starts computing graph of current content of source collection. """
+        if self.run is not None:
+            self.run.cancel()
+        source = self.source_collection
+        snapshot = Collection(points=set(source.points), segments=set(source.segments), polygons=set(source.polygons))
+        self.collection = Collection(points=set(snapshot.all_points)) if self.edges is not None else Collection()
+        self.stats = None
+        self.changed = False
+        self.run = Run(lambda run: self.compute(snapshot, run), cancellable=self.edges is not None)
+
+    def compute(self, snapshot: Collection, run: Run):
+        """ Computes graph of snapshot (in worker thread), passes its edges and the graph to results of run. """
+        try:
+            stats = Stats() if self.show_stats else None
+            key = self.cache.key(snapshot, self.cache_key) if self.cache is not None else None
+            with timed(stats, 'total'):
+                with self.cache_lock:
+                    graph = self.cache.get(key) if key is not None else None
+                if graph is not None:
+                    if stats is not None:
+                        stats.count('cache hits')
+                elif self.edges is not None:
+                    graph = Collection(points=set(snapshot.all_points))
+                    points = snapshot.arrays.points
+                    batches = self.edges(snapshot, stats=stats) if stats is not None else self.edges(snapshot)
+                    for edges in batches:
+                        if run.cancelled.is_set():
+                            return
+                        segments = [Segment(points[i], points[j]) for i, j in edges.tolist()]
+                        graph.segments.update(segments)
+                        run.results.put(segments)
+                else:
+                    graph = self.algorithm(snapshot, stats=stats) if stats is not None else self.algorithm(snapshot)
+            if key is not None and not run.cancelled.is_set():
+                with self.cache_lock:
+                    self.cache.put(key, graph)
+            run.results.put((graph, stats))
+
+        # error is raised again in main thread, as if algorithm was run there
+        except Exception as error:
+            run.results.put(error)
+
+    def update(self, delta: float):
+        if self.run is None:
+            return
+        # runs that can't be cancelled are restarted when they finish (their graphs are outdated then)
+        if self.changed and not self.run.busy():
+            self.start()
+
+        # displayed graph is updated at most once per interval, unless computation is finished
+        self.since_refresh += delta
+        if self.since_refresh < REFRESH_INTERVAL and self.run.thread.is_alive():
+            return
+        self.since_refresh = 0.0
+
+        while True:
+            try:
+                result = self.run.results.get_nowait()
+            except Empty:
+                return
+            if isinstance(result, Exception):
+                self.run = None
+                raise result
+            if isinstance(result, tuple):
+                self.collection, self.stats = result
+                self.run = None
+                if self.changed:
+                    self.start()
+                return
+            self.collection.segments.update(result)
+
+    def draw(self):
+        super().draw()
+
+        # draw stats (or progress of computation) in top left corner
+        lines = self.stats.lines() if self.stats else []
+        if self.run is not None:
+            lines = [f'computing: {len(self.collection.segments)} edges']
+        top = arcade.get_viewport()[3]
+        for i, line in enumerate(lines):
+            arcade.draw_text(line, 5, top - (i + 1) * (STATS_FONT_SIZE + 6), STATS_COLOR, STATS_FONT_SIZE)
@@ -1,19 +1,55 @@
-from app.drawing import draw_point, draw_segment, draw_polygon
+from typing import List, Optional
+
+import arcade
+
+from app.drawing import create_points, create_segments, create_polygons_filled, POINT_COLOR, SEGMENT_COLOR, \
+    POLYGON_EDGE_COLOR, POLYGON_FILL_COLOR
 from app.service import DisplayService
 from geometry import Collection
 
 
 class DrawService(DisplayService):
-    """ Service responsible for drawing collection of 2d entities. """
+    """
+    Service responsible for drawing collection of 2d entities.
+    Elements are drawn in batches (shapes uploaded to GPU) that are created again only when collection (or viewport)
+    changes, so each frame takes a few draw calls however large the collection is.
+    """
 
     def __init__(self, collection: Collection, draw_kwargs: dict = None):
         self.collection = collection
         self.draw_kwargs = draw_kwargs or {}
+        self.shapes: List[arcade.Shape] = []
+        self.drawn: Optional[Collection] = None
+        self.drawn_state: Optional[tuple] = None
 
     def draw(self):
-        for p in self.collection.points:
-            draw_point(p, **self.draw_kwargs)
-        for s in self.collection.segments:
-            draw_segment(s, **self.draw_kwargs)
-        for p in self.collection.polygons:
-            draw_polygon(p, **self.draw_kwargs)
+        # shapes keep projection they were created with, so they are created again when viewport changes as well
+        collection = self.collection
+        state = (collection.version, len(collection.points), len(collection.segments), len(collection.polygons),
+                 tuple(arcade.get_viewport()))
+        if collection is not self.drawn or state != self.drawn_state:
+            self.shapes, self.drawn, self.drawn_state = self.create_shapes(), collection, state
+        for shape in self.shapes:
+            shape.draw()
+
+    def create_shapes(self) -> List[arcade.Shape]:
+        """ Creates batches of polygon insides, segments and polygon sides, and points (in order of drawing). """
+        color = self.draw_kwargs.get('color')
+        polygons = self.collection.polygons
+        segments = [s for s in self.collection.segments if s.p1 != s.p2]
+        sides = [s for poly in polygons for s in poly.segments]
+        points = self.collection.all_points
+
+        shapes = []
+        if polygons:
+            shapes.append(create_polygons_filled(polygons, POLYGON_FILL_COLOR))
+        if segments:
+            shapes.append(create_segments(segments, color or SEGMENT_COLOR))
+        if sides:
+            shapes.append(create_segments(sides, POLYGON_EDGE_COLOR))
+
+        # points of collection with ends of segments and vertices of polygons (as drawn by draw_segment and
+        # draw_polygon)
+        if points:
+            shapes.append(create_points(points, color or POINT_COLOR))
+        return shapes
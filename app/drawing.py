@@ -1,4 +1,9 @@
+from typing import Iterable
+
 import arcade
+import numpy as np
+import pyglet.gl as gl
+from arcade.earclip import earclip
 
 from geometry import Segment, Polygon, Point
 
@@ -8,6 +13,9 @@ POINT_COLOR = arcade.color.WHITE_SMOKE
 POLYGON_EDGE_COLOR = arcade.color.WHITE_SMOKE
 POLYGON_FILL_COLOR = arcade.color.EERIE_BLACK
 
+# offsets of vertices of two triangles that form square drawn around point
+SQUARE = np.array([(-1, -1), (1, -1), (1, 1), (-1, -1), (1, 1), (-1, 1)], dtype=float)
+
 
 def draw_point(p: Point, color: tuple = POINT_COLOR, size: int = POINT_SIZE):
     arcade.draw_circle_filled(*p, size, color=color)
@@ -29,3 +37,23 @@ def draw_polygon(poly: Polygon, fill: bool = True,
     arcade.draw_polygon_outline(poly.points, color=edge_color)
     for p in poly.points:
         draw_point(p, color=edge_color)
+
+
+def create_points(points: Iterable[Point], color: tuple = POINT_COLOR, size: int = POINT_SIZE) -> arcade.Shape:
+    """
+    Creates shape of all given points (squares of the size of points drawn by draw_point), that is uploaded once
+    and drawn in single call.
+    """
+    centers = np.array([tuple(p) for p in points], dtype=float).reshape(-1, 1, 2)
+    return arcade.create_line_generic((centers + SQUARE * size).reshape(-1, 2), color, gl.GL_TRIANGLES)
+
+
+def create_segments(segments: Iterable[Segment], color: tuple = SEGMENT_COLOR) -> arcade.Shape:
+    """ Creates shape of all given segments, that is uploaded once and drawn in single call. """
+    return arcade.create_lines([tuple(p) for s in segments for p in s], color)
+
+
+def create_polygons_filled(polygons: Iterable[Polygon], color: tuple = POLYGON_FILL_COLOR) -> arcade.Shape:
+    """ Creates shape of insides of all given polygons (split into triangles), drawn in single call. """
+    triangles = [tuple(p) for poly in polygons for triangle in earclip(poly.points) for p in triangle]
+    return arcade.create_line_generic(triangles, color, gl.GL_TRIANGLES)
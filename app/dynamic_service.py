@@ -0,0 +1,27 @@
+import arcade
+
+from algorithms import DynamicVisibilityGraph
+from app.draw_service import DrawService
+from geometry import Collection
+
+
+class DynamicGraphService(DrawService):
+    """ Service that displays visibility graph of data, updated after each change, while enabled with given key. """
+
+    def __init__(self, key: int, source_collection: Collection):
+        super().__init__(Collection(), dict(color=arcade.color.CATALINA_BLUE))
+        self.key = key
+        self.source_collection = source_collection
+        self.graph = None
+
+    def on_key_release(self, symbol: int, modifiers: int):
+        if symbol != self.key:
+            return
+
+        if self.graph:
+            self.graph.close()
+            self.graph = None
+            self.collection = Collection()
+        else:
+            self.graph = DynamicVisibilityGraph(self.source_collection)
+            self.collection = self.graph.graph
@@ -20,4 +20,4 @@ class PointsCreateService(DisplayService):
         if button != arcade.MOUSE_BUTTON_LEFT:
             return
 
-        self.collection.points.add(Point(x, y))
+        self.collection.add(Point(x, y))
@@ -6,9 +6,7 @@ import arcade
 from app.drawing import draw_segment
 from app.service import DisplayService
 from geometry import Point, Polygon, Collection, dist, Segment
-
-# settings
-SNAP_RADIUS = 20
+from geometry.snapping import SNAP_RADIUS
 
 
 class PolygonsCreateService(DisplayService):
@@ -49,7 +47,7 @@ class PolygonsCreateService(DisplayService):
             # starting point -> end creation
             else:
                 del self.points[-1]
-                self.collection.polygons.add(Polygon(*self.points))
+                self.collection.add(Polygon(*self.points))
                 self.points = None
 
         # start creation
@@ -74,8 +72,6 @@ class PolygonsCreateService(DisplayService):
                 if dist(p, p2) < SNAP_RADIUS:
                     return p2
 
-        # snap to polygons
-        for p2 in self.collection.all_points:
-            if dist(p, p2) < SNAP_RADIUS:
-                return p2
-        return p
+        # snap to points of collection
+        found = self.collection.snapping.nearest(p, SNAP_RADIUS)
+        return found[0] if found is not None else p
@@ -2,7 +2,8 @@ import arcade
 
 from app.drawing import draw_point, draw_segment, draw_polygon
 from app.service import DisplayService
-from geometry import Collection, Point, dist, Segment, Polygon
+from geometry import Collection, Point, Segment, Polygon
+from geometry.snapping import SNAP_RADIUS
 
 
 class RemoveService(DisplayService):
@@ -33,22 +34,11 @@ class RemoveService(DisplayService):
         elif isinstance(self.highlighted, Polygon):
             draw_polygon(self.highlighted, edge_color=arcade.color.ALIZARIN_CRIMSON, fill=False)
 
-    def find_element(self, x: float, y: float, radius: float = 20.0):
-        """ Returns element from collection that is in radius. """
+    def find_element(self, x: float, y: float, radius: float = SNAP_RADIUS):
+        """ Returns element from collection that is in radius (points first, then segments and polygons). """
         p = Point(x, y)
-
-        for p2 in self.collection.points:
-            if dist(p, p2) < radius:
-                return p2
-
-        for seg in self.collection.segments:
-            for p2 in seg:
-                if dist(p, p2) < radius:
-                    return seg
-
-        for poly in self.collection.polygons:
-            for p2 in poly.points:
-                if dist(p, p2) < radius:
-                    return poly
-
+        for kind in (Point, Segment, Polygon):
+            found = self.collection.snapping.nearest(p, radius, kind)
+            if found is not None:
+                return found[1]
         return None
@@ -4,10 +4,8 @@ import arcade
 
 from app.drawing import draw_segment
 from app.service import DisplayService
-from geometry import Segment, Point, Collection, intersection, dist
-
-# settings
-SNAP_RADIUS = 20
+from geometry import Segment, Point, Collection, intersection
+from geometry.snapping import SNAP_RADIUS
 
 
 class SegmentsCreateService(DisplayService):
@@ -38,7 +36,7 @@ class SegmentsCreateService(DisplayService):
             return
 
         if self.points:
-            self.collection.segments.add(Segment(*self.points))
+            self.collection.add(Segment(*self.points))
             self.points = None
         else:
             point = self.snap_point(x, y)
@@ -50,7 +48,5 @@ class SegmentsCreateService(DisplayService):
 
     def snap_point(self, x: float, y: float) -> Point:
         p = Point(x, y)
-        for p2 in self.collection.all_points:
-            if dist(p, p2) < SNAP_RADIUS:
-                return p2
-        return p
+        found = self.collection.snapping.nearest(p, SNAP_RADIUS)
+        return found[0] if found is not None else p
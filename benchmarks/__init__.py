@@ -0,0 +1 @@
+from .scenes import random_points, random_segments, polygon_grid, maze, SCENES
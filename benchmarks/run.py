@@ -0,0 +1,156 @@
+""" Benchmarks visibility graph algorithms on synthetic scenes of growing size. """
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from algorithms import visibility_graph, visibility_graph_brute, visibility_graph_parallel, \
+    visibility_graph_brute_parallel
+from algorithms.stats import instrumented
+from benchmarks.scenes import SCENES
+from geometry import Collection
+
+# benchmarked algorithms by name
+ALGORITHMS: Dict[str, Callable[..., Collection]] = {
+    'sweep': visibility_graph,
+    'brute': visibility_graph_brute,
+    'sweep-reduced': lambda collection, **kwargs: visibility_graph(collection, reduced=True, **kwargs),
+    'brute-reduced': lambda collection, **kwargs: visibility_graph_brute(collection, reduced=True, **kwargs),
+    'sweep-parallel': visibility_graph_parallel,
+    'brute-parallel': visibility_graph_brute_parallel,
+}
+
+# algorithms that can be instrumented (see algorithms.stats)
+INSTRUMENTED = {'sweep', 'brute', 'sweep-reduced', 'brute-reduced'}
+
+
+def measure(algorithm: Callable[[Collection], Collection], collection: Collection, repeat: int = 1,
+            memory: bool = True) -> dict:
+    """
+    Runs algorithm on collection and returns the best wall time of given number of runs, number of edges
+    and (if memory is measured in extra run) peak memory allocated by Python in bytes.
+    """
+    seconds = float('inf')
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        graph = algorithm(collection)
+        seconds = min(seconds, time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        algorithm(collection)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    edges = len(graph.segments)
+    return dict(
+        seconds=seconds,
+        peak_memory=peak,
+        edges=edges,
+        edges_per_second=edges / seconds if seconds else None,
+    )
+
+
+def exponent(sizes: List[int], seconds: List[float]) -> Optional[float]:
+    """ Returns exponent k of fitted complexity O(n^k), found by least squares in log-log scale. """
+    pairs = [(n, t) for n, t in zip(sizes, seconds) if n > 0 and t > 0]
+    if len(pairs) < 2 or len({n for n, _ in pairs}) < 2:
+        return None
+    n, t = np.log(np.array(pairs, dtype=float)).T
+    return float(np.polyfit(n, t, 1)[0])
+
+
+def run(scenes: List[str], algorithms: List[str], sizes: List[int], seed: int = 0, repeat: int = 1,
+        memory: bool = True, stats: bool = False, log: Callable[[str], None] = print) -> dict:
+    """
+    Runs given algorithms on given scenes of given sizes, returns results that can be saved as JSON.
+    If stats are enabled, algorithms that support it are run once more with instrumentation.
+    """
+    results, fits = [], []
+    for scene in scenes:
+        collections = [SCENES[scene](size, seed) for size in sizes]
+        for name in algorithms:
+            rows = []
+            for size, collection in zip(sizes, collections):
+                row = dict(
+                    scene=scene, algorithm=name, size=size,
+                    vertices=len(collection.all_points), obstacles=len(collection.all_segments),
+                    **measure(ALGORITHMS[name], collection, repeat, memory)
+                )
+                rows.append(row)
+                log(format_row(row))
+
+                if stats and name in INSTRUMENTED:
+                    _, row['stats'] = instrumented(ALGORITHMS[name], collection)
+                    log('\n'.join(' ' * 12 + line for line in row['stats'].lines()))
+                    row['stats'] = dict(counters=dict(row['stats'].counters), times=dict(row['stats'].times))
+
+            fit = exponent([r['vertices'] for r in rows], [r['seconds'] for r in rows])
+            fits.append(dict(scene=scene, algorithm=name, exponent=fit))
+            log(f'{scene:>10} {name:>15} fitted exponent: {fit:.2f}' if fit is not None else
+                f'{scene:>10} {name:>15} fitted exponent: -')
+            results.extend(rows)
+
+    return dict(
+        meta=dict(
+            date=datetime.now().isoformat(timespec='seconds'),
+            python=platform.python_version(),
+            machine=platform.machine(),
+            seed=seed,
+            repeat=repeat,
+        ),
+        results=results,
+        fits=fits,
+    )
+
+
+def compare(old: dict, new: dict, log: Callable[[str], None] = print):
+    """ Prints ratios of wall times of matching results of two runs (above 1 means new run is slower). """
+    times = {(r['scene'], r['algorithm'], r['size']): r['seconds'] for r in old['results']}
+    for r in new['results']:
+        key = (r['scene'], r['algorithm'], r['size'])
+        if key in times and times[key] > 0:
+            log(f'{r["scene"]:>10} {r["algorithm"]:>15} {r["size"]:>6}: {r["seconds"] / times[key]:6.2f}x')
+
+
+def format_row(row: dict) -> str:
+    memory = f'{row["peak_memory"] / 2 ** 20:8.1f} MiB' if row['peak_memory'] is not None else ' ' * 12
+    rate = f'{row["edges_per_second"]:12.0f}' if row['edges_per_second'] is not None else ' ' * 12
+    return (
+        f'{row["scene"]:>10} {row["algorithm"]:>15} {row["size"]:>6} n={row["vertices"]:<6} '
+        f'{row["seconds"]:9.4f} s {memory} {row["edges"]:>9} edges {rate} edges/s'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scenes', nargs='+', default=list(SCENES), choices=list(SCENES),
+                        help='scene generators')
+    parser.add_argument('--algorithms', nargs='+', default=['sweep', 'brute'], choices=list(ALGORITHMS),
+                        help='benchmarked algorithms')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[4, 8, 16, 32], help='sizes of scenes')
+    parser.add_argument('--seed', type=int, default=0, help='seed of scene generators')
+    parser.add_argument('--repeat', type=int, default=1, help='number of timed runs (the best one is reported)')
+    parser.add_argument('--no-memory', action='store_true', help='do not measure peak memory')
+    parser.add_argument('--stats', action='store_true', help='show counts of operations and times of phases')
+    parser.add_argument('--output', help='JSON file to write results to')
+    parser.add_argument('--compare', help='JSON file with results of previous run to compare with')
+    args = parser.parse_args()
+
+    results = run(args.scenes, args.algorithms, args.sizes, args.seed, args.repeat, not args.no_memory, args.stats)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            compare(json.load(file), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+""" Seeded generators of synthetic scenes for benchmarks. """
+import math
+import random
+
+from geometry import Collection, Point, Segment, Polygon, orient
+
+# size of square in which scenes are generated
+EXTENT = 1000.0
+
+
+def random_points(size: int, seed: int = 0) -> Collection:
+    """ Creates scene with given number of random points. """
+    rng = random.Random(seed)
+    collection = Collection()
+    while len(collection.points) < size:
+        collection.add(Point(rng.uniform(0, EXTENT), rng.uniform(0, EXTENT)))
+    return collection
+
+
+def random_segments(size: int, seed: int = 0) -> Collection:
+    """ Creates scene with given number of random segments, that do not cross or touch each other. """
+    rng = random.Random(seed)
+    length = EXTENT / math.sqrt(size + 1)
+    collection = Collection()
+    while len(collection.segments) < size:
+        p1 = Point(rng.uniform(0, EXTENT), rng.uniform(0, EXTENT))
+        angle = rng.uniform(0, 2 * math.pi)
+        p2 = Point(p1.x + length * math.cos(angle), p1.y + length * math.sin(angle))
+        seg = Segment(p1, p2)
+        if not any(touches(seg, other) for other in collection.index.segments_crossing(p1, p2)):
+            collection.add(seg)
+    return collection
+
+
+def polygon_grid(size: int, seed: int = 0, convex: bool = True) -> Collection:
+    """
+    Creates scene with given number of polygons placed in cells of square grid.
+    Convex polygons are randomly rotated regular polygons, non-convex ones are stars.
+    """
+    rng = random.Random(seed)
+    columns = math.ceil(math.sqrt(size))
+    cell = EXTENT / columns
+    collection = Collection()
+    for k in range(size):
+        center = Point((k % columns + 0.5) * cell, (k // columns + 0.5) * cell)
+        corners = rng.randint(3, 8) if convex else rng.randint(4, 8) * 2
+        rotation = rng.uniform(0, 2 * math.pi)
+        points = []
+        for i in range(corners):
+            radius = cell * 0.4 if convex or i % 2 == 0 else cell * rng.uniform(0.1, 0.25)
+            angle = rotation + 2 * math.pi * i / corners
+            points.append(Point(center.x + radius * math.cos(angle), center.y + radius * math.sin(angle)))
+        collection.add(Polygon(*points))
+    return collection
+
+
+def maze(size: int, seed: int = 0) -> Collection:
+    """
+    Creates maze-like corridors in square grid with about given number of cells.
+    Passages are carved by randomized depth-first search and remaining walls are segments.
+    """
+    rng = random.Random(seed)
+    columns = max(1, round(math.sqrt(size)))
+
+    # cells have integer size, so that corners of walls are exact
+    cell = math.floor(EXTENT / columns)
+
+    # walls are given by direction and cell at their lower (or left) end
+    walls = {('h', i, j) for i in range(columns) for j in range(columns + 1)}
+    walls |= {('v', i, j) for i in range(columns + 1) for j in range(columns)}
+
+    # carve passages
+    visited, stack = {(0, 0)}, [(0, 0)]
+    while stack:
+        i, j = stack[-1]
+        neighbours = [
+            (i + di, j + dj) for di, dj in ((1, 0), (-1, 0), (0, 1), (0, -1))
+            if 0 <= i + di < columns and 0 <= j + dj < columns and (i + di, j + dj) not in visited
+        ]
+        if not neighbours:
+            stack.pop()
+            continue
+        ni, nj = rng.choice(neighbours)
+        walls.discard(('v', max(i, ni), j) if ni != i else ('h', i, max(j, nj)))
+        visited.add((ni, nj))
+        stack.append((ni, nj))
+
+    # create segments from remaining walls
+    collection = Collection()
+    for direction, i, j in walls:
+        p1 = Point(i * cell, j * cell)
+        p2 = Point((i + 1) * cell, j * cell) if direction == 'h' else Point(i * cell, (j + 1) * cell)
+        collection.add(Segment(p1, p2))
+    return collection
+
+
+def touches(a: Segment, b: Segment) -> bool:
+    """ Returns whether given segments have common point. """
+    o1, o2 = orient(*a, b.p1), orient(*a, b.p2)
+    o3, o4 = orient(*b, a.p1), orient(*b, a.p2)
+    if o1 == o2 == 0:
+        return max(min(a.p1, a.p2), min(b.p1, b.p2)) <= min(max(a.p1, a.p2), max(b.p1, b.p2))
+    return o1 * o2 <= 0 and o3 * o4 <= 0
+
+
+# scene generators by name, each takes size and seed
+SCENES = {
+    'points': random_points,
+    'segments': random_segments,
+    'convex': lambda size, seed=0: polygon_grid(size, seed, convex=True),
+    'nonconvex': lambda size, seed=0: polygon_grid(size, seed, convex=False),
+    'maze': maze,
+}
@@ -1,2 +1,6 @@
-from .basic import Point, Segment, Polygon, dist, intersection, angle, angle_to_xaxis, angle_between_points, orient
+from .basic import Point, Segment, Polygon, dist, intersection, parametric_intersection, angle, angle_to_xaxis, \
+    angle_between_points, orient, pseudo_angle, inside_angle
+from .grid import Grid
+from .snapping import SnapIndex
 from .collection import Collection
+from .graph import CompactGraph
@@ -1,8 +1,23 @@
 """ Defines basic geometric structures and operations. """
 import math
 from dataclasses import dataclass
+from fractions import Fraction
 from typing import NamedTuple, Optional, Tuple, Iterator
 
+# line restrictions (see intersection) that bound parameter of intersection from below and from above
+LOWER_BOUNDED = frozenset(('segment', 'ray'))
+UPPER_BOUNDED = frozenset(('segment', 'ray-inv'))
+
+# relative error bound of orientation computed in floating point (machine epsilon is 2^-53), see
+# J. R. Shewchuk, Adaptive Precision Floating-Point Arithmetic and Fast Robust Geometric Predicates
+ORIENT_ERROR_BOUND = (3 + 16 * 2.0 ** -53) * 2.0 ** -53
+
+# products smaller than that may have lost precision by underflow, which is not covered by the error bound
+UNDERFLOW_BOUND = 2.0 ** -960
+
+# parameters of intersections closer than that to bounds of restrictions are computed again exactly
+PARAMETER_TOLERANCE = 2.0 ** -30
+
 
 class Point(NamedTuple):
     """ Defines point in 2D space. """
@@ -15,10 +30,17 @@ class Point(NamedTuple):
 
 @dataclass(frozen=True)
 class Segment:
-    """ Defines segment in 2D space. """
+    """
+    Defines segment in 2D space.
+    Segments use slots instead of dict and compute their hash once, since graphs contain many of them.
+    """
+    __slots__ = ('p1', 'p2', 'hash')
     p1: Point
     p2: Point
 
+    def __post_init__(self):
+        object.__setattr__(self, 'hash', hash((self.p1, self.p2) if self.p1 <= self.p2 else (self.p2, self.p1)))
+
     def __eq__(self, other):
         """ Compares segments so that (p1, p2) == (p2, p1). """
         if not isinstance(other, Segment):
@@ -26,8 +48,11 @@ class Segment:
         return (self.p1 == other.p1 and self.p2 == other.p2) or (self.p1 == other.p2 and self.p2 == other.p1)
 
     def __hash__(self):
-        """ Creates hash so that hash(p1, p2) == hash(p2, p1) """
-        return hash((self.p1, self.p2) if self.p1 <= self.p2 else (self.p2, self.p1))
+        """ Returns hash computed so that hash(p1, p2) == hash(p2, p1) """
+        return self.hash
+
+    def __reduce__(self):
+        return Segment, (self.p1, self.p2)
 
     def __iter__(self) -> Iterator[Point]:
         """ Makes segment iterable to simplify usage. """
@@ -41,33 +66,83 @@ class Segment:
 @dataclass(init=False, frozen=True)
 class Polygon:
     """ Defines polygon in 2D space. """
+    __slots__ = ('points', 'sides')
     points: Tuple[Point, ...]
 
     def __init__(self, *points: Point):
         """ Creates constructor that accepts points as *args instead of tuple. """
         object.__setattr__(self, 'points', points)
+        object.__setattr__(self, 'sides', None)
 
     def __iter__(self) -> Iterator[Point]:
         """ Makes polygon iterable to simplify usage. """
         return iter(self.points)
 
+    def __reduce__(self):
+        return Polygon, self.points
+
+    @property
+    def segments(self) -> Tuple[Segment, ...]:
+        """ Returns segments of this polygon, starting from segment that ends on point 0 (created once). """
+        if self.sides is None:
+            object.__setattr__(self, 'sides', tuple(
+                Segment(self.points[i-1], self.points[i]) for i in range(len(self.points))
+            ))
+        return self.sides
+
     @property
-    def segments(self) -> Iterator[Segment]:
-        """ Creates iterator of segments in this polygon, starting from segment that ends on point 0. """
-        for i in range(len(self.points)):
-            yield Segment(self.points[i-1], self.points[i])
+    def area(self) -> float:
+        """ Returns signed area of polygon, positive if its points are in counterclockwise order. """
+        return sum(
+            self.points[i-1].x * self.points[i].y - self.points[i].x * self.points[i-1].y
+            for i in range(len(self.points))
+        ) / 2
 
 
 def dist(p1: Point, p2: Point) -> float:
     """
     Returns distance between given points.
     """
-    return math.sqrt((p2.x - p1.x) ** 2 + (p2.y - p1.y) ** 2)
+    return math.hypot(p2.x - p1.x, p2.y - p1.y)
 
 
 def orient(a: Point, b: Point, c: Point) -> float:
-    """ Returns orientation relative of point c relative to a,b segment. """
-    return a.x * b.y + b.x * c.y + c.x * a.y - a.x * c.y - b.x * a.y - c.x * b.y
+    """
+    Returns orientation of point c relative to a,b segment (positive if c lies to the left of it).
+    Sign of result is always exact: floating point value is returned only if it is larger than its error bound,
+    otherwise (for nearly collinear points) orientation is computed exactly.
+    """
+    dx1, dy1, dx2, dy2 = b.x - a.x, b.y - a.y, c.x - a.x, c.y - a.y
+    left = dx1 * dy2
+    right = dy1 * dx2
+    det = left - right
+    magnitude = abs(left) + abs(right)
+    # tiny products are trusted only if they are zeros of zero differences (differences themselves never underflow)
+    if magnitude < UNDERFLOW_BOUND and (magnitude or dx1 and dy2 or dy1 and dx2):
+        return exact_orient(a, b, c)
+    if abs(det) >= ORIENT_ERROR_BOUND * magnitude:
+        return det
+    return exact_orient(a, b, c)
+
+
+def exact_orient(a: Point, b: Point, c: Point) -> float:
+    """
+    Returns orientation of point c relative to a,b segment computed exactly and then rounded (to infinity if it
+    is too large for float, to the smallest subnormal of the same sign if it is too small). Coordinates are scaled
+    to integers by common power of two, so that integer arithmetic is exact.
+    """
+    if a == b or a == c or b == c:
+        return 0.0
+    ratios = [float(v).as_integer_ratio() for v in (*a, *b, *c)]
+    scale = max(d for _, d in ratios)
+    ax, ay, bx, by, cx, cy = (n * (scale // d) for n, d in ratios)
+    det = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+    try:
+        result = det / (scale * scale)
+    except OverflowError:
+        return math.inf if det > 0 else -math.inf
+    # underflow must not turn nonzero orientation into collinearity
+    return math.copysign(5e-324, det) if det and not result else result
 
 
 def angle(a: Point, b: Point) -> float:
@@ -88,6 +163,28 @@ def angle_to_xaxis(p1: Point, p2: Point) -> float:
     return 2 * math.pi + a if a < 0 else a
 
 
+def pseudo_angle(p1: Point, p2: Point) -> float:
+    """
+    Returns value [0, 4) that is monotonic with angle between segment, created from given two points, and x-axis.
+    Unlike angle_to_xaxis it needs no trigonometry and is equal for collinear segments with integer coordinates.
+    """
+    dx = p2.x - p1.x
+    dy = p2.y - p1.y
+    p = dy / (abs(dx) + abs(dy))
+    if dx < 0:
+        return 2 - p
+    if dy < 0:
+        return 4 + p
+    return p
+
+
+def inside_angle(a: Point, b: Point, c: Point, p: Point) -> bool:
+    """ Returns whether point p lies strictly inside angle at b, measured counterclockwise from [b, a] to [b, c]. """
+    if orient(b, a, c) >= 0:
+        return orient(b, a, p) > 0 and orient(b, c, p) < 0
+    return not (orient(b, a, p) <= 0 and orient(b, c, p) >= 0)
+
+
 def parametric_intersection(p1: Point, p2: Point, p3: Point, p4: Point) -> Optional[Tuple[float, float]]:
     """
     Finds parameters of intersection of two given lines (each defined by two points).
@@ -110,6 +207,7 @@ def intersection(p1: Point, p2: Point, p3: Point, p4: Point,
                  restriction_1: str = 'line', restriction_2: str = 'line') -> Optional[Point]:
     """
     Returns intersection point (or None) of given (possibly restricted) lines.
+    Restrictions are checked on exact parameters when computed ones are close to their bounds.
 
     Possible line restrictions:
         - 'line' - no restriction, so its a line
@@ -126,24 +224,26 @@ def intersection(p1: Point, p2: Point, p3: Point, p4: Point,
     :return: intersection point or None
     """
 
-    # get intersection parameters
+    # get intersection parameters (exactly, if lines are parallel or parameters are close to bounds)
     parameters = parametric_intersection(p1, p2, p3, p4)
+    if parameters is None or any(abs(t) < PARAMETER_TOLERANCE or abs(t - 1) < PARAMETER_TOLERANCE for t in parameters):
+        parameters = parametric_intersection(*(Point(Fraction(p.x), Fraction(p.y)) for p in (p1, p2, p3, p4)))
     if parameters is None:
         return None
     t1, t2 = parameters
 
     # apply checks
-    if restriction_1 in ['segment', 'ray'] and t1 < 0:
+    if restriction_1 in LOWER_BOUNDED and t1 < 0:
         return None
-    if restriction_2 in ['segment', 'ray'] and t2 < 0:
+    if restriction_2 in LOWER_BOUNDED and t2 < 0:
         return None
-    if restriction_1 in ['segment', 'ray-inv'] and t1 > 1:
+    if restriction_1 in UPPER_BOUNDED and t1 > 1:
         return None
-    if restriction_2 in ['segment', 'ray-inv'] and t2 > 1:
+    if restriction_2 in UPPER_BOUNDED and t2 > 1:
         return None
 
     # return intersection point
     return Point(
-        p1.x + t1 * (p2.x - p1.x),
-        p1.y + t1 * (p2.y - p1.y)
+        float(p1.x + t1 * (p2.x - p1.x)),
+        float(p1.y + t1 * (p2.y - p1.y))
     )
@@ -0,0 +1,213 @@
+"""
+Vectorized versions of basic geometric operations.
+Points are given as arrays of shape (..., 2) and segments as arrays of shape (..., 4), all operations broadcast.
+"""
+from fractions import Fraction
+from typing import Iterable, Tuple
+
+import numpy as np
+
+from geometry import basic
+from geometry.basic import Point, Segment, LOWER_BOUNDED, UPPER_BOUNDED, ORIENT_ERROR_BOUND, PARAMETER_TOLERANCE, \
+    UNDERFLOW_BOUND
+
+# splitter of Dekker's product, that splits 53-bit mantissa into two halves
+SPLITTER = 2.0 ** 27 + 1
+
+
+def points_array(points: Iterable[Point]) -> np.ndarray:
+    """ Creates (N, 2) array from given points. """
+    return np.array([tuple(p) for p in points], dtype=float).reshape(-1, 2)
+
+
+def segments_array(segments: Iterable[Segment]) -> np.ndarray:
+    """ Creates (N, 4) array from given segments, each row is (x1, y1, x2, y2). """
+    return np.array([(*s.p1, *s.p2) for s in segments], dtype=float).reshape(-1, 4)
+
+
+def dist(p1: np.ndarray, p2: np.ndarray) -> np.ndarray:
+    """ Returns distances between given points. """
+    return np.hypot(p2[..., 0] - p1[..., 0], p2[..., 1] - p1[..., 1])
+
+
+def orient(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """
+    Returns orientation of points c relative to a,b segments (same as geometry.orient, with exact signs).
+    Values that are not larger than their error bound are checked by exact_orient.
+    """
+    # differences are taken from c (the value is the same as orient(c, a, b)), so that points c equal to a or b,
+    # which are common in visibility tests, give exact zeros instead of uncertain values
+    dx1, dy1 = a[..., 0] - c[..., 0], a[..., 1] - c[..., 1]
+    dx2, dy2 = b[..., 0] - c[..., 0], b[..., 1] - c[..., 1]
+    left = dx1 * dy2
+    right = dy1 * dx2
+    det = left - right
+    magnitude = np.abs(left)
+    magnitude += np.abs(right)
+    bound = magnitude * ORIENT_ERROR_BOUND
+    # values whose products overflowed are uncertain too (points with NaN coordinates are not)
+    uncertain = np.abs(det) < bound
+    uncertain |= np.isinf(bound)
+    # and so are values whose products may have underflowed (see geometry.orient)
+    tiny = magnitude < UNDERFLOW_BOUND
+    if tiny.any():
+        uncertain |= tiny & ((magnitude > 0) | (dx1 != 0) & (dy2 != 0) | (dy1 != 0) & (dx2 != 0))
+    if not uncertain.any():
+        return det
+    return exact_orient(a, b, c, det, uncertain)
+
+
+def exact_orient(a: np.ndarray, b: np.ndarray, c: np.ndarray, det: np.ndarray, uncertain: np.ndarray) -> np.ndarray:
+    """
+    Returns orientations with uncertain values made exact, only points of uncertain values are gathered.
+    Values whose differences and products were computed without rounding (as for collinear points with small
+    integer coordinates) have exact signs already, others are computed one by one (see geometry.exact_orient).
+    """
+    det = np.array(det, dtype=float)
+    shape = uncertain.shape + (2,)
+    pa, pb, pc = (np.broadcast_to(p, shape)[uncertain] for p in (a, b, c))
+
+    # find values computed without rounding errors (with differences taken from c, as in orient)
+    dx1, dy1 = pa[:, 0] - pc[:, 0], pa[:, 1] - pc[:, 1]
+    dx2, dy2 = pb[:, 0] - pc[:, 0], pb[:, 1] - pc[:, 1]
+    exact = (
+        (difference_error(pa[:, 0], pc[:, 0], dx1) == 0) & (difference_error(pa[:, 1], pc[:, 1], dy1) == 0)
+        & (difference_error(pb[:, 0], pc[:, 0], dx2) == 0) & (difference_error(pb[:, 1], pc[:, 1], dy2) == 0)
+        & (product_error(dx1, dy2, dx1 * dy2) == 0) & (product_error(dy1, dx2, dy1 * dx2) == 0)
+        & (np.abs(dx1 * dy2) + np.abs(dy1 * dx2) >= UNDERFLOW_BOUND)
+    )
+
+    # compute others exactly
+    values = det[uncertain]
+    for k in np.flatnonzero(~exact).tolist():
+        values[k] = basic.exact_orient(Point(*pa[k].tolist()), Point(*pb[k].tolist()), Point(*pc[k].tolist()))
+    det[uncertain] = values
+    return det
+
+
+def difference_error(a: np.ndarray, b: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """ Returns rounding errors of differences x = a - b (Knuth's two-sum). """
+    b_virtual = a - x
+    a_virtual = x + b_virtual
+    return (a - a_virtual) + (b_virtual - b)
+
+
+def product_error(a: np.ndarray, b: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """ Returns rounding errors of products x = a * b (Dekker's two-product). """
+    a_high, a_low = split(a)
+    b_high, b_low = split(b)
+    return a_low * b_low - (((x - a_high * b_high) - a_low * b_high) - a_high * b_low)
+
+
+def split(a: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ Splits numbers into halves with at most 26 significant bits each. """
+    c = SPLITTER * a
+    high = c - (c - a)
+    return high, a - high
+
+
+def pseudo_angle(p1: np.ndarray, p2: np.ndarray) -> np.ndarray:
+    """ Returns pseudo angles of segments created from given points (same as geometry.pseudo_angle). """
+    dx = p2[..., 0] - p1[..., 0]
+    dy = p2[..., 1] - p1[..., 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = dy / (np.abs(dx) + np.abs(dy))
+    return np.where(dx < 0, 2 - p, np.where(dy < 0, 4 + p, p))
+
+
+def inside_angle(a: np.ndarray, b: np.ndarray, c: np.ndarray, p: np.ndarray) -> np.ndarray:
+    """ Returns mask of points p that lie strictly inside angles at b (same as geometry.inside_angle). """
+    o1 = orient(b, a, p)
+    o2 = orient(b, c, p)
+    return np.where(orient(b, a, c) >= 0, (o1 > 0) & (o2 < 0), (o1 > 0) | (o2 < 0))
+
+
+def parametric_intersection(p1: np.ndarray, p2: np.ndarray, p3: np.ndarray, p4: np.ndarray) \
+        -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Finds parameters of intersections of given lines (each defined by two points).
+    Returns mask of lines that are not parallel and both parameters (undefined where mask is False).
+    """
+
+    # calculate values
+    numerator1 = (p3[..., 1] - p4[..., 1]) * (p1[..., 0] - p3[..., 0]) \
+        + (p4[..., 0] - p3[..., 0]) * (p1[..., 1] - p3[..., 1])
+    numerator2 = (p1[..., 1] - p2[..., 1]) * (p1[..., 0] - p3[..., 0]) \
+        + (p2[..., 0] - p1[..., 0]) * (p1[..., 1] - p3[..., 1])
+    denominator = (p4[..., 0] - p3[..., 0]) * (p1[..., 1] - p2[..., 1]) \
+        - (p1[..., 0] - p2[..., 0]) * (p4[..., 1] - p3[..., 1])
+
+    # if denominator is 0 then lines are parallel or are overlapping
+    mask = denominator != 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return mask, numerator1 / denominator, numerator2 / denominator
+
+
+def intersection(lines_1: np.ndarray, lines_2: np.ndarray,
+                 restriction_1: str = 'line', restriction_2: str = 'line') \
+        -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Intersects (possibly restricted) lines, with restrictions as in geometry.intersection.
+    As there, parameters of parallel lines and parameters close to bounds of restrictions are computed again
+    exactly (see exact_intersection), so that results are the same as of geometry.intersection.
+
+    Given (4,) and (N, 4) arrays intersects one line with N lines, given (M, 4) and (N, 4) arrays intersects
+    each of M lines with each of N lines, giving results of shape (M, N).
+
+    :param lines_1: array of first lines, rows are (x1, y1, x2, y2)
+    :param lines_2: array of second lines, rows are (x1, y1, x2, y2)
+    :param restriction_1: restriction for first lines
+    :param restriction_2: restriction for second lines
+    :return: mask of intersecting lines and parameters of intersections on first and second lines
+    """
+    lines_1 = np.asarray(lines_1, dtype=float)
+    lines_2 = np.asarray(lines_2, dtype=float)
+    if lines_1.ndim == 2:
+        lines_1 = lines_1[:, None, :]
+
+    # get intersection parameters
+    mask, t1, t2 = parametric_intersection(lines_1[..., :2], lines_1[..., 2:], lines_2[..., :2], lines_2[..., 2:])
+    mask, t1, t2 = np.array(mask), np.array(t1), np.array(t2)
+
+    # find values that have to be computed exactly
+    with np.errstate(invalid='ignore'):
+        uncertain = ~mask
+        for t in (t1, t2):
+            uncertain |= (np.abs(t) < PARAMETER_TOLERANCE) | (np.abs(t - 1) < PARAMETER_TOLERANCE)
+
+        # apply checks
+        mask &= within(t1, restriction_1) & within(t2, restriction_2)
+
+    if uncertain.any():
+        exact_intersection(lines_1, lines_2, restriction_1, restriction_2, mask, t1, t2, uncertain)
+    return mask, t1, t2
+
+
+def exact_intersection(lines_1: np.ndarray, lines_2: np.ndarray, restriction_1: str, restriction_2: str,
+                       mask: np.ndarray, t1: np.ndarray, t2: np.ndarray, uncertain: np.ndarray):
+    """
+    Computes uncertain values of intersection (mask and parameters) exactly, one by one, and replaces them in place.
+    Restrictions are checked on exact parameters, parameters are then rounded.
+    """
+    shape = uncertain.shape + (4,)
+    first, second = (np.broadcast_to(lines, shape)[uncertain] for lines in (lines_1, lines_2))
+    masks, parameters_1, parameters_2 = mask[uncertain], t1[uncertain], t2[uncertain]
+    for k in range(len(first)):
+        points = (Point(Fraction(x), Fraction(y)) for x, y in np.concatenate((first[k], second[k])).reshape(4, 2))
+        parameters = basic.parametric_intersection(*points)
+        if parameters is None:
+            masks[k] = False
+            continue
+        masks[k] = within(parameters[0], restriction_1) and within(parameters[1], restriction_2)
+        parameters_1[k], parameters_2[k] = float(parameters[0]), float(parameters[1])
+    mask[uncertain], t1[uncertain], t2[uncertain] = masks, parameters_1, parameters_2
+
+
+def within(t, restriction: str):
+    """ Returns whether parameters (array or single number) satisfy given restriction. """
+    result = True
+    if restriction in LOWER_BOUNDED:
+        result = result & (t >= 0)
+    if restriction in UPPER_BOUNDED:
+        result = result & (t <= 1)
+    return result
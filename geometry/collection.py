@@ -1,8 +1,22 @@
+import hashlib
+import struct
+from collections import defaultdict
 from dataclasses import dataclass, field
 from itertools import chain
-from typing import List, Union, Set
+from typing import List, Union, Set, Callable, Iterable, Iterator, FrozenSet, Dict, Tuple
 
-from geometry import Point, Segment, Polygon
+import numpy as np
+
+from geometry import Point, Segment, Polygon, Grid, SnapIndex
+
+
+@dataclass(frozen=True)
+class Arrays:
+    """ Flat arrays of all points and segments of collection. """
+    points: List[Point]
+    coordinates: np.ndarray
+    segments: List[Segment]
+    edges: np.ndarray
 
 
 @dataclass
@@ -11,31 +25,186 @@ class Collection:
     points: Set[Point] = field(default_factory=set)
     segments: Set[Segment] = field(default_factory=set)
     polygons: Set[Polygon] = field(default_factory=set)
+    listeners: List[Callable[[Union[Point, Segment, Polygon], bool], None]] = field(
+        default_factory=list, repr=False, compare=False
+    )
+    version: int = field(default=0, init=False, repr=False, compare=False)
+    _cache: dict = field(default_factory=dict, init=False, repr=False, compare=False)
 
     @property
-    def all_points(self):
-        """ Returns set of all points in collection. """
-        return set(chain(
+    def all_points(self) -> FrozenSet[Point]:
+        """ Returns set of all points in collection (cached until collection changes). """
+        return self._cached('all_points', lambda: frozenset(chain(
             self.points,
             *self.segments,
             *[poly.points for poly in self.polygons]
-        ))
+        )))
 
     @property
-    def all_segments(self):
-        """ Returns set of all segments in collection. """
-        return set(chain(
+    def all_segments(self) -> FrozenSet[Segment]:
+        """ Returns set of all segments in collection (cached until collection changes). """
+        return self._cached('all_segments', lambda: frozenset(chain(
             self.segments,
             *[poly.segments for poly in self.polygons]
+        )))
+
+    @property
+    def arrays(self) -> Arrays:
+        """
+        Returns all points with (N, 2) array of their coordinates and all segments with (M, 2) array of indices
+        of their ends in points (cached until collection changes).
+        """
+        def build():
+            points = list(self.all_points)
+            numbers = {p: i for i, p in enumerate(points)}
+            segments = list(self.all_segments)
+            return Arrays(
+                points,
+                np.array([tuple(p) for p in points], dtype=float).reshape(-1, 2),
+                segments,
+                np.array([(numbers[s.p1], numbers[s.p2]) for s in segments], dtype=np.int64).reshape(-1, 2)
+            )
+        return self._cached('arrays', build)
+
+    @property
+    def incident(self) -> Dict[Point, List[Segment]]:
+        """ Returns dict that maps points to all segments ending in them (cached until collection changes). """
+        def build():
+            incident = defaultdict(list)
+            for seg in self.all_segments:
+                incident[seg.p1].append(seg)
+                if seg.p2 != seg.p1:
+                    incident[seg.p2].append(seg)
+            return dict(incident)
+        return self._cached('incident', build)
+
+    @property
+    def index(self) -> Grid:
+        """
+        Returns spatial index of all points and segments in collection.
+        It is built on first access and then kept up to date by add and remove.
+        """
+        # segments and points are added once for each element they belong to, as they are by add and remove
+        return self._cached('index', lambda: Grid.build(
+            chain.from_iterable(map(self._get_segments, self._elements())),
+            chain.from_iterable(map(self._get_points, self._elements()))
         ))
 
+    @property
+    def snapping(self) -> SnapIndex:
+        """
+        Returns spatial hash of points of elements, used to snap to them and to find elements near given point.
+        It is built on first access and then kept up to date by add and remove.
+        """
+        return self._cached('snapping', lambda: SnapIndex.build(self._elements()))
+
+    @property
+    def content_hash(self) -> str:
+        """
+        Returns hash of points, segments and polygons of collection (cached until collection changes).
+        It does not depend on order of elements, directions of segments or first points and directions of polygons,
+        so collections with the same content have the same hash.
+        """
+        def build():
+            digest = hashlib.sha256()
+            polygons = sorted(canonical_ring(poly.points) for poly in self.polygons)
+            for rows in (
+                sorted(self.points),
+                sorted((*min(seg.p1, seg.p2), *max(seg.p1, seg.p2)) for seg in self.segments),
+                [len(points) for points in polygons],
+                [p for points in polygons for p in points],
+            ):
+                digest.update(struct.pack('<Q', len(rows)))
+
+                # adding zero turns -0.0 into 0.0, they are equal coordinates
+                digest.update((np.array(rows, dtype='<f8') + 0.0).tobytes())
+            return digest.hexdigest()
+        return self._cached('content_hash', build)
+
     def add(self, element: Union[Point, Segment, Polygon]):
-        """ Adds given element to corresponding list. """
-        self._get_list(element).add(element)
+        """ Adds given element to corresponding list and notifies listeners. """
+        elements = self._get_list(element)
+        if element not in elements:
+            stamp = self._stamp()
+            elements.add(element)
+            self.version += 1
+            self._update_indices(stamp, element, True)
+            self._notify(element, True)
 
     def remove(self, element: Union[Point, Segment, Polygon]):
-        """ Removes given element from corresponding list. """
+        """ Removes given element from corresponding list and notifies listeners. """
+        stamp = self._stamp()
         self._get_list(element).remove(element)
+        self.version += 1
+        self._update_indices(stamp, element, False)
+        self._notify(element, False)
+
+    def subscribe(self, listener: Callable[[Union[Point, Segment, Polygon], bool], None]):
+        """ Registers listener called with element and whether it was added (or removed) after each change. """
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[Union[Point, Segment, Polygon], bool], None]):
+        """ Removes registered listener. """
+        self.listeners.remove(listener)
+
+    def _notify(self, element: Union[Point, Segment, Polygon], added: bool):
+        for listener in list(self.listeners):
+            listener(element, added)
+
+    def _cached(self, name: str, build: Callable):
+        """
+        Returns cached value, that is built again when collection changed since it was cached.
+        Sizes of sets are part of the stamp, so that elements added to sets directly are noticed as well.
+        """
+        stamp = self._stamp()
+        cached = self._cache.get(name)
+        if cached is None or cached[0] != stamp:
+            cached = self._cache[name] = (stamp, build())
+        return cached[1]
+
+    def _stamp(self) -> tuple:
+        return self.version, len(self.points), len(self.segments), len(self.polygons)
+
+    def _update_indices(self, stamp: tuple, element: Union[Point, Segment, Polygon], added: bool):
+        """ Updates spatial indices after change, if they were up to date before it (otherwise they are rebuilt). """
+        index = self._current('index', stamp)
+        if index is not None:
+            add_segment, add_point = (index.add_segment, index.add_point) if added else \
+                (index.remove_segment, index.remove_point)
+            for seg in self._get_segments(element):
+                add_segment(seg)
+            for p in self._get_points(element):
+                add_point(p)
+
+        snapping = self._current('snapping', stamp)
+        if snapping is not None:
+            if added:
+                snapping.add(element)
+            else:
+                snapping.remove(element)
+
+    def _current(self, name: str, stamp: tuple):
+        """ Returns cached value if it was up to date at given stamp and marks it up to date now, None otherwise. """
+        cached = self._cache.get(name)
+        if cached is None or cached[0] != stamp:
+            return None
+        self._cache[name] = (self._stamp(), cached[1])
+        return cached[1]
+
+    def _elements(self) -> Iterator[Union[Point, Segment, Polygon]]:
+        return chain(self.points, self.segments, self.polygons)
+
+    @staticmethod
+    def _get_points(element: Union[Point, Segment, Polygon]) -> Iterable[Point]:
+        return (element,) if isinstance(element, Point) else element
+
+    @staticmethod
+    def _get_segments(element: Union[Point, Segment, Polygon]) -> Iterable[Segment]:
+        if isinstance(element, Segment):
+            return element,
+        if isinstance(element, Polygon):
+            return element.segments
+        return ()
 
     def _get_list(self, element: Union[Point, Segment, Polygon]):
         if isinstance(element, Point):
@@ -45,3 +214,11 @@ class Collection:
         if isinstance(element, Polygon):
             return self.polygons
         raise ValueError('Type not supported')
+
+
+def canonical_ring(points: Tuple[Point, ...]) -> Tuple[Point, ...]:
+    """ Returns points of polygon starting from its lowest point, in direction in which they are lower. """
+    start = min(range(len(points)), key=points.__getitem__)
+    forward = points[start:] + points[:start]
+    backward = forward[:1] + forward[:0:-1]
+    return min(forward, backward)
@@ -0,0 +1,70 @@
+""" Compact representation of graphs with many edges. """
+from dataclasses import dataclass, field
+from typing import List, Tuple, Optional
+
+import numpy as np
+
+from geometry.basic import Point, Segment
+from geometry.collection import Collection
+
+
+@dataclass
+class CompactGraph:
+    """
+    Graph with points given by (N, 2) array of their coordinates and edges given by (E, 2) array of int32 indices
+    of their ends (each edge is stored once). It takes 8 bytes per edge instead of hundreds for set of segments.
+    CSR adjacency is computed on first use (or given when graph is loaded, see geometry.serialization).
+    """
+    points: List[Point]
+    coordinates: np.ndarray
+    edges: np.ndarray
+    csr: Optional[Tuple[np.ndarray, np.ndarray]] = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def from_edges(cls, points: List[Point], edges: np.ndarray) -> 'CompactGraph':
+        """ Creates graph from given points and array of indices of ends of edges. """
+        return cls(
+            points,
+            np.array([tuple(p) for p in points], dtype=float).reshape(-1, 2),
+            np.asarray(edges, dtype=np.int32).reshape(-1, 2)
+        )
+
+    @classmethod
+    def from_collection(cls, graph: Collection) -> 'CompactGraph':
+        """ Creates compact version of graph given as collection of points and segments. """
+        points = list(graph.points)
+        numbers = {p: i for i, p in enumerate(points)}
+        edges = np.fromiter(
+            (numbers[p] for s in graph.segments for p in s), dtype=np.int32, count=2 * len(graph.segments)
+        )
+        return cls.from_edges(points, edges)
+
+    def to_collection(self) -> Collection:
+        """ Creates graph given as collection of points and segments. """
+        points = self.points
+        return Collection(
+            points=set(points),
+            segments={Segment(points[i], points[j]) for i, j in self.edges.tolist()}
+        )
+
+    def adjacency(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns CSR adjacency of graph (offsets and targets), neighbours of i-th point are
+        targets[offsets[i]:offsets[i+1]].
+        """
+        if self.csr is None:
+            self.csr = self.build_adjacency()
+        return self.csr
+
+    def build_adjacency(self) -> Tuple[np.ndarray, np.ndarray]:
+        """ Computes CSR adjacency of graph from its edges. """
+        sources = np.concatenate((self.edges[:, 0], self.edges[:, 1]))
+        targets = np.concatenate((self.edges[:, 1], self.edges[:, 0]))
+        order = np.argsort(sources, kind='stable')
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=len(self.points)))))
+        return offsets.astype(np.int64), targets[order].astype(np.int32)
+
+    @property
+    def nbytes(self) -> int:
+        """ Returns number of bytes taken by arrays of graph. """
+        return self.coordinates.nbytes + self.edges.nbytes + sum(a.nbytes for a in self.csr or ())
@@ -0,0 +1,228 @@
+""" Uniform grid spatial index of segments and points. """
+import math
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Tuple, Iterable, Iterator, Set, Optional
+
+import numpy as np
+
+from geometry.basic import Point, Segment
+
+Cell = Tuple[int, int]
+
+# default size of cells of grid created without any elements
+DEFAULT_CELL_SIZE = 32.0
+
+# relative margin by which cells are enlarged, so that elements touching cell borders are found despite rounding
+MARGIN = 1e-9
+
+
+class Grid:
+    """
+    Uniform grid that maps cells to segments and points lying in them.
+    Segments are stored in all cells they touch (cells are slightly enlarged), so that every segment that has
+    common point with query segment is stored in one of cells touched by the query segment.
+    Elements are counted, so that element added twice stays in grid until it is removed twice.
+    """
+
+    def __init__(self, cell_size: float = DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.segments: Dict[Cell, Dict[Segment, int]] = defaultdict(dict)
+        self.points: Dict[Cell, Dict[Point, int]] = defaultdict(dict)
+        self.bounds: Optional[Tuple[float, float, float, float]] = None
+
+    @classmethod
+    def build(cls, segments: Iterable[Segment], points: Iterable[Point] = ()) -> 'Grid':
+        """ Creates grid with cell size chosen so that cells contain few segments on average. """
+        segments, points = list(segments), list(points)
+        coordinates = [p for s in segments for p in s] + points
+        if not coordinates:
+            return cls()
+
+        width = max(p.x for p in coordinates) - min(p.x for p in coordinates)
+        height = max(p.y for p in coordinates) - min(p.y for p in coordinates)
+        cell_size = max(width, height) / max(1.0, math.sqrt(len(segments) + len(points)))
+
+        grid = cls(cell_size or DEFAULT_CELL_SIZE)
+        for seg in segments:
+            grid.add_segment(seg)
+        for p in points:
+            grid.add_point(p)
+        return grid
+
+    def add_segment(self, seg: Segment):
+        self._extend(seg.p1)
+        self._extend(seg.p2)
+        for cell in self.cells(*seg):
+            items = self.segments[cell]
+            items[seg] = items.get(seg, 0) + 1
+
+    def remove_segment(self, seg: Segment):
+        for cell in self.cells(*seg):
+            self._discard(self.segments, cell, seg)
+
+    def add_point(self, p: Point):
+        self._extend(p)
+        items = self.points[self.cell(p)]
+        items[p] = items.get(p, 0) + 1
+
+    def remove_point(self, p: Point):
+        self._discard(self.points, self.cell(p), p)
+
+    def cell(self, p: Point) -> Cell:
+        """ Returns cell containing given point. """
+        return math.floor(p.x / self.cell_size), math.floor(p.y / self.cell_size)
+
+    def cells(self, p1: Point, p2: Point) -> Iterator[Cell]:
+        """ Yields (slightly enlarged) cells touched by segment between given points, column by column. """
+        size = self.cell_size
+        margin = size * MARGIN
+        if p1.x > p2.x:
+            p1, p2 = p2, p1
+        slope = (p2.y - p1.y) / (p2.x - p1.x) if p2.x != p1.x else None
+
+        for i in range(math.floor((p1.x - margin) / size), math.floor((p2.x + margin) / size) + 1):
+            # part of segment inside of column
+            if slope is None:
+                y1, y2 = p1.y, p2.y
+            else:
+                x1 = max(p1.x, i * size - margin)
+                x2 = min(p2.x, (i + 1) * size + margin)
+                y1 = p1.y + (x1 - p1.x) * slope
+                y2 = p1.y + (x2 - p1.x) * slope
+            if y1 > y2:
+                y1, y2 = y2, y1
+            for j in range(math.floor((y1 - margin) / size), math.floor((y2 + margin) / size) + 1):
+                yield i, j
+
+    def segments_crossing(self, p1: Point, p2: Point, restriction: str = 'segment') -> Set[Segment]:
+        """
+        Returns segments that possibly have common points with segment (or ray, see intersection) between given
+        points, found by traversing cells along it. Rays are followed until they leave bounds of grid.
+        """
+        if restriction == 'ray':
+            p2 = self._clip(p1, p2)
+        elif restriction == 'ray-inv':
+            p1 = self._clip(p2, p1)
+        elif restriction != 'segment':
+            raise ValueError(f'Restriction not supported: {restriction}')
+
+        found = set()
+        for cell in self.cells(p1, p2):
+            found.update(self.segments.get(cell, ()))
+        return found
+
+    def table(self, rows: Dict[Segment, int]) -> 'SegmentTable':
+        """ Creates array version of grid, with given segments (others are left out) given by their rows. """
+        cells = [(cell, rows[seg]) for cell, items in self.segments.items() for seg in items if seg in rows]
+        keys = cell_keys(np.array([c[0] for c, _ in cells], dtype=np.int64),
+                         np.array([c[1] for c, _ in cells], dtype=np.int64))
+        values = np.array([row for _, row in cells], dtype=np.int64)
+        order = np.argsort(keys, kind='stable')
+        keys, values = keys[order], values[order]
+        unique, starts = np.unique(keys, return_index=True)
+        return SegmentTable(self.cell_size, unique, np.append(starts, len(keys)), values)
+
+    def points_near(self, p: Point, radius: float) -> Iterator[Point]:
+        """ Yields points that possibly lie within given radius from given point (from cells around it). """
+        size = self.cell_size
+        for i in range(math.floor((p.x - radius) / size), math.floor((p.x + radius) / size) + 1):
+            for j in range(math.floor((p.y - radius) / size), math.floor((p.y + radius) / size) + 1):
+                yield from self.points.get((i, j), ())
+
+    def _clip(self, start: Point, through: Point) -> Point:
+        """ Returns point on ray from start through given point, that lies beyond bounds of grid. """
+        if self.bounds is None:
+            return start
+        min_x, min_y, max_x, max_y = self.bounds
+        dx, dy = through.x - start.x, through.y - start.y
+        t = 1.0
+        if dx:
+            t = max(t, (max_x - start.x) / dx, (min_x - start.x) / dx)
+        if dy:
+            t = max(t, (max_y - start.y) / dy, (min_y - start.y) / dy)
+        return Point(start.x + t * dx, start.y + t * dy)
+
+    def _extend(self, p: Point):
+        if self.bounds is None:
+            self.bounds = (p.x, p.y, p.x, p.y)
+        else:
+            min_x, min_y, max_x, max_y = self.bounds
+            self.bounds = (min(min_x, p.x), min(min_y, p.y), max(max_x, p.x), max(max_y, p.y))
+
+    @staticmethod
+    def _discard(cells: dict, cell: Cell, item):
+        items = cells.get(cell)
+        if not items or item not in items:
+            return
+        items[item] -= 1
+        if not items[item]:
+            del items[item]
+        if not items:
+            del cells[cell]
+
+
+def cell_keys(i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """ Encodes cells given by their column and row as single integers. """
+    return (i << 32) + (j + 2 ** 31)
+
+
+@dataclass
+class SegmentTable:
+    """
+    Grid of segments stored in arrays, so that candidates for many query segments are found at once.
+    Keys of cells are sorted, segments (rows) of i-th cell are values[offsets[i]:offsets[i+1]].
+    """
+    cell_size: float
+    keys: np.ndarray
+    offsets: np.ndarray
+    values: np.ndarray
+
+    def cells(self, lines: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Vectorized version of Grid.cells, returns indices of given lines and cells touched by them. """
+        size = self.cell_size
+        margin = size * MARGIN
+        swap = lines[:, 0] > lines[:, 2]
+        x1 = np.where(swap, lines[:, 2], lines[:, 0])
+        y1 = np.where(swap, lines[:, 3], lines[:, 1])
+        x2 = np.where(swap, lines[:, 0], lines[:, 2])
+        y2 = np.where(swap, lines[:, 1], lines[:, 3])
+        vertical = x1 == x2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = np.where(vertical, 0.0, (y2 - y1) / (x2 - x1))
+
+        # columns touched by lines
+        first = np.floor((x1 - margin) / size).astype(np.int64)
+        line, i = spread(first, np.floor((x2 + margin) / size).astype(np.int64) - first + 1)
+
+        # part of line inside of column
+        cx1 = np.maximum(x1[line], i * size - margin)
+        cx2 = np.minimum(x2[line], (i + 1) * size + margin)
+        cy1 = np.where(vertical[line], y1[line], y1[line] + (cx1 - x1[line]) * slope[line])
+        cy2 = np.where(vertical[line], y2[line], y1[line] + (cx2 - x1[line]) * slope[line])
+        low, high = np.minimum(cy1, cy2), np.maximum(cy1, cy2)
+
+        # rows touched in each column
+        first = np.floor((low - margin) / size).astype(np.int64)
+        part, j = spread(first, np.floor((high + margin) / size).astype(np.int64) - first + 1)
+        return line[part], i[part], j
+
+    def candidates(self, lines: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized version of Grid.segments_crossing for segments, returns pairs of indices of given lines and
+        rows of segments found in cells touched by them (pairs may repeat).
+        """
+        line, i, j = self.cells(lines)
+        keys = cell_keys(i, j)
+        position = np.minimum(np.searchsorted(self.keys, keys), max(0, len(self.keys) - 1))
+        found = self.keys[position] == keys if len(self.keys) else np.zeros(len(keys), dtype=bool)
+        line, position = line[found], position[found]
+        index, k = spread(self.offsets[position], self.offsets[position + 1] - self.offsets[position])
+        return line[index], self.values[k]
+
+
+def spread(starts: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ Expands ranges given by starts and counts, returns index of range and value for each of their elements. """
+    index = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.cumsum(counts) - counts
+    return index, np.arange(len(index)) - offsets[index] + starts[index]
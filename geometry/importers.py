@@ -0,0 +1,205 @@
+"""
+Importers of obstacles from plain-text formats of maps (WKT and GeoJSON).
+
+Points become points, line strings become chains of segments and polygon rings become polygons. Collections
+have no polygons with holes, so interior rings are imported as closed chains of segments (walls of holes).
+"""
+import json
+import re
+from typing import Iterator, List, Optional, Sequence, Union
+
+from geometry.basic import Point, Segment, Polygon
+from geometry.collection import Collection
+
+# tokens of WKT: words, numbers and punctuation
+WKT_TOKEN = re.compile(r'\s*(?:([A-Za-z]+)|([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)|([(),]))')
+
+
+def from_wkt(text: str, collection: Optional[Collection] = None) -> Collection:
+    """ Adds geometries given in WKT (one or more, separated by whitespace) to collection (new one by default). """
+    collection = collection if collection is not None else Collection()
+    tokens = WktTokens(text)
+    while not tokens.done():
+        add_wkt(tokens, collection)
+    return collection
+
+
+def from_geojson(data: Union[str, dict], collection: Optional[Collection] = None) -> Collection:
+    """
+    Adds geometries of GeoJSON object (given as text or parsed) to collection (new one by default).
+    Raises ValueError if object is not valid GeoJSON.
+    """
+    collection = collection if collection is not None else Collection()
+    try:
+        add_geojson(json.loads(data) if isinstance(data, str) else data, collection)
+
+    # missing members and members of wrong types are reported as invalid GeoJSON, as other errors of its content
+    except (KeyError, TypeError, IndexError, AttributeError) as error:
+        raise ValueError(f'Invalid GeoJSON: {type(error).__name__}: {error}') from error
+    return collection
+
+
+class WktTokens:
+    """ Stream of tokens of WKT text. """
+
+    def __init__(self, text: str):
+        self.tokens = []
+        position, text = 0, text.rstrip()
+        while position < len(text):
+            match = WKT_TOKEN.match(text, position)
+            if not match:
+                raise ValueError(f'Invalid WKT at position {position}: {text[position:position + 20]!r}')
+            word, number, punctuation = match.groups()
+            self.tokens.append(word.upper() if word else float(number) if number else punctuation)
+            position = match.end()
+        self.tokens.reverse()
+
+    def done(self) -> bool:
+        return not self.tokens
+
+    def peek(self):
+        return self.tokens[-1] if self.tokens else None
+
+    def next(self):
+        if not self.tokens:
+            raise ValueError('Unexpected end of WKT')
+        return self.tokens.pop()
+
+    def expect(self, token: str):
+        found = self.next()
+        if found != token:
+            raise ValueError(f'Expected {token!r} in WKT, found {found!r}')
+
+    def word(self) -> str:
+        found = self.next()
+        if not isinstance(found, str) or not found.isalpha():
+            raise ValueError(f'Expected word in WKT, found {found!r}')
+        return found
+
+    def empty(self) -> bool:
+        """ Skips EMPTY keyword, returns whether it was found. """
+        if self.peek() == 'EMPTY':
+            self.next()
+            return True
+        return False
+
+    def point(self) -> Point:
+        """ Reads coordinates of point, ignores its Z and M values. """
+        values = []
+        while isinstance(self.peek(), float):
+            values.append(self.next())
+        if len(values) < 2:
+            raise ValueError('Expected coordinates in WKT')
+        return Point(values[0], values[1])
+
+    def listed(self, read) -> list:
+        """ Reads parenthesized list of comma-separated elements read by given function. """
+        if self.empty():
+            return []
+        self.expect('(')
+        elements = [read()]
+        while self.peek() == ',':
+            self.next()
+            elements.append(read())
+        self.expect(')')
+        return elements
+
+
+def add_wkt(tokens: WktTokens, collection: Collection):
+    """ Reads single WKT geometry and adds it to collection. """
+    kind = tokens.word()
+
+    # skip dimension of coordinates, they are ignored anyway
+    if tokens.peek() in ('Z', 'M', 'ZM'):
+        tokens.next()
+
+    if kind == 'POINT':
+        for point in tokens.listed(tokens.point):
+            collection.add(point)
+    elif kind == 'MULTIPOINT':
+        # points of multipoint can be parenthesized or not
+        for point in tokens.listed(lambda: tokens.listed(tokens.point)[0] if tokens.peek() == '(' else tokens.point()):
+            collection.add(point)
+    elif kind == 'LINESTRING':
+        add_chain(tokens.listed(tokens.point), collection)
+    elif kind == 'MULTILINESTRING':
+        for chain in tokens.listed(lambda: tokens.listed(tokens.point)):
+            add_chain(chain, collection)
+    elif kind == 'POLYGON':
+        add_rings(tokens.listed(lambda: tokens.listed(tokens.point)), collection)
+    elif kind == 'MULTIPOLYGON':
+        for rings in tokens.listed(lambda: tokens.listed(lambda: tokens.listed(tokens.point))):
+            add_rings(rings, collection)
+    elif kind == 'GEOMETRYCOLLECTION':
+        tokens.listed(lambda: add_wkt(tokens, collection))
+    else:
+        raise ValueError(f'WKT geometry not supported: {kind}')
+
+
+def add_geojson(data: dict, collection: Collection):
+    """ Adds GeoJSON geometry, feature or feature collection to collection. """
+    kind = data.get('type')
+    if kind == 'FeatureCollection':
+        for feature in data['features']:
+            add_geojson(feature, collection)
+    elif kind == 'Feature':
+        if data.get('geometry') is not None:
+            add_geojson(data['geometry'], collection)
+    elif kind == 'GeometryCollection':
+        for geometry in data['geometries']:
+            add_geojson(geometry, collection)
+    elif kind == 'Point':
+        if data['coordinates']:
+            collection.add(to_point(data['coordinates']))
+    elif kind == 'MultiPoint':
+        for position in data['coordinates']:
+            collection.add(to_point(position))
+    elif kind == 'LineString':
+        add_chain([to_point(p) for p in data['coordinates']], collection)
+    elif kind == 'MultiLineString':
+        for line in data['coordinates']:
+            add_chain([to_point(p) for p in line], collection)
+    elif kind == 'Polygon':
+        add_rings([[to_point(p) for p in ring] for ring in data['coordinates']], collection)
+    elif kind == 'MultiPolygon':
+        for rings in data['coordinates']:
+            add_rings([[to_point(p) for p in ring] for ring in rings], collection)
+    else:
+        raise ValueError(f'GeoJSON object not supported: {kind}')
+
+
+def to_point(position: Sequence[float]) -> Point:
+    """ Creates point from GeoJSON position, ignores its altitude. """
+    if len(position) < 2:
+        raise ValueError(f'Invalid GeoJSON position: {position}')
+    return Point(float(position[0]), float(position[1]))
+
+
+def add_chain(points: List[Point], collection: Collection):
+    """ Adds segments between consecutive points (single point is added as point). """
+    points = list(dedup(points))
+    if len(points) == 1:
+        collection.add(points[0])
+    for p1, p2 in zip(points, points[1:]):
+        collection.add(Segment(p1, p2))
+
+
+def add_rings(rings: List[List[Point]], collection: Collection):
+    """ Adds exterior ring as polygon and interior rings as closed chains of segments. """
+    for k, ring in enumerate(rings):
+        points = list(dedup(ring))
+        if len(points) > 1 and points[0] == points[-1]:
+            points.pop()
+        if k == 0 and len(points) >= 3:
+            collection.add(Polygon(*points))
+        else:
+            add_chain(points + points[:1] if len(points) > 2 else points, collection)
+
+
+def dedup(points: List[Point]) -> Iterator[Point]:
+    """ Skips points equal to the previous ones, they would create zero-length sides. """
+    previous = None
+    for point in points:
+        if point != previous:
+            yield point
+        previous = point
@@ -0,0 +1,190 @@
+"""
+Binary format of collections and graphs.
+
+File starts with header (magic, format version, kind of content, number of sections and CRC32 checksum of the
+other fields of header and everything after it), followed by table of sections (name, dtype, shape and offset)
+and data of sections. Data is little-endian and aligned, so arrays are mapped from file without copying and large
+precomputed graphs are opened without reading them (checksum is verified only on request).
+"""
+import struct
+import zlib
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+from geometry.basic import Point, Segment, Polygon
+from geometry.collection import Collection
+from geometry.graph import CompactGraph
+
+MAGIC = b'VGRF'
+FORMAT_VERSION = 2
+
+# kinds of file content
+COLLECTION = 1
+GRAPH = 2
+
+# magic, format version, kind, number of sections, checksum of the previous fields and everything after header
+HEADER = struct.Struct('<4sHHII')
+HEADER_FIELDS = struct.Struct('<4sHHI')
+
+# name, dtype, rows, columns, offset of data
+SECTION = struct.Struct('<8s4sQQQ')
+
+# sections required in files of each kind, with their dtypes and numbers of columns
+SECTIONS = {
+    COLLECTION: {'points': ('<f8', 2), 'segments': ('<f8', 4), 'vertices': ('<f8', 2), 'polygons': ('<i8', 1)},
+    GRAPH: {'points': ('<f8', 2), 'edges': ('<i4', 2), 'offsets': ('<i8', 1), 'targets': ('<i4', 1)},
+}
+
+# alignment of data of sections in bytes
+ALIGNMENT = 64
+
+# number of bytes checksummed at once when file is verified
+CHECKSUM_CHUNK = 2 ** 24
+
+
+def save_collection(collection: Collection, path: str):
+    """ Saves points, segments and polygons of collection to binary file. """
+    polygons = list(collection.polygons)
+    sizes = [len(poly.points) for poly in polygons]
+    write(path, COLLECTION, {
+        'points': np.array([tuple(p) for p in collection.points], dtype='<f8').reshape(-1, 2),
+        'segments': np.array([(*s.p1, *s.p2) for s in collection.segments], dtype='<f8').reshape(-1, 4),
+        'vertices': np.array([tuple(p) for poly in polygons for p in poly.points], dtype='<f8').reshape(-1, 2),
+        'polygons': np.concatenate(([0], np.cumsum(sizes, dtype='<i8'))).astype('<i8').reshape(-1, 1),
+    })
+
+
+def load_collection(path: str, verify: bool = False) -> Collection:
+    """ Loads collection saved by save_collection, checksum is verified only if verify is set (see read). """
+    sections = read(path, COLLECTION, verify)
+    vertices = [Point(x, y) for x, y in sections['vertices'].tolist()]
+    offsets = sections['polygons'][:, 0].tolist()
+    return Collection(
+        points={Point(x, y) for x, y in sections['points'].tolist()},
+        segments={Segment(Point(x1, y1), Point(x2, y2)) for x1, y1, x2, y2 in sections['segments'].tolist()},
+        polygons={Polygon(*vertices[start:end]) for start, end in zip(offsets, offsets[1:])},
+    )
+
+
+def save_graph(graph: Union[CompactGraph, Collection], path: str):
+    """ Saves graph (compact or given as collection of points and segments) as vertex array and CSR edges. """
+    if isinstance(graph, Collection):
+        graph = CompactGraph.from_collection(graph)
+    offsets, targets = graph.adjacency()
+    write(path, GRAPH, {
+        'points': graph.coordinates.astype('<f8'),
+        'edges': graph.edges.astype('<i4'),
+        'offsets': offsets.astype('<i8').reshape(-1, 1),
+        'targets': targets.astype('<i4').reshape(-1, 1),
+    })
+
+
+def load_graph(path: str, verify: bool = False) -> CompactGraph:
+    """
+    Loads graph saved by save_graph. Arrays are mapped from file, so without verification (which computes
+    checksum of whole file and has to be requested) only coordinates of points are read.
+    """
+    sections = read(path, GRAPH, verify)
+    return CompactGraph(
+        [Point(x, y) for x, y in sections['points'].tolist()],
+        sections['points'],
+        sections['edges'],
+        (sections['offsets'][:, 0], sections['targets'][:, 0])
+    )
+
+
+def write(path: str, kind: int, arrays: Dict[str, np.ndarray]):
+    """ Writes given 2d arrays as sections of file with given kind of content. """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    data = [array.reshape(-1).view(np.uint8) for array in arrays.values()]
+
+    # place data of sections after header and table
+    table, padding, offset = [], [], align(HEADER.size + SECTION.size * len(arrays))
+    for name, array in arrays.items():
+        rows, columns = array.shape
+        table.append(SECTION.pack(name.encode(), array.dtype.str.encode(), rows, columns, offset))
+        end = offset + array.nbytes
+        padding.append(bytes(align(end) - end))
+        offset = align(end)
+    table = b''.join(table)
+    start = bytes(align(HEADER.size + len(table)) - HEADER.size - len(table))
+
+    # checksum is computed before writing, so that header is written once
+    fields = HEADER_FIELDS.pack(MAGIC, FORMAT_VERSION, kind, len(arrays))
+    checksum = zlib.crc32(start, zlib.crc32(table, zlib.crc32(fields)))
+    for array, pad in zip(data, padding):
+        checksum = zlib.crc32(pad, zlib.crc32(array, checksum))
+
+    with open(path, 'wb') as file:
+        file.write(fields + struct.pack('<I', checksum))
+        file.write(table)
+        file.write(start)
+        for array, pad in zip(data, padding):
+            file.write(array)
+            file.write(pad)
+
+
+def read(path: str, kind: int, verify: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Maps file with given kind of content and returns its sections as read-only arrays backed by the file.
+    Header and table of sections (names, dtypes and shapes of required sections of given kind, their lengths) are
+    always checked, checksum of whole file only if verify is set.
+    Raises ValueError if file is not valid or (when verified) its checksum does not match.
+    """
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    if len(data) < HEADER.size:
+        raise ValueError(f'File too short: {path}')
+    magic, version, file_kind, count, checksum = HEADER.unpack(data[:HEADER.size].tobytes())
+    if magic != MAGIC:
+        raise ValueError(f'Not a visibility graph file: {path}')
+    if version != FORMAT_VERSION:
+        raise ValueError(f'Format version not supported: {version}')
+    if file_kind != kind:
+        raise ValueError(f'Unexpected content of file: {path}')
+    if verify and checksum != crc32(data[HEADER.size:], zlib.crc32(HEADER_FIELDS.pack(magic, version, kind, count))):
+        raise ValueError(f'Checksum does not match: {path}')
+    if count != len(SECTIONS[kind]):
+        raise ValueError(f'Unexpected number of sections: {count}')
+
+    sections = {}
+    for name, dtype, rows, columns, offset in sections_table(data, count):
+        if name in sections or SECTIONS[kind].get(name) != (dtype, columns):
+            raise ValueError(f'Unexpected section {name!r} of type {dtype!r} with {columns} columns: {path}')
+        dtype = np.dtype(dtype)
+        end = offset + rows * columns * dtype.itemsize
+        if end > len(data):
+            raise ValueError(f'File truncated: {path}')
+        if offset % ALIGNMENT:
+            raise ValueError(f'Section {name!r} not aligned: {path}')
+        sections[name] = data[offset:end].view(dtype).reshape(rows, columns)
+    return sections
+
+
+def sections_table(data: np.ndarray, count: int) -> List[Tuple[str, str, int, int, int]]:
+    """ Returns entries of table of sections of mapped file. """
+    table = data[HEADER.size:HEADER.size + SECTION.size * count].tobytes()
+    if len(table) < SECTION.size * count:
+        raise ValueError('File truncated')
+    entries = []
+    for i in range(count):
+        name, dtype, rows, columns, offset = SECTION.unpack_from(table, i * SECTION.size)
+        # names and dtypes are ascii, other bytes give UnicodeDecodeError (which is ValueError)
+        entries.append((name.rstrip(b'\0').decode('ascii'), dtype.rstrip(b'\0').decode('ascii'), rows, columns,
+                        offset))
+    return entries
+
+
+def crc32(data: np.ndarray, checksum: int = 0) -> int:
+    """
+    Returns CRC32 checksum of given bytes (continuing given checksum), computed in chunks so that mapped file is not
+    read at once.
+    """
+    for start in range(0, len(data), CHECKSUM_CHUNK):
+        checksum = zlib.crc32(data[start:start + CHECKSUM_CHUNK], checksum)
+    return checksum
+
+
+def align(offset: int) -> int:
+    """ Returns the smallest aligned offset not lower than given one. """
+    return -(-offset // ALIGNMENT) * ALIGNMENT
@@ -0,0 +1,87 @@
+""" Spatial hash of points of elements, used to snap to them and find them in editor. """
+import math
+from collections import defaultdict
+from typing import Dict, Tuple, Iterable, Optional, Type, Union
+
+from geometry.basic import Point, Segment, Polygon, dist
+from geometry.grid import Cell
+
+Element = Union[Point, Segment, Polygon]
+
+# radius in which editor snaps to points and finds elements
+SNAP_RADIUS = 20.0
+
+# default size of cells, equal to snapping radius, so that queries with it check 3x3 cells around given point
+SNAP_CELL_SIZE = SNAP_RADIUS
+
+
+class SnapIndex:
+    """
+    Spatial hash that maps cells to points lying in them (points, ends of segments and vertices of polygons)
+    and each point to elements it belongs to. Elements are counted, so that point shared by element twice
+    (like zero-length segment) stays in index until the element is removed.
+    """
+
+    def __init__(self, cell_size: float = SNAP_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells: Dict[Cell, Dict[Point, Dict[Element, int]]] = defaultdict(dict)
+
+    @classmethod
+    def build(cls, elements: Iterable[Element], cell_size: float = SNAP_CELL_SIZE) -> 'SnapIndex':
+        index = cls(cell_size)
+        for element in elements:
+            index.add(element)
+        return index
+
+    def add(self, element: Element):
+        for p in points_of(element):
+            owners = self.cells[self.cell(p)].setdefault(p, {})
+            owners[element] = owners.get(element, 0) + 1
+
+    def remove(self, element: Element):
+        for p in points_of(element):
+            cell = self.cell(p)
+            points = self.cells.get(cell)
+            owners = points.get(p) if points else None
+            if not owners or element not in owners:
+                continue
+            owners[element] -= 1
+            if not owners[element]:
+                del owners[element]
+            if not owners:
+                del points[p]
+            if not points:
+                del self.cells[cell]
+
+    def cell(self, p: Point) -> Cell:
+        """ Returns cell containing given point. """
+        return math.floor(p.x / self.cell_size), math.floor(p.y / self.cell_size)
+
+    def nearest(self, p: Point, radius: float, kind: Optional[Type[Element]] = None) \
+            -> Optional[Tuple[Point, Element]]:
+        """
+        Returns the nearest point closer than radius to given point with element it belongs to, or None.
+        If kind is given, only points of elements of that type are considered. Of points at the same distance
+        the smallest one (by coordinates) is returned, of elements of the point the one added first.
+        """
+        size = self.cell_size
+        found, distance = None, radius
+        for i in range(math.floor((p.x - radius) / size), math.floor((p.x + radius) / size) + 1):
+            for j in range(math.floor((p.y - radius) / size), math.floor((p.y + radius) / size) + 1):
+                for p2, owners in self.cells.get((i, j), {}).items():
+                    d = dist(p, p2)
+                    if d > distance or d == distance and (found is None or p2 >= found[0]):
+                        continue
+                    element = next((e for e in owners if kind is None or isinstance(e, kind)), None)
+                    if element is not None:
+                        found, distance = (p2, element), d
+        return found
+
+
+def points_of(element: Element) -> Tuple[Point, ...]:
+    """ Returns points of element (point itself, ends of segment or vertices of polygon). """
+    if isinstance(element, Point):
+        return element,
+    if isinstance(element, Segment):
+        return element.p1, element.p2
+    return element.points
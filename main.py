@@ -1,18 +1,24 @@
 import arcade
 
-from algorithms import visibility_graph
+from algorithms import visibility_graph_brute, visibility_edges, GraphCache
 from app import Display, SegmentsCreateService, PolygonsCreateService, AlgorithmService, DrawService, \
-    PointsCreateService, RemoveService
+    PointsCreateService, RemoveService, DynamicGraphService
 from geometry import Collection
 
 if __name__ == "__main__":
 
     collection = Collection()
 
+    # graphs are built by brute force (see algorithms.visibility_graph on choice of engine)
+
     display = Display(
         'Test',
         [
-            AlgorithmService(arcade.key.U, collection, visibility_graph),
+            AlgorithmService(
+                arcade.key.U, collection, visibility_graph_brute, show_stats=True, cache=GraphCache(),
+                edges=visibility_edges
+            ),
+            DynamicGraphService(arcade.key.I, collection),
             DrawService(collection),
             PolygonsCreateService(collection),
             SegmentsCreateService(collection),
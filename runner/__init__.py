@@ -0,0 +1 @@
+from .run import ENGINES, load_scene, run_scene, run
@@ -0,0 +1,146 @@
+"""
+Headless runner of visibility graph jobs.
+
+Builds graphs of scenes given as files (binary collections, GeoJSON or WKT), directories of such files or paths
+read from stdin ('-'), runs scenes concurrently and writes results with timing as JSON lines. It imports only
+geometry and algorithms (never the GUI stack), so it starts fast on servers without display.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from algorithms import visibility_graph, visibility_graph_brute, visibility_graph_parallel, \
+    visibility_graph_brute_parallel
+from algorithms.cache import GraphCache
+from algorithms.parallel import context
+from geometry import Collection
+from geometry.importers import from_wkt, from_geojson
+from geometry.serialization import MAGIC, load_collection, save_graph
+
+# engines by name, each takes collection and reduced argument ('brute' is the default, see algorithms.visibility_graph
+# on choice of engine)
+ENGINES: Dict[str, Callable[..., Collection]] = {
+    'sweep': visibility_graph,
+    'brute': visibility_graph_brute,
+    'parallel': visibility_graph_brute_parallel,
+    'sweep-parallel': visibility_graph_parallel,
+}
+
+# engines that use multiple processes themselves, scenes are run one by one with them
+MULTIPROCESS_ENGINES = {'parallel', 'sweep-parallel'}
+
+# extension of written graph files (see geometry.serialization)
+GRAPH_SUFFIX = '.graph'
+
+
+def load_scene(path: str) -> Collection:
+    """ Loads scene from binary collection file (see geometry.serialization), GeoJSON file or WKT file. """
+    with open(path, 'rb') as file:
+        head = file.read(len(MAGIC))
+    if head == MAGIC:
+        return load_collection(path)
+    with open(path) as file:
+        text = file.read()
+    return from_geojson(text) if text.lstrip().startswith('{') else from_wkt(text)
+
+
+def run_scene(path: str, engine: str = 'brute', reduced: bool = False, output: Optional[str] = None,
+              cache: Optional[str] = None) -> dict:
+    """
+    Loads scene, builds its visibility graph using given engine and saves it to output directory (if given).
+    If cache directory is given, graphs of scenes with the same content are built once (see algorithms.cache).
+    Returns result with sizes and times of phases, or with error if scene could not be processed.
+    """
+    result = dict(scene=path, engine=engine, reduced=reduced)
+    try:
+        start = time.perf_counter()
+        collection = load_scene(path)
+        loaded = time.perf_counter()
+        graph_cache = GraphCache(0, cache) if cache is not None else None
+        algorithm = graph_cache.wrap(ENGINES[engine], engine) if graph_cache is not None else ENGINES[engine]
+        graph = algorithm(collection, reduced=reduced)
+        built = time.perf_counter()
+        result.update(
+            vertices=len(collection.all_points), obstacles=len(collection.all_segments), edges=len(graph.segments),
+            load_seconds=loaded - start, build_seconds=built - loaded
+        )
+        if graph_cache is not None:
+            result['cached'] = graph_cache.info().disk_hits > 0
+        if output is not None:
+            result['graph'] = os.path.join(output, os.path.basename(path) + GRAPH_SUFFIX)
+            save_graph(graph, result['graph'])
+            result['save_seconds'] = time.perf_counter() - built
+
+    # failure of one scene should not stop the whole batch
+    except Exception as error:
+        result['error'] = f'{type(error).__name__}: {error}'
+    return result
+
+
+def run(paths: Iterable[str], engine: str = 'brute', reduced: bool = False, output: Optional[str] = None,
+        jobs: Optional[int] = None, cache: Optional[str] = None) -> Iterator[dict]:
+    """
+    Runs scenes with given paths in given number of processes (all processors by default) and yields their results
+    in order of paths. Scenes are run one by one if engine uses multiple processes itself.
+    """
+    jobs = 1 if engine in MULTIPROCESS_ENGINES else jobs or os.cpu_count() or 1
+    paths = list(paths)
+    if jobs == 1 or len(paths) <= 1:
+        yield from (run_scene(path, engine, reduced, output, cache) for path in paths)
+        return
+    with ProcessPoolExecutor(min(jobs, len(paths)), mp_context=context()) as executor:
+        yield from executor.map(partial(run_scene, engine=engine, reduced=reduced, output=output, cache=cache), paths)
+
+
+def scene_paths(inputs: List[str], stdin: TextIO = sys.stdin) -> Iterator[str]:
+    """ Yields paths of scene files given directly, as directories (their non-hidden files) or in stdin ('-'). """
+    for name in inputs:
+        if name == '-':
+            yield from (line.strip() for line in stdin if line.strip())
+        elif os.path.isdir(name):
+            yield from sorted(
+                os.path.join(name, entry) for entry in os.listdir(name)
+                if not entry.startswith('.') and os.path.isfile(os.path.join(name, entry))
+            )
+        else:
+            yield name
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help="scene files, directories of scene files or '-' for paths in stdin")
+    parser.add_argument('--engine', default='brute', choices=list(ENGINES), help='algorithm building graphs')
+    parser.add_argument('--reduced', action='store_true', help='build reduced graphs (only tangent edges)')
+    parser.add_argument('--output', help='directory to write graphs to (they are not written by default)')
+    parser.add_argument('--jobs', type=int, help='number of scenes run at once (all processors by default)')
+    parser.add_argument('--cache', help='directory of cached graphs, shared by runs (graphs are not cached by default)')
+    parser.add_argument('--results', help='file to write results to as JSON lines (stdout by default)')
+    args = parser.parse_args()
+
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+
+    start, count, failed = time.perf_counter(), 0, 0
+    results = open(args.results, 'w') if args.results else sys.stdout
+    try:
+        for result in run(scene_paths(args.inputs), args.engine, args.reduced, args.output, args.jobs,
+                          args.cache):
+            count += 1
+            failed += 'error' in result
+            results.write(json.dumps(result) + '\n')
+            results.flush()
+    finally:
+        if results is not sys.stdout:
+            results.close()
+
+    print(f'{count} scenes, {failed} failed, {time.perf_counter() - start:.3f} s', file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+""" Helpers of tests of path finders. """
+import heapq
+import math
+import random
+from typing import List, Optional, Tuple
+
+from algorithms import PathFinder, visibility_graph_brute
+from geometry import Collection, Point, dist
+
+
+def length(path: List[Point]) -> float:
+    return sum(dist(p1, p2) for p1, p2 in zip(path, path[1:]))
+
+
+def check(finder: PathFinder, path: Optional[List[Point]], start: Point, goal: Point):
+    """ Checks that path goes from start to goal and each of its legs is not obstructed. """
+    if path is None:
+        return
+    assert path[0] == start
+    assert path[-1] == goal
+    for p1, p2 in zip(path, path[1:]):
+        assert p1 != p2
+        assert finder.visible(p1, p2)
+
+
+def queries(collection: Collection, rng: random.Random, count: int, extent: float) -> List[Tuple[Point, Point]]:
+    """ Returns pairs of random points and points of scene. """
+    points = sorted(collection.all_points)
+    ends = [Point(rng.uniform(0, extent), rng.uniform(0, extent)) for _ in range(count)]
+    ends += rng.sample(points, min(count, len(points)))
+    return [(rng.choice(ends), rng.choice(ends)) for _ in range(count)]
+
+
+def shortest_length(collection: Collection, start: Point, goal: Point) -> float:
+    """
+    Returns length of shortest path from start to goal (infinity if there is none), found by Dijkstra's algorithm
+    on visibility graph of collection with start and goal added as points.
+    """
+    extended = Collection(points=collection.points | {start, goal}, segments=set(collection.segments),
+                          polygons=set(collection.polygons))
+    neighbours = {p: [] for p in extended.all_points}
+    for seg in visibility_graph_brute(extended).segments:
+        neighbours[seg.p1].append(seg.p2)
+        neighbours[seg.p2].append(seg.p1)
+
+    distances, heap = {start: 0.0}, [(0.0, start)]
+    while heap:
+        d, p = heapq.heappop(heap)
+        if p == goal:
+            return d
+        if d > distances[p]:
+            continue
+        for q in neighbours[p]:
+            if d + dist(p, q) < distances.get(q, math.inf):
+                distances[q] = d + dist(p, q)
+                heapq.heappush(heap, (distances[q], q))
+    return 0.0 if start == goal else math.inf
@@ -0,0 +1,48 @@
+""" Vectorized geometry compared with scalar one. """
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from geometry import Point, intersection, orient, batch
+
+RESTRICTIONS = ['line', 'segment', 'ray', 'ray-inv']
+
+
+def random_lines(rng: random.Random, count: int) -> np.ndarray:
+    # coordinates on coarse grid moved off it, so that lines often touch at their ends or are parallel,
+    # but only up to rounding
+    return np.array([[rng.randint(0, 4) * 0.1 + 0.3 for _ in range(4)] for _ in range(count)])
+
+
+@pytest.mark.parametrize('restriction_1, restriction_2', list(itertools.product(RESTRICTIONS, repeat=2)))
+def test_intersection(restriction_1, restriction_2):
+    rng = random.Random(f'{restriction_1} {restriction_2}')
+    lines_1, lines_2 = random_lines(rng, 30), random_lines(rng, 40)
+    mask, t1, t2 = batch.intersection(lines_1, lines_2, restriction_1, restriction_2)
+    assert mask.shape == t1.shape == t2.shape == (30, 40)
+    for i, j in itertools.product(range(30), range(40)):
+        p = intersection(*(Point(*p) for p in (lines_1[i].reshape(2, 2).tolist() + lines_2[j].reshape(2, 2).tolist())),
+                         restriction_1, restriction_2)
+        assert mask[i, j] == (p is not None)
+        if p is not None:
+            x1, y1, x2, y2 = lines_1[i]
+            assert (x1 + t1[i, j] * (x2 - x1), y1 + t1[i, j] * (y2 - y1)) == pytest.approx(tuple(p))
+
+
+def test_intersection_one_line():
+    lines = np.array([[1, 0, 0, 1], [0, 0, 1, 0], [2, 0, 2, 1], [0.5, 0.5, 1, 0]], dtype=float)
+    mask, t1, t2 = batch.intersection(np.array([0, 0, 1, 1], dtype=float), lines, 'segment', 'segment')
+    assert mask.tolist() == [True, True, False, True]
+    assert t1[[0, 1, 3]].tolist() == [0.5, 0.0, 0.5]
+    assert t2[[0, 1, 3]].tolist() == [0.5, 0.0, 0.0]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_orient(seed):
+    rng = random.Random(seed)
+    points = random_lines(rng, 450).reshape(300, 3, 2)
+    values = batch.orient(points[:, 0], points[:, 1], points[:, 2])
+    expected = [orient(*(Point(*p) for p in triple.tolist())) for triple in points]
+    assert np.sign(values).tolist() == np.sign(expected).tolist()
@@ -0,0 +1,161 @@
+""" Content-addressed cache of visibility graphs, in memory and on disk. """
+import os
+import random
+
+import pytest
+
+from algorithms import GraphCache, visibility_graph_brute
+from algorithms.oracle import random_scene
+from algorithms.stats import Stats
+from geometry import Collection, CompactGraph, Point
+from geometry.serialization import HEADER, FORMAT_VERSION, MAGIC, GRAPH
+
+
+def scenes(count: int):
+    return [random_scene(random.Random(seed), 8, 10) for seed in range(count)]
+
+
+def counting(calls: list):
+    def algorithm(collection: Collection, **kwargs) -> Collection:
+        calls.append(collection)
+        return visibility_graph_brute(collection, **kwargs)
+    return algorithm
+
+
+def test_hits_and_misses():
+    calls, cache = [], GraphCache()
+    algorithm = cache.wrap(counting(calls), 'brute')
+    collection = scenes(1)[0]
+    expected = visibility_graph_brute(collection).segments
+
+    assert algorithm(collection).segments == expected
+    # scene with the same content hits cache
+    same = Collection(points=set(collection.points), segments=set(collection.segments),
+                      polygons=set(collection.polygons))
+    assert algorithm(same).segments == expected
+    assert len(calls) == 1
+    assert algorithm(same, reduced=True).segments == visibility_graph_brute(collection, reduced=True).segments
+    assert len(calls) == 2
+    assert cache.info() == (1, 0, 2, 32, 2)
+
+
+def test_copies():
+    cache = GraphCache()
+    algorithm = cache.wrap(visibility_graph_brute, 'brute')
+    collection = scenes(1)[0]
+    algorithm(collection).segments.clear()
+    assert algorithm(collection).segments == visibility_graph_brute(collection).segments
+
+
+def test_stats():
+    cache, stats = GraphCache(), Stats()
+    algorithm = cache.wrap(visibility_graph_brute, 'brute')
+    collection = scenes(1)[0]
+    algorithm(collection, stats=stats)
+    assert 'cache hits' not in stats.counters and stats.counters['intersection tests'] > 0
+    algorithm(collection, stats=stats)
+    assert stats.counters['cache hits'] == 1
+
+
+def test_eviction_order():
+    calls, cache = [], GraphCache(maxsize=2)
+    algorithm = cache.wrap(counting(calls), 'brute')
+    a, b, c = scenes(3)
+    algorithm(a)
+    algorithm(b)
+    # a becomes the most recently used, so b is evicted by c
+    algorithm(a)
+    algorithm(c)
+    assert len(calls) == 3
+    algorithm(a)
+    algorithm(c)
+    assert len(calls) == 3
+    algorithm(b)
+    assert len(calls) == 4
+    assert cache.info().currsize == 2
+
+
+def test_disabled_memory():
+    calls, cache = [], GraphCache(maxsize=0)
+    algorithm = cache.wrap(counting(calls), 'brute')
+    collection = scenes(1)[0]
+    algorithm(collection)
+    algorithm(collection)
+    assert len(calls) == 2 and cache.info().currsize == 0
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_disk(tmp_path, compact):
+    directory = str(tmp_path / 'cache')
+    collection = scenes(1)[0]
+    expected = visibility_graph_brute(collection).segments
+    GraphCache(directory=directory).wrap(visibility_graph_brute, 'brute')(collection)
+
+    # new cache (as in another process) loads graph from directory
+    calls, cache = [], GraphCache(directory=directory)
+    graph = cache.wrap(counting(calls), 'brute', compact=compact)(collection)
+    assert not calls
+    assert isinstance(graph, CompactGraph if compact else Collection)
+    assert (graph.to_collection() if compact else graph).segments == expected
+    assert cache.info() == (0, 1, 0, 32, 1)
+    assert not [name for name in os.listdir(directory) if name.endswith('.tmp')]
+
+
+def corrupt(path: str):
+    with open(path, 'r+b') as file:
+        file.seek(-1, 2)
+        last = file.read(1)
+        file.seek(-1, 2)
+        file.write(bytes([last[0] ^ 0xff]))
+
+
+def truncate(path: str):
+    with open(path, 'r+b') as file:
+        file.truncate(HEADER.size + 10)
+
+
+def stale(path: str):
+    # file written in other version of the format
+    with open(path, 'r+b') as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION + 1, GRAPH, 0, 0))
+
+
+def corrupt_header(path: str):
+    # number of sections that does not match table, with checksum of the original header
+    with open(path, 'r+b') as file:
+        magic, version, kind, count, checksum = HEADER.unpack(file.read(HEADER.size))
+        file.seek(0)
+        file.write(HEADER.pack(magic, version, kind, count + 7, checksum))
+
+
+@pytest.mark.parametrize('damage', [corrupt, truncate, stale, corrupt_header])
+def test_invalid_file(tmp_path, damage):
+    directory = str(tmp_path / 'cache')
+    collection = scenes(1)[0]
+    expected = visibility_graph_brute(collection).segments
+    GraphCache(directory=directory).wrap(visibility_graph_brute, 'brute')(collection)
+    path, = (os.path.join(directory, name) for name in os.listdir(directory))
+    damage(path)
+
+    # invalid file is a miss, graph is built and stored again
+    calls, cache = [], GraphCache(directory=directory)
+    algorithm = cache.wrap(counting(calls), 'brute')
+    assert algorithm(collection).segments == expected
+    assert len(calls) == 1 and cache.info().misses == 1
+    assert GraphCache(directory=directory).wrap(counting(calls), 'brute')(collection).segments == expected
+    assert len(calls) == 1
+
+
+def test_unreadable_file(tmp_path):
+    # directory cannot be mapped as file
+    assert GraphCache.load(str(tmp_path)) is None
+    assert GraphCache.load(str(tmp_path / 'missing.graph')) is None
+
+
+def test_key():
+    collection = Collection(points={Point(0, 0), Point(1, 1)})
+    key = GraphCache.key(collection, 'brute', reduced=False)
+    assert GraphCache.key(Collection(points={Point(1, 1), Point(0, 0)}), 'brute', reduced=False) == key
+    assert GraphCache.key(collection, 'sweep', reduced=False) != key
+    assert GraphCache.key(collection, 'brute', reduced=True) != key
+    assert GraphCache.key(Collection(points={Point(0, 0)}), 'brute', reduced=False) != key
@@ -0,0 +1,105 @@
+""" Cached views of collections compared with views of fresh collections after changes. """
+import random
+from collections import Counter
+
+import pytest
+
+from algorithms.oracle import random_scene
+from geometry import Collection, Point, Segment, Polygon
+
+SQUARE = Polygon(Point(0, 0), Point(2, 0), Point(2, 2), Point(0, 2))
+
+
+def copy(collection: Collection) -> Collection:
+    return Collection(points=set(collection.points), segments=set(collection.segments),
+                      polygons=set(collection.polygons))
+
+
+def incident(collection: Collection) -> dict:
+    """ Returns segments ending in each point, computed from elements of collection. """
+    result = {}
+    for seg in set(collection.segments).union(*(poly.segments for poly in collection.polygons)):
+        for p in {seg.p1, seg.p2}:
+            result.setdefault(p, Counter())[seg] += 1
+    return result
+
+
+def views(collection: Collection) -> dict:
+    """ Returns cached views of collection, in form that does not depend on order. """
+    arrays = collection.arrays
+    return dict(
+        all_points=collection.all_points,
+        all_segments=collection.all_segments,
+        points=Counter(arrays.points),
+        coordinates=sorted(map(tuple, arrays.coordinates.tolist())),
+        edges=Counter(frozenset((arrays.points[i], arrays.points[j])) for i, j in arrays.edges.tolist()),
+        segments=Counter(arrays.segments),
+        incident={p: Counter(segments) for p, segments in collection.incident.items()},
+        content_hash=collection.content_hash,
+    )
+
+
+def check(collection: Collection):
+    assert views(collection) == views(copy(collection))
+    assert views(collection)['incident'] == incident(collection)
+    # segments of arrays are given by indices of their ends
+    arrays = collection.arrays
+    assert [Segment(arrays.points[i], arrays.points[j]) for i, j in arrays.edges.tolist()] == arrays.segments
+
+
+def test_cached_until_changed():
+    collection = Collection(points={Point(5, 5)}, polygons={SQUARE})
+    first = (collection.all_points, collection.all_segments, collection.arrays, collection.incident)
+    assert (collection.all_points, collection.all_segments, collection.arrays, collection.incident) == first
+    assert all(a is b for a, b in zip(first, (collection.all_points, collection.all_segments, collection.arrays,
+                                               collection.incident)))
+    collection.add(Point(6, 6))
+    assert collection.all_points is not first[0] and Point(6, 6) in collection.all_points
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_add_and_remove(seed):
+    rng = random.Random(seed)
+    collection = random_scene(rng, 8, 4)
+    other = random_scene(random.Random(seed + 1000), 8, 4)
+    added = list(other.points) + list(other.segments) + list(other.polygons)
+    check(collection)
+    for _ in range(12):
+        elements = list(collection.points) + list(collection.segments) + list(collection.polygons)
+        if elements and (rng.random() < 0.5 or not added):
+            collection.remove(rng.choice(elements))
+        elif added:
+            collection.add(added.pop(rng.randrange(len(added))))
+        check(collection)
+
+
+@pytest.mark.parametrize('name', ['points', 'segments', 'polygons'])
+def test_direct_changes(name):
+    # sets changed directly (without add and remove) change sizes in stamp of cache
+    collection = random_scene(random.Random(0), 10, 4)
+    check(collection)
+    elements = getattr(collection, name)
+    removed = next(iter(elements))
+    elements.discard(removed)
+    check(collection)
+    elements.clear()
+    check(collection)
+    elements.add(removed)
+    check(collection)
+
+
+def test_clear_all():
+    collection = random_scene(random.Random(1), 10, 4)
+    collection.index, collection.snapping
+    check(collection)
+    for elements in (collection.points, collection.segments, collection.polygons):
+        elements.clear()
+    check(collection)
+    assert not collection.all_points and not collection.all_segments and not collection.incident
+    assert collection.content_hash == Collection().content_hash
+
+    # indices are built again after direct changes, and then updated by add
+    collection.add(SQUARE)
+    assert collection.index.segments_crossing(Point(1, 1), Point(3, 1)) == {Segment(Point(2, 0), Point(2, 2))}
+    assert collection.snapping.nearest(Point(0.5, 0.5), 1) == (Point(0, 0), SQUARE)
+    check(collection)
@@ -0,0 +1,57 @@
+""" Compact graphs and slotted geometry. """
+import pickle
+import random
+
+import numpy as np
+import pytest
+
+from algorithms import visibility_graph_brute, visibility_graph_compact
+from algorithms.oracle import random_scene
+from geometry import CompactGraph, Point, Segment, Polygon
+
+
+@pytest.mark.parametrize('engine', ['brute', 'sweep'])
+@pytest.mark.parametrize('seed', range(3))
+def test_graph(seed, engine):
+    collection = random_scene(random.Random(seed), 10, 10)
+    expected = visibility_graph_brute(collection)
+    graph = visibility_graph_compact(collection, engine=engine)
+    assert graph.edges.dtype == np.int32
+    assert graph.to_collection().points == expected.points
+    assert graph.to_collection().segments == expected.segments
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_round_trip(seed):
+    graph = visibility_graph_brute(random_scene(random.Random(seed), 10, None))
+    compact = CompactGraph.from_collection(graph)
+    assert len(compact.edges) == len(graph.segments)
+    assert compact.to_collection().segments == graph.segments
+
+
+def test_adjacency():
+    points = [Point(0, 0), Point(1, 0), Point(0, 1), Point(5, 5)]
+    graph = CompactGraph.from_edges(points, np.array([[0, 1], [2, 0], [1, 2]]))
+    offsets, targets = graph.adjacency()
+    assert offsets.tolist() == [0, 2, 4, 6, 6]
+    assert [sorted(targets[offsets[i]:offsets[i + 1]].tolist()) for i in range(4)] == [[1, 2], [0, 2], [0, 1], []]
+    assert graph.adjacency() is graph.adjacency()
+    assert graph.nbytes == graph.coordinates.nbytes + graph.edges.nbytes + offsets.nbytes + targets.nbytes
+
+
+def test_segment():
+    s = Segment(Point(0, 0), Point(1, 2))
+    reverse = Segment(Point(1, 2), Point(0, 0))
+    assert s == reverse and hash(s) == hash(reverse)
+    assert s != Segment(Point(0, 0), Point(2, 1)) and s != (Point(0, 0), Point(1, 2))
+    assert not hasattr(s, '__dict__')
+    assert pickle.loads(pickle.dumps(s)) == s
+
+
+def test_polygon():
+    polygon = Polygon(Point(0, 0), Point(1, 0), Point(0, 1))
+    assert not hasattr(polygon, '__dict__')
+    assert polygon.segments is polygon.segments
+    assert polygon.segments[0] == Segment(Point(0, 1), Point(0, 0))
+    assert pickle.loads(pickle.dumps(polygon)) == polygon
+    assert polygon.area == 0.5
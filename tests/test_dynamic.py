@@ -0,0 +1,94 @@
+""" Dynamic visibility graph compared with graph built again after each change. """
+import random
+
+import numpy as np
+import pytest
+
+from algorithms import DynamicVisibilityGraph, visibility_graph_brute
+from algorithms.oracle import random_scene
+from algorithms.visibility_graph_brute import Sightlines, INDEX_MIN_SEGMENTS
+from benchmarks.scenes import SCENES
+from geometry import Polygon
+
+
+@pytest.mark.parametrize('grid', [10, None])
+@pytest.mark.parametrize('seed', range(30))
+def test_random_edits(seed, grid):
+    rng = random.Random(seed)
+    collection = random_scene(rng, 8, grid)
+    # elements are added from another scene, so that they may cross existing ones
+    other = random_scene(random.Random(seed + 1000), 6, grid)
+    added = list(other.points) + list(other.segments) + list(other.polygons)
+    dynamic = DynamicVisibilityGraph(collection)
+    for _ in range(8):
+        elements = list(collection.points) + list(collection.segments) + list(collection.polygons)
+        if elements and (rng.random() < 0.4 or not added):
+            collection.remove(rng.choice(elements))
+        elif added:
+            collection.add(added.pop(rng.randrange(len(added))))
+        expected = visibility_graph_brute(collection)
+        assert dynamic.graph.points == expected.points
+        assert dynamic.graph.segments == expected.segments
+    dynamic.close()
+
+
+def test_close():
+    collection = random_scene(random.Random(0), 8, 10)
+    dynamic = DynamicVisibilityGraph(collection)
+    dynamic.close()
+    segments = set(dynamic.graph.segments)
+    collection.remove(next(iter(collection.segments)))
+    assert dynamic.graph.segments == segments
+
+
+def test_indexed_scene():
+    # scene with enough segments to use spatial index
+    collection = SCENES['convex'](40)
+    assert len(collection.all_segments) >= INDEX_MIN_SEGMENTS
+    dynamic = DynamicVisibilityGraph(collection)
+    rng = random.Random(0)
+    for polygon in rng.sample(sorted(collection.polygons, key=lambda poly: poly.points), 2):
+        collection.remove(polygon)
+        assert dynamic.graph.segments == visibility_graph_brute(collection).segments
+        collection.add(polygon)
+        assert dynamic.graph.segments == visibility_graph_brute(collection).segments
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_sightlines_update(seed):
+    rng = random.Random(seed)
+    collection = random_scene(rng, 8, 10)
+    sightlines = Sightlines(collection)
+    other = random_scene(random.Random(seed + 1000), 6, 10)
+    added = list(other.points) + list(other.segments) + list(other.polygons)
+    for _ in range(8):
+        points, segments = set(collection.all_points), {s for s in collection.all_segments if s.p1 != s.p2}
+        elements = list(collection.points) + list(collection.segments) + list(collection.polygons)
+        if elements and (rng.random() < 0.4 or not added):
+            element, add = rng.choice(elements), False
+            collection.remove(element)
+        elif added:
+            element, add = added.pop(rng.randrange(len(added))), True
+            collection.add(element)
+        else:
+            break
+        new_points, new_segments = set(collection.all_points), {s for s in collection.all_segments if s.p1 != s.p2}
+        polygons = [element] if isinstance(element, Polygon) else []
+        sightlines.update(new_points - points, points - new_points, new_segments - segments, segments - new_segments,
+                          polygons if add else [], [] if add else polygons)
+
+        # updated arrays give the same rows as prepared again, in any order
+        fresh = Sightlines(collection)
+        assert sorted(sightlines.points) == sorted(fresh.points)
+        assert sorted(sightlines.obstacles, key=tuple) == sorted(fresh.obstacles, key=tuple)
+        for p, k in sightlines.rows.items():
+            assert sightlines.points[k] == p and tuple(sightlines.coordinates[k]) == p
+            assert sorted(sightlines.visible(p)) == sorted(fresh.visible(p))
+            if fresh.wedges is not None:
+                expected = fresh.wedges[fresh.rows[p]]
+                assert sorted(map(tuple, sightlines.wedges[k][~np.isnan(sightlines.wedges[k][:, 0])].tolist())) == \
+                    sorted(map(tuple, expected[~np.isnan(expected[:, 0])].tolist()))
+            else:
+                assert sightlines.wedges is None
+        for seg, k in sightlines.segment_rows.items():
+            assert tuple(sightlines.segments[k]) == (*seg.p1, *seg.p2)
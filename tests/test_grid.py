@@ -0,0 +1,105 @@
+""" Uniform grid spatial index and its updates by collections. """
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from algorithms import PathFinder, visibility_graph_brute
+from algorithms.oracle import random_scene
+from geometry import Grid, Point, Segment, Polygon, Collection, intersection
+
+SQUARE = Polygon(Point(0, 0), Point(2, 0), Point(2, 2), Point(0, 2))
+SIDE = Segment(Point(2, 0), Point(2, 2))
+
+
+def contents(grid: Grid) -> Counter:
+    """ Returns counts of segments and points stored in grid (counts are the same in every cell of element). """
+    counts = Counter()
+    for items in list(grid.segments.values()) + list(grid.points.values()):
+        for item, count in items.items():
+            counts[item] = max(counts[item], count)
+    return counts
+
+
+def test_shared_segment():
+    grid = Grid(1.0)
+    grid.add_segment(SIDE)
+    grid.add_segment(SIDE)
+    grid.remove_segment(SIDE)
+    assert grid.segments_crossing(Point(1, 1), Point(3, 1)) == {SIDE}
+    grid.remove_segment(SIDE)
+    assert grid.segments_crossing(Point(1, 1), Point(3, 1)) == set()
+    assert not grid.segments
+
+    # removing element that is not in grid changes nothing
+    grid.remove_segment(SIDE)
+    grid.remove_point(Point(0, 0))
+    assert not grid.segments and not grid.points
+
+
+def test_shared_point():
+    grid = Grid(1.0)
+    grid.add_point(Point(0.5, 0.5))
+    grid.add_point(Point(0.5, 0.5))
+    grid.remove_point(Point(0.5, 0.5))
+    assert list(grid.points_near(Point(0, 0), 1)) == [Point(0.5, 0.5)]
+    grid.remove_point(Point(0.5, 0.5))
+    assert list(grid.points_near(Point(0, 0), 1)) == []
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_segments_crossing(seed):
+    rng = random.Random(seed)
+    segments = [Segment(Point(rng.uniform(0, 100), rng.uniform(0, 100)), Point(rng.uniform(0, 100),
+                                                                             rng.uniform(0, 100)))
+                for _ in range(50)]
+    grid = Grid.build(segments)
+    for _ in range(50):
+        p1, p2 = Point(rng.uniform(-10, 110), rng.uniform(-10, 110)), Point(rng.uniform(0, 100), rng.uniform(0, 100))
+        for restriction in ('segment', 'ray', 'ray-inv'):
+            found = grid.segments_crossing(p1, p2, restriction)
+            expected = {s for s in segments if intersection(p1, p2, *s, restriction, 'segment') is not None}
+            assert expected <= found
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_table(seed):
+    rng = random.Random(seed)
+    collection = random_scene(rng, 20, None)
+    segments = list(collection.all_segments)
+    grid = Grid.build(segments)
+    table = grid.table({seg: k for k, seg in enumerate(segments)})
+    lines = np.array([[rng.uniform(0, 100) for _ in range(4)] for _ in range(30)])
+    k, j = table.candidates(lines)
+    for n, line in enumerate(lines.tolist()):
+        found = {segments[row] for row in j[k == n].tolist()}
+        assert found == grid.segments_crossing(Point(*line[:2]), Point(*line[2:]))
+
+
+def test_removed_segment_shared_with_polygon():
+    collection = Collection(segments={SIDE}, polygons={SQUARE})
+    collection.index
+    collection.remove(SIDE)
+    assert collection.index.segments_crossing(Point(1, 1), Point(3, 1)) == {SIDE}
+    finder = PathFinder(visibility_graph_brute(collection), collection)
+    assert not finder.visible(Point(1, -1), Point(1, 1))
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_edits(seed):
+    rng = random.Random(seed)
+    collection = random_scene(rng, 8, 4)
+    other = random_scene(random.Random(seed + 1000), 8, 4)
+    # elements of other scene on the same small grid often share segments and points with existing ones
+    added = list(other.points) + list(other.segments) + list(other.polygons)
+    collection.index
+    for _ in range(12):
+        elements = list(collection.points) + list(collection.segments) + list(collection.polygons)
+        if elements and (rng.random() < 0.5 or not added):
+            collection.remove(rng.choice(elements))
+        elif added:
+            collection.add(added.pop(rng.randrange(len(added))))
+        fresh = Collection(points=set(collection.points), segments=set(collection.segments),
+                           polygons=set(collection.polygons))
+        assert contents(collection.index) == contents(fresh.index)
@@ -0,0 +1,89 @@
+""" Importers of obstacles from WKT and GeoJSON. """
+import json
+
+import pytest
+
+from geometry import Point, Segment, Polygon, Collection
+from geometry.importers import from_wkt, from_geojson
+
+SQUARE = [(0, 0), (4, 0), (4, 4), (0, 4), (0, 0)]
+HOLE = [(1, 1), (2, 1), (2, 2), (1, 1)]
+
+
+def chain(*coordinates) -> set:
+    points = [Point(*p) for p in coordinates]
+    return {Segment(p1, p2) for p1, p2 in zip(points, points[1:])}
+
+
+@pytest.mark.parametrize('text, points, segments, polygons', [
+    ('POINT (1 2)', {Point(1, 2)}, set(), set()),
+    ('POINT Z (1 2 3)', {Point(1, 2)}, set(), set()),
+    ('POINT EMPTY', set(), set(), set()),
+    ('MULTIPOINT ((1 2), (3 4))', {Point(1, 2), Point(3, 4)}, set(), set()),
+    ('MULTIPOINT (1 2, 3 4)', {Point(1, 2), Point(3, 4)}, set(), set()),
+    ('LINESTRING (0 0, 1 1, 1 1, 2 0)', set(), chain((0, 0), (1, 1), (2, 0)), set()),
+    ('LINESTRING (5 5)', {Point(5, 5)}, set(), set()),
+    ('MULTILINESTRING ((0 0, 1 0), (2 2, 3 3))', set(), chain((0, 0), (1, 0)) | chain((2, 2), (3, 3)), set()),
+    ('POLYGON ((0 0, 4 0, 4 4, 0 4, 0 0))', set(), set(), {Polygon(*(Point(*p) for p in SQUARE[:-1]))}),
+    ('POLYGON ((0 0, 4 0, 4 4, 0 4, 0 0), (1 1, 2 1, 2 2, 1 1))', set(), chain(*HOLE),
+     {Polygon(*(Point(*p) for p in SQUARE[:-1]))}),
+    ('MULTIPOLYGON (((0 0, 4 0, 4 4, 0 4, 0 0)), ((1 1, 2 1, 2 2, 1 1)))', set(), set(),
+     {Polygon(*(Point(*p) for p in SQUARE[:-1])), Polygon(*(Point(*p) for p in HOLE[:-1]))}),
+    ('GEOMETRYCOLLECTION (POINT (1 2), LINESTRING (0 0, 1 0))', {Point(1, 2)}, chain((0, 0), (1, 0)), set()),
+    ('point (1 2) point (3 4)', {Point(1, 2), Point(3, 4)}, set(), set()),
+])
+def test_wkt(text, points, segments, polygons):
+    collection = from_wkt(text)
+    assert (collection.points, collection.segments, collection.polygons) == (points, segments, polygons)
+
+
+@pytest.mark.parametrize('data, points, segments, polygons', [
+    ({'type': 'Point', 'coordinates': [1, 2, 3]}, {Point(1, 2)}, set(), set()),
+    ({'type': 'MultiPoint', 'coordinates': [[1, 2], [3, 4]]}, {Point(1, 2), Point(3, 4)}, set(), set()),
+    ({'type': 'LineString', 'coordinates': [[0, 0], [1, 1], [2, 0]]}, set(), chain((0, 0), (1, 1), (2, 0)), set()),
+    ({'type': 'MultiLineString', 'coordinates': [[[0, 0], [1, 0]], [[2, 2], [3, 3]]]}, set(),
+     chain((0, 0), (1, 0)) | chain((2, 2), (3, 3)), set()),
+    ({'type': 'Polygon', 'coordinates': [SQUARE, HOLE]}, set(), chain(*HOLE),
+     {Polygon(*(Point(*p) for p in SQUARE[:-1]))}),
+    ({'type': 'MultiPolygon', 'coordinates': [[SQUARE], [HOLE]]}, set(), set(),
+     {Polygon(*(Point(*p) for p in SQUARE[:-1])), Polygon(*(Point(*p) for p in HOLE[:-1]))}),
+    ({'type': 'GeometryCollection', 'geometries': [{'type': 'Point', 'coordinates': [1, 2]}]}, {Point(1, 2)},
+     set(), set()),
+    ({'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [1, 2]}, 'properties': {}},
+        {'type': 'Feature', 'geometry': None, 'properties': {}},
+    ]}, {Point(1, 2)}, set(), set()),
+])
+def test_geojson(data, points, segments, polygons):
+    for source in (data, json.dumps(data)):
+        collection = from_geojson(source)
+        assert (collection.points, collection.segments, collection.polygons) == (points, segments, polygons)
+
+
+def test_existing_collection():
+    collection = Collection(points={Point(0, 0)})
+    assert from_wkt('POINT (1 2)', collection) is collection
+    assert from_geojson({'type': 'Point', 'coordinates': [3, 4]}, collection) is collection
+    assert collection.points == {Point(0, 0), Point(1, 2), Point(3, 4)}
+
+
+@pytest.mark.parametrize('text', [
+    'POINT (1)', 'POINT (1 2', 'POINT 1 2', 'CIRCLE (1 2)', 'POINT (1 2) $', 'LINESTRING (0 0; 1 1)', '(1 2)',
+])
+def test_invalid_wkt(text):
+    with pytest.raises(ValueError):
+        from_wkt(text)
+
+
+@pytest.mark.parametrize('data', [
+    '{"type": "Point", "coordinates": [1, 2]',
+    {'type': 'Circle', 'coordinates': [1, 2]},
+    {'type': 'Point'},
+    {'type': 'Point', 'coordinates': [1]},
+    {'type': 'LineString', 'coordinates': 5},
+    {'type': 'FeatureCollection'},
+    [1, 2],
+])
+def test_invalid_geojson(data):
+    with pytest.raises(ValueError):
+        from_geojson(data)
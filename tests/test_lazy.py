@@ -0,0 +1,69 @@
+""" Lazy visibility graph and path finder compared with full ones. """
+import random
+
+import pytest
+
+from algorithms import LazyVisibilityGraph, LazyPathFinder, PathFinder, visibility_graph_brute
+from algorithms.oracle import random_scene
+from benchmarks.scenes import SCENES
+from geometry import Point
+from tests.paths import length, check, queries
+
+
+@pytest.mark.parametrize('engine', ['brute', 'sweep'])
+@pytest.mark.parametrize('reduced', [False, True])
+def test_neighbours(reduced, engine):
+    collection = random_scene(random.Random(1), 10, None)
+    graph = LazyVisibilityGraph(collection, reduced=reduced, engine=engine)
+    expected = visibility_graph_brute(collection, reduced=reduced)
+    edges = {frozenset((p, graph.points[i])) for p in graph.points for i, _ in graph.neighbours(p)}
+    assert edges == {frozenset(seg) for seg in expected.segments}
+
+
+def test_memoized():
+    collection = SCENES['convex'](4)
+    graph = LazyVisibilityGraph(collection, maxsize=2)
+    a, b, c = sorted(collection.all_points)[:3]
+    assert graph.neighbours(a) is graph.neighbours(a)
+    graph.neighbours(b)
+    graph.neighbours(a)
+    # b is the least recently used, so it is forgotten first
+    graph.neighbours(c)
+    assert list(graph.computed) == [a, c]
+    assert graph.info() == (2, 0, 3, 2, 2)
+    graph.clear()
+    assert graph.info() == (0, 0, 0, 2, 0)
+
+
+@pytest.mark.parametrize('grid', [10, None])
+@pytest.mark.parametrize('seed', range(15))
+def test_random_scene(seed, grid):
+    rng = random.Random(seed)
+    collection = random_scene(rng, 10, grid)
+    full = PathFinder(visibility_graph_brute(collection), collection)
+    finders = [
+        LazyPathFinder(collection),
+        LazyPathFinder(collection, reduced=True, engine='sweep'),
+        LazyPathFinder(collection, maxsize=0),
+    ]
+    for start, goal in queries(collection, rng, 10, grid or 100):
+        expected = full.path(start, goal)
+        for finder in finders:
+            path = finder.path(start, goal)
+            check(full, path, start, goal)
+            assert (path is None) == (expected is None)
+            if path is not None:
+                assert length(path) == pytest.approx(length(expected))
+
+
+def test_explores_part_of_graph():
+    collection = SCENES['maze'](36)
+    finder = LazyPathFinder(collection)
+    points = sorted(collection.all_points)
+    finder.path(points[0], points[1])
+    assert 0 < finder.graph.info().currsize < len(points)
+
+
+def test_same_start_and_goal():
+    point = Point(1.0, 1.0)
+    assert LazyPathFinder(SCENES['maze'](16)).path(point, point) == [point]
@@ -0,0 +1,42 @@
+""" Multi-process visibility graphs compared with single-process ones. """
+import random
+
+import pytest
+
+from algorithms import visibility_graph_brute, visibility_graph_parallel, visibility_graph_brute_parallel
+from algorithms.oracle import random_scene
+from algorithms.parallel import map_tasks, state
+from benchmarks.scenes import SCENES
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+@pytest.mark.parametrize('seed', range(3))
+def test_random_scene(seed, workers):
+    collection = random_scene(random.Random(seed), 10, 10)
+    expected = visibility_graph_brute(collection)
+    for algorithm in (visibility_graph_parallel, visibility_graph_brute_parallel):
+        graph = algorithm(collection, workers=workers)
+        assert graph.points == expected.points
+        assert graph.segments == expected.segments
+
+
+@pytest.mark.parametrize('scene, size', [('convex', 9), ('maze', 36)])
+def test_reduced(scene, size):
+    collection = SCENES[scene](size)
+    expected = visibility_graph_brute(collection, reduced=True).segments
+    assert visibility_graph_parallel(collection, workers=2, reduced=True).segments == expected
+    assert visibility_graph_brute_parallel(collection, workers=2, reduced=True).segments == expected
+
+
+def test_empty():
+    collection = random_scene(random.Random(0), 0, 10)
+    assert visibility_graph_brute_parallel(collection, workers=2).segments == set()
+
+
+def scaled(item: int) -> int:
+    return item * state['factor']
+
+
+def test_map_tasks():
+    # results are in order of items and workers get state
+    assert list(map_tasks(scaled, range(20), dict(factor=3), workers=2)) == [3 * k for k in range(20)]
@@ -0,0 +1,97 @@
+""" Exact orientation predicates compared with rational arithmetic. """
+import math
+import random
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+from geometry import Point, orient, batch
+from geometry.basic import exact_orient
+
+
+def fraction_orient(a: Point, b: Point, c: Point) -> Fraction:
+    a, b, c = (Point(Fraction(p.x), Fraction(p.y)) for p in (a, b, c))
+    return (b.x - a.x) * (c.y - a.y) - (b.y - a.y) * (c.x - a.x)
+
+
+def sign(value) -> int:
+    return (value > 0) - (value < 0)
+
+
+def near_collinear(rng: random.Random) -> tuple:
+    # third point on line of the first two, moved by few units in the last place (or not moved at all)
+    a = Point(rng.uniform(-100, 100), rng.uniform(-100, 100))
+    b = Point(rng.uniform(-100, 100), rng.uniform(-100, 100))
+    t = rng.uniform(-2, 3)
+    c = Point(a.x + t * (b.x - a.x), a.y + t * (b.y - a.y))
+    ulps = rng.randint(-3, 3)
+    return a, b, Point(c.x, c.y + ulps * math.ulp(c.y))
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_near_collinear(seed):
+    rng = random.Random(seed)
+    triples = [near_collinear(rng) for _ in range(5000)]
+    expected = [sign(fraction_orient(*triple)) for triple in triples]
+    assert [sign(orient(*triple)) for triple in triples] == expected
+    assert [sign(exact_orient(*triple)) for triple in triples] == expected
+
+    a, b, c = (batch.points_array(points) for points in zip(*triples))
+    assert np.sign(batch.orient(a, b, c)).astype(int).tolist() == expected
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_without_rounding(seed):
+    # collinear points with small integer coordinates, whose differences and products have no rounding errors
+    rng = random.Random(seed)
+    triples = []
+    for _ in range(1000):
+        a = Point(rng.randint(-50, 50), rng.randint(-50, 50))
+        dx, dy, t = rng.randint(-5, 5), rng.randint(-5, 5), rng.randint(-5, 5)
+        triples.append((a, Point(a.x + dx, a.y + dy), Point(a.x + t * dx, a.y + t * dy + rng.randint(-1, 1))))
+    a, b, c = (batch.points_array(points) for points in zip(*triples))
+
+    dx1, dy1, dx2, dy2 = a[:, 0] - c[:, 0], a[:, 1] - c[:, 1], b[:, 0] - c[:, 0], b[:, 1] - c[:, 1]
+    assert not batch.difference_error(a[:, 0], c[:, 0], dx1).any()
+    assert not batch.product_error(dx1, dy2, dx1 * dy2).any()
+    assert not batch.product_error(dy1, dx2, dy1 * dx2).any()
+    assert batch.orient(a, b, c).tolist() == [float(fraction_orient(*triple)) for triple in triples]
+
+
+def test_rounding_errors():
+    # two-sum and two-product give exact errors of rounded operations
+    rng = random.Random(0)
+    a = np.array([rng.uniform(-1, 1) * 2.0 ** rng.randint(-20, 20) for _ in range(1000)])
+    b = np.array([rng.uniform(-1, 1) * 2.0 ** rng.randint(-20, 20) for _ in range(1000)])
+    for x, y, difference, product in zip(a.tolist(), b.tolist(), batch.difference_error(a, b, a - b).tolist(),
+                                         batch.product_error(a, b, a * b).tolist()):
+        assert Fraction(x - y) + Fraction(difference) == Fraction(x) - Fraction(y)
+        assert Fraction(x * y) + Fraction(product) == Fraction(x) * Fraction(y)
+
+
+@pytest.mark.parametrize('a, b, c, expected', [
+    (Point(-1e308, -1e308), Point(1e308, -1e308), Point(0, 1e308), math.inf),
+    (Point(-1e308, -1e308), Point(0, 1e308), Point(1e308, -1e308), -math.inf),
+    (Point(-1e308, -1e308), Point(0, 0), Point(1e308, 1e308), 0.0),
+])
+def test_overflow(a, b, c, expected):
+    assert orient(a, b, c) == expected
+    assert exact_orient(a, b, c) == expected
+    with np.errstate(over='ignore', invalid='ignore'):
+        assert batch.orient(*(np.array([tuple(p)]) for p in (a, b, c))).tolist() == [expected]
+
+
+@pytest.mark.parametrize('a, b, c, expected', [
+    (Point(0, 0), Point(1e-170, 0), Point(0, 1e-170), 5e-324),
+    (Point(0, 0), Point(0, 1e-170), Point(1e-170, 0), -5e-324),
+    (Point(1e-170, 1e-170), Point(2e-170, 1e-170), Point(1e-170, 3e-170), 5e-324),
+    (Point(0, 0), Point(1e-170, 1e-170), Point(3e-170, 3e-170), 0.0),
+    (Point(0, 0), Point(1e-170, 0), Point(2e-170, 0), 0.0),
+])
+def test_underflow(a, b, c, expected):
+    # orientation too small for float keeps its sign
+    assert sign(fraction_orient(a, b, c)) == sign(expected)
+    assert orient(a, b, c) == expected
+    assert exact_orient(a, b, c) == expected
+    assert batch.orient(*(np.array([tuple(p)]) for p in (a, b, c))).tolist() == [expected]
@@ -0,0 +1,45 @@
+""" Reduced (tangent-only) visibility graphs compared with full ones. """
+import random
+
+import pytest
+
+from algorithms import PathFinder, visibility_graph, visibility_graph_brute, visibility_graph_brute_parallel
+from algorithms.oracle import random_scene
+from benchmarks.scenes import SCENES
+from tests.paths import length, check, queries
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_sweep(seed):
+    collection = random_scene(random.Random(seed), 10, None)
+    expected = visibility_graph_brute(collection, reduced=True)
+    assert visibility_graph(collection, reduced=True).segments == expected.segments
+
+
+@pytest.mark.parametrize('scene, size', [('convex', 16), ('nonconvex', 9), ('maze', 36)])
+def test_subgraph(scene, size):
+    collection = SCENES[scene](size)
+    full = visibility_graph_brute(collection)
+    reduced = visibility_graph_brute(collection, reduced=True)
+    assert reduced.points == full.points
+    # only edges at polygon points are left out
+    assert reduced.segments <= full.segments
+    assert (reduced.segments < full.segments) == bool(collection.polygons)
+    assert visibility_graph_brute_parallel(collection, workers=2, reduced=True).segments == reduced.segments
+
+
+@pytest.mark.parametrize('grid', [10, None])
+@pytest.mark.parametrize('seed', range(15))
+def test_shortest_paths(seed, grid):
+    rng = random.Random(seed)
+    collection = random_scene(rng, 10, grid)
+    full = PathFinder(visibility_graph_brute(collection), collection)
+    reduced = PathFinder(visibility_graph_brute(collection, reduced=True), collection, reduced=True)
+    for start, goal in queries(collection, rng, 10, grid or 100):
+        expected = full.path(start, goal)
+        path = reduced.path(start, goal)
+        check(full, path, start, goal)
+        # shortest paths in reduced graph are as short as in full graph
+        assert (path is None) == (expected is None)
+        if path is not None:
+            assert length(path) == pytest.approx(length(expected))
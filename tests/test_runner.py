@@ -0,0 +1,82 @@
+""" Headless runner of visibility graph jobs. """
+import io
+import json
+import os
+import random
+
+import pytest
+
+from algorithms import visibility_graph_brute
+from algorithms.oracle import random_scene
+from geometry.serialization import save_collection, load_graph
+from runner.run import ENGINES, run, run_scene, scene_paths, load_scene
+
+
+@pytest.fixture
+def scenes(tmp_path):
+    """ Directory with the same scene saved as binary collection, GeoJSON and WKT, and invalid scene. """
+    collection = random_scene(random.Random(0), 10, 10)
+    directory = tmp_path / 'scenes'
+    directory.mkdir()
+    save_collection(collection, str(directory / 'scene.bin'))
+    features = [{'type': 'Point', 'coordinates': list(p)} for p in collection.points]
+    features += [{'type': 'LineString', 'coordinates': [list(s.p1), list(s.p2)]} for s in collection.segments]
+    features += [{'type': 'Polygon', 'coordinates': [[list(p) for p in poly.points + poly.points[:1]]]}
+                 for poly in collection.polygons]
+    (directory / 'scene.geojson').write_text(json.dumps({'type': 'GeometryCollection', 'geometries': features}))
+    wkt = [f'POINT ({p.x} {p.y})' for p in collection.points]
+    wkt += [f'LINESTRING ({s.p1.x} {s.p1.y}, {s.p2.x} {s.p2.y})' for s in collection.segments]
+    wkt += ['POLYGON ((' + ', '.join(f'{p.x} {p.y}' for p in poly.points + poly.points[:1]) + '))'
+            for poly in collection.polygons]
+    (directory / 'scene.wkt').write_text('\n'.join(wkt))
+    (directory / 'zinvalid.wkt').write_text('CIRCLE (1 2)')
+    (directory / '.hidden').write_text('')
+    return collection, directory
+
+
+def test_load_scene(scenes):
+    collection, directory = scenes
+    for name in ('scene.bin', 'scene.geojson', 'scene.wkt'):
+        loaded = load_scene(str(directory / name))
+        assert (loaded.points, loaded.segments, loaded.polygons) == \
+            (collection.points, collection.segments, collection.polygons)
+
+
+@pytest.mark.parametrize('engine', list(ENGINES))
+def test_engines(scenes, engine, tmp_path):
+    collection, directory = scenes
+    result = run_scene(str(directory / 'scene.bin'), engine, output=str(tmp_path))
+    expected = visibility_graph_brute(collection).segments
+    assert result['edges'] == len(expected) and 'error' not in result
+    assert load_graph(result['graph']).to_collection().segments == expected
+
+
+def test_error(scenes):
+    _, directory = scenes
+    result = run_scene(str(directory / 'zinvalid.wkt'))
+    assert result['error'].startswith('ValueError')
+
+
+def test_cache(scenes, tmp_path):
+    _, directory = scenes
+    cache = str(tmp_path / 'cache')
+    assert not run_scene(str(directory / 'scene.bin'), cache=cache)['cached']
+    assert run_scene(str(directory / 'scene.wkt'), cache=cache)['cached']
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_run(scenes, jobs):
+    _, directory = scenes
+    paths = list(scene_paths([str(directory)]))
+    results = list(run(paths, jobs=jobs))
+    assert [result['scene'] for result in results] == paths
+    assert ['error' in result for result in results] == [False, False, False, True]
+    assert len({result['edges'] for result in results[:3]}) == 1
+
+
+def test_scene_paths(scenes):
+    _, directory = scenes
+    names = ['scene.bin', 'scene.geojson', 'scene.wkt', 'zinvalid.wkt']
+    assert list(scene_paths([str(directory)])) == [os.path.join(str(directory), name) for name in names]
+    stdin = io.StringIO('a.wkt\n\n  b.wkt \n')
+    assert list(scene_paths(['x.bin', '-'], stdin)) == ['x.bin', 'a.wkt', 'b.wkt']
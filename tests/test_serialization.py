@@ -0,0 +1,114 @@
+""" Round-trips of collections and graphs through binary files. """
+import random
+
+import numpy as np
+import pytest
+
+from algorithms import visibility_graph
+from algorithms.oracle import random_scene
+from geometry import CompactGraph
+from geometry.serialization import save_collection, load_collection, save_graph, load_graph, HEADER, \
+    SECTION
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_collection(tmp_path, seed):
+    collection = random_scene(random.Random(seed), 10, None if seed % 2 else 10)
+    path = str(tmp_path / 'scene.bin')
+    save_collection(collection, path)
+    loaded = load_collection(path, verify=True)
+    assert loaded.points == collection.points
+    assert loaded.segments == collection.segments
+    assert loaded.polygons == collection.polygons
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_graph(tmp_path, seed):
+    graph = visibility_graph(random_scene(random.Random(seed), 10, 10))
+    path = str(tmp_path / 'graph.bin')
+    save_graph(graph, path)
+    loaded = load_graph(path, verify=True)
+    assert loaded.to_collection().segments == graph.segments
+    assert set(loaded.points) == graph.points
+
+    # adjacency stored in file equals the one computed from edges
+    offsets, targets = loaded.adjacency()
+    expected_offsets, expected_targets = CompactGraph(loaded.points, loaded.coordinates, loaded.edges).adjacency()
+    assert np.array_equal(offsets, expected_offsets)
+    for i in range(len(loaded.points)):
+        assert sorted(targets[offsets[i]:offsets[i + 1]]) == sorted(expected_targets[offsets[i]:offsets[i + 1]])
+
+
+def test_empty(tmp_path):
+    path = str(tmp_path / 'graph.bin')
+    save_graph(visibility_graph(random_scene(random.Random(0), 0, 10)), path)
+    assert len(load_graph(path, verify=True).edges) == 0
+
+
+def test_corrupted(tmp_path):
+    path = str(tmp_path / 'graph.bin')
+    save_graph(visibility_graph(random_scene(random.Random(1), 10, 10)), path)
+    with open(path, 'r+b') as file:
+        file.seek(-1, 2)
+        last = file.read(1)
+        file.seek(-1, 2)
+        file.write(bytes([last[0] ^ 0xff]))
+
+    # checksum is verified only on request
+    load_graph(path)
+    with pytest.raises(ValueError, match='Checksum'):
+        load_graph(path, verify=True)
+
+
+def test_wrong_kind(tmp_path):
+    path = str(tmp_path / 'scene.bin')
+    save_collection(random_scene(random.Random(2), 10, 10), path)
+    with pytest.raises(ValueError, match='Unexpected content'):
+        load_graph(path)
+
+
+def test_truncated(tmp_path):
+    path = str(tmp_path / 'scene.bin')
+    save_collection(random_scene(random.Random(3), 10, 10), path)
+    with open(path, 'r+b') as file:
+        file.truncate(HEADER.size - 1)
+    with pytest.raises(ValueError, match='too short'):
+        load_collection(path)
+
+
+def rewrite_header(path: str, **fields):
+    """ Changes given fields of header of file, keeping its checksum. """
+    with open(path, 'r+b') as file:
+        values = dict(zip(('magic', 'version', 'kind', 'count', 'checksum'), HEADER.unpack(file.read(HEADER.size))))
+        values.update(fields)
+        file.seek(0)
+        file.write(HEADER.pack(*values.values()))
+
+
+@pytest.mark.parametrize('count', [0, 3, 5, 2 ** 32 - 1])
+def test_wrong_count(tmp_path, count):
+    path = str(tmp_path / 'graph.bin')
+    save_graph(visibility_graph(random_scene(random.Random(4), 10, 10)), path)
+    rewrite_header(path, count=count)
+
+    # header is covered by checksum
+    with pytest.raises(ValueError, match='Checksum'):
+        load_graph(path, verify=True)
+    with pytest.raises(ValueError):
+        load_graph(path)
+
+
+def test_invalid_table(tmp_path):
+    path = str(tmp_path / 'scene.bin')
+    save_collection(random_scene(random.Random(5), 10, 10), path)
+    with open(path, 'r+b') as file:
+        file.seek(HEADER.size + SECTION.size)
+        file.write(b'bogus\0\0\0')
+    with pytest.raises(ValueError, match='Unexpected section'):
+        load_collection(path)
+
+    with open(path, 'r+b') as file:
+        file.seek(HEADER.size + SECTION.size)
+        file.write(b'\xff' * 8)
+    with pytest.raises(ValueError):
+        load_collection(path)
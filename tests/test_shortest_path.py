@@ -0,0 +1,56 @@
+""" Shortest paths found by PathFinder compared with Dijkstra's algorithm on visibility graph. """
+import math
+import random
+
+import pytest
+
+from algorithms import PathFinder, visibility_graph_brute, visibility_graph_compact
+from algorithms.oracle import random_scene
+from benchmarks.scenes import SCENES
+from geometry import Point, Polygon, Collection
+from tests.paths import length, check, queries, shortest_length
+
+
+@pytest.mark.parametrize('engine', ['brute', 'sweep'])
+@pytest.mark.parametrize('grid', [10, None])
+@pytest.mark.parametrize('seed', range(10))
+def test_random_scene(seed, grid, engine):
+    rng = random.Random(seed)
+    collection = random_scene(rng, 10, grid)
+    finder = PathFinder(visibility_graph_brute(collection), collection, engine=engine)
+    for start, goal in queries(collection, rng, 10, grid or 100):
+        path = finder.path(start, goal)
+        check(finder, path, start, goal)
+        expected = shortest_length(collection, start, goal)
+        assert (path is None) == (expected == math.inf)
+        if path is not None:
+            assert length(path) == pytest.approx(expected)
+
+
+def test_compact_graph():
+    collection = SCENES['convex'](9)
+    rng = random.Random(0)
+    full = PathFinder(visibility_graph_brute(collection), collection)
+    compact = PathFinder(visibility_graph_compact(collection), collection)
+    for start, goal in queries(collection, rng, 10, 100):
+        assert compact.path(start, goal) == full.path(start, goal)
+
+
+def test_unreachable():
+    # goal inside of polygon
+    collection = Collection(polygons={Polygon(Point(0, 0), Point(2, 0), Point(2, 2), Point(0, 2))})
+    finder = PathFinder(visibility_graph_brute(collection), collection)
+    assert finder.path(Point(5, 5), Point(1, 1)) is None
+    assert finder.path(Point(1, 1), Point(1.5, 0.5)) == [Point(1, 1), Point(1.5, 0.5)]
+
+
+def test_same_start_and_goal():
+    collection = SCENES['maze'](16)
+    point = Point(1.0, 1.0)
+    assert PathFinder(visibility_graph_brute(collection), collection).path(point, point) == [point]
+
+
+def test_unknown_engine():
+    collection = random_scene(random.Random(0), 10, 10)
+    with pytest.raises(ValueError):
+        PathFinder(visibility_graph_brute(collection), collection, engine='other')
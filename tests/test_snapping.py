@@ -0,0 +1,108 @@
+""" Spatial hash of points of elements compared with search of all points. """
+import random
+
+import pytest
+
+from algorithms.oracle import random_scene
+from geometry import SnapIndex, Point, Segment, Polygon, Collection, dist
+from geometry.snapping import SNAP_RADIUS, SNAP_CELL_SIZE, points_of
+
+SQUARE = Polygon(Point(0, 0), Point(10, 0), Point(10, 10), Point(0, 10))
+
+
+def nearest(collection: Collection, p: Point, radius: float, kind=None):
+    """ Returns the nearest point (and its distance) closer than radius, found among all points of elements. """
+    elements = [e for e in (*collection.points, *collection.segments, *collection.polygons)
+                if kind is None or isinstance(e, kind)]
+    candidates = [(dist(p, p2), p2) for e in elements for p2 in points_of(e) if dist(p, p2) < radius]
+    return min(candidates, default=None)
+
+
+def test_cell_size():
+    # queries with snapping radius check 3x3 cells
+    assert SNAP_CELL_SIZE == SNAP_RADIUS
+    assert SnapIndex().cell_size == SNAP_RADIUS
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_random_queries(seed):
+    rng = random.Random(seed)
+    collection = random_scene(rng, 10, 10)
+    for _ in range(100):
+        p = Point(rng.uniform(-10, 110), rng.uniform(-10, 110))
+        radius = rng.choice([1.0, 5.0, SNAP_RADIUS, 50.0])
+        for kind in (None, Point, Segment, Polygon):
+            found = collection.snapping.nearest(p, radius, kind)
+            expected = nearest(collection, p, radius, kind)
+            if expected is None:
+                assert found is None
+                continue
+            point, element = found
+            assert (dist(p, point), point) == expected
+            assert point in points_of(element) and (kind is None or isinstance(element, kind))
+
+
+def test_kind():
+    index = SnapIndex.build([Point(1, 0), Segment(Point(2, 0), Point(5, 5)), SQUARE])
+    p = Point(0, 0)
+    assert index.nearest(p, 3) == (Point(0, 0), SQUARE)
+    assert index.nearest(p, 3, Point) == (Point(1, 0), Point(1, 0))
+    assert index.nearest(p, 3, Segment) == (Point(2, 0), Segment(Point(2, 0), Point(5, 5)))
+    assert index.nearest(p, 2, Segment) is None
+
+
+def test_ties():
+    # points at the same distance give the smallest one, whatever the order of elements
+    points = [Point(1, 0), Point(-1, 0), Point(0, 1), Point(0, -1)]
+    for order in (points, points[::-1]):
+        assert SnapIndex.build(order).nearest(Point(0, 0), 2) == (Point(-1, 0), Point(-1, 0))
+
+    # elements sharing point give the one added first (of given kind)
+    segment = Segment(Point(0, 0), Point(5, 5))
+    assert SnapIndex.build([segment, SQUARE]).nearest(Point(1, 1), 2) == (Point(0, 0), segment)
+    assert SnapIndex.build([SQUARE, segment]).nearest(Point(1, 1), 2) == (Point(0, 0), SQUARE)
+    assert SnapIndex.build([segment, SQUARE]).nearest(Point(1, 1), 2, Polygon) == (Point(0, 0), SQUARE)
+
+    # points exactly at radius are not found
+    assert SnapIndex.build(points).nearest(Point(0, 0), 1) is None
+
+
+def test_removals():
+    segment, point = Segment(Point(0, 0), Point(5, 5)), Point(0, 0)
+    collection = Collection(points={point}, segments={segment}, polygons={SQUARE})
+    collection.snapping
+    collection.remove(point)
+    assert collection.snapping.nearest(Point(1, 1), 2, Point) is None
+    assert collection.snapping.nearest(Point(1, 1), 2)[0] == Point(0, 0)
+    collection.remove(SQUARE)
+    assert collection.snapping.nearest(Point(1, 1), 2) == (Point(0, 0), segment)
+    collection.remove(segment)
+    assert collection.snapping.nearest(Point(1, 1), 2) is None
+    assert not collection.snapping.cells
+
+    # zero-length segment counts its point twice
+    index = SnapIndex.build([Segment(point, point), point])
+    index.remove(point)
+    assert index.nearest(Point(1, 1), 2) == (point, Segment(point, point))
+    index.remove(Segment(point, point))
+    assert index.nearest(Point(1, 1), 2) is None and not index.cells
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_random_edits(seed):
+    rng = random.Random(seed)
+    collection = random_scene(rng, 8, 4)
+    other = random_scene(random.Random(seed + 1000), 8, 4)
+    added = list(other.points) + list(other.segments) + list(other.polygons)
+    collection.snapping
+    for _ in range(12):
+        elements = list(collection.points) + list(collection.segments) + list(collection.polygons)
+        if elements and (rng.random() < 0.5 or not added):
+            collection.remove(rng.choice(elements))
+        elif added:
+            collection.add(added.pop(rng.randrange(len(added))))
+        for _ in range(20):
+            p = Point(rng.uniform(0, 100), rng.uniform(0, 100))
+            found = collection.snapping.nearest(p, SNAP_RADIUS)
+            expected = nearest(collection, p, SNAP_RADIUS)
+            assert (found and (dist(p, found[0]), found[0])) == expected
@@ -0,0 +1,86 @@
+""" Streaming construction of visibility graphs and files of edges. """
+import random
+
+import numpy as np
+import pytest
+
+from algorithms import visibility_graph, visibility_edges, consume, EdgeWriter, read_edges, visibility_graph_compact
+from algorithms.oracle import random_scene
+from algorithms.stats import Stats
+from geometry import CompactGraph
+
+
+@pytest.mark.parametrize('engine', ['brute', 'sweep'])
+@pytest.mark.parametrize('seed', range(15))
+def test_round_trip(tmp_path, seed, engine):
+    collection = random_scene(random.Random(seed), 10, 10 if seed % 2 else None)
+    path = str(tmp_path / 'edges.bin')
+    with open(path, 'wb') as file, EdgeWriter(file, chunk=7) as writer:
+        count = consume(visibility_edges(collection, engine=engine), writer)
+    edges = read_edges(path)
+    assert len(edges) == count
+    graph = CompactGraph.from_edges(collection.arrays.points, edges).to_collection()
+    assert graph.segments == visibility_graph(collection).segments
+
+
+@pytest.mark.parametrize('engine', ['brute', 'sweep'])
+def test_reduced(engine):
+    collection = random_scene(random.Random(4), 10, None)
+    edges = np.concatenate(list(visibility_edges(collection, reduced=True, engine=engine)))
+    graph = CompactGraph.from_edges(collection.arrays.points, edges).to_collection()
+    assert graph.segments == visibility_graph(collection, reduced=True).segments
+
+
+def test_consumers():
+    collection = random_scene(random.Random(5), 10, 10)
+    batches, sizes = [], []
+    count = consume(visibility_edges(collection), batches.append, lambda edges: sizes.append(len(edges)))
+    assert sum(sizes) == count == sum(len(edges) for edges in batches)
+
+
+def test_empty(tmp_path):
+    path = str(tmp_path / 'edges.bin')
+    with open(path, 'wb') as file, EdgeWriter(file) as writer:
+        assert consume(visibility_edges(random_scene(random.Random(0), 0, 10)), writer) == 0
+    assert read_edges(path).shape == (0, 2)
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        next(visibility_edges(random_scene(random.Random(0), 10, 10), engine='other'))
+
+
+@pytest.mark.parametrize('engine', ['brute', 'sweep'])
+def test_compact(engine):
+    collection = random_scene(random.Random(6), 10, 10)
+    graph = visibility_graph_compact(collection, engine=engine)
+    assert graph.to_collection().segments == visibility_graph(collection).segments
+
+
+@pytest.mark.parametrize('engine', ['brute', 'sweep'])
+def test_stats(engine):
+    stats = Stats()
+    consume(visibility_edges(random_scene(random.Random(7), 10, 10), engine=engine, stats=stats))
+    assert stats.counters['intersection tests'] > 0
+    assert 'preprocess' in stats.times
+
+
+@pytest.mark.parametrize('engine', ['brute', 'sweep'])
+def test_on_demand(engine):
+    # batches are computed only when they are requested
+    collection = random_scene(random.Random(8), 10, 10)
+    first, total = Stats(), Stats()
+    next(visibility_edges(collection, engine=engine, stats=first))
+    consume(visibility_edges(collection, engine=engine, stats=total))
+    assert 0 < first.counters['intersection tests'] < total.counters['intersection tests']
+
+
+def test_chunks(tmp_path):
+    collection = random_scene(random.Random(9), 10, 10)
+    path = str(tmp_path / 'edges.bin')
+    pending = []
+    with open(path, 'wb') as file, EdgeWriter(file, chunk=5) as writer:
+        count = consume(visibility_edges(collection), writer, lambda edges: pending.append(writer.pending_count))
+    # fewer edges than chunk are kept in memory, others are written as they come
+    assert count > 5 and max(pending) < 5
+    assert np.array_equal(read_edges(path), np.concatenate(list(visibility_edges(collection))))
@@ -0,0 +1,82 @@
+""" Tiled visibility graphs and paths compared with full ones. """
+import random
+
+import pytest
+
+from algorithms import PathFinder, TiledPathFinder, visibility_graph_brute, visibility_graph_tiled
+from algorithms.tiled import Tiling, MAX_TILES_PER_AXIS, POINTS_PER_TILE
+from algorithms.visibility_graph import lies_inside
+from benchmarks.scenes import SCENES, EXTENT
+from geometry import Point, Collection
+from tests.paths import length, check, queries
+
+
+def edges(graph) -> set:
+    return {frozenset(seg) for seg in graph.to_collection().segments}
+
+
+@pytest.mark.parametrize('scene, size', [('convex', 9), ('maze', 36), ('segments', 40)])
+def test_graph(scene, size):
+    collection = SCENES[scene](size)
+    graph = visibility_graph_tiled(collection, EXTENT / 8, workers=1)
+    full = PathFinder(visibility_graph_brute(collection), collection)
+
+    # every point of scene is in graph and every edge is unobstructed
+    assert collection.all_points <= set(graph.points)
+    for p1, p2 in graph.to_collection().segments:
+        assert full.visible(p1, p2)
+
+    # graph does not depend on number of processes or engine
+    assert edges(visibility_graph_tiled(collection, EXTENT / 8, workers=2)) == edges(graph)
+    assert edges(visibility_graph_tiled(collection, EXTENT / 8, workers=1, engine='sweep')) == edges(graph)
+
+
+def test_portals():
+    collection = SCENES['maze'](36)
+    tiling = Tiling(collection)
+    portals = [p for side in tiling.portals.values() for p in side]
+    assert portals
+    for p in portals:
+        assert not any(p in seg or lies_inside(p, seg) for seg in collection.all_segments)
+
+
+@pytest.mark.parametrize('scene, size', [('convex', 16), ('nonconvex', 16), ('maze', 64), ('segments', 60)])
+def test_paths(scene, size):
+    rng = random.Random(size)
+    collection = SCENES[scene](size)
+    full = PathFinder(visibility_graph_brute(collection), collection)
+    tiled = TiledPathFinder(collection, EXTENT / 8, workers=1)
+    for start, goal in queries(collection, rng, 20, EXTENT):
+        expected = full.path(start, goal)
+        path = tiled.path(start, goal)
+        check(full, path, start, goal)
+        # tiled paths go through portals, so they are not shorter than shortest ones
+        assert (path is None) == (expected is None)
+        if path is not None:
+            assert length(path) >= length(expected) - 1e-9 * EXTENT
+
+
+def test_same_start_and_goal():
+    point = Point(1.0, 1.0)
+    assert TiledPathFinder(SCENES['maze'](16), workers=1).path(point, point) == [point]
+
+
+def test_tile_size():
+    collection = SCENES['points'](1000)
+    # default tiles have given number of points on average
+    tiling = Tiling(collection)
+    occupied = {tiling.tile(p) for p in collection.all_points}
+    assert POINTS_PER_TILE / 2 <= len(collection.all_points) / len(occupied) <= POINTS_PER_TILE * 2
+
+    # given size is kept, unless there would be too many tiles
+    assert Tiling(collection, EXTENT / 100).tile_size == EXTENT / 100
+    for size in (EXTENT / (MAX_TILES_PER_AXIS + 1), 0.0, -1.0):
+        with pytest.raises(ValueError):
+            Tiling(collection, size)
+
+
+def test_empty_scene():
+    tiling = Tiling(Collection())
+    assert not tiling.tiles and not tiling.portals
+    graph = visibility_graph_tiled(Collection(), workers=1)
+    assert not graph.points and not len(graph.edges)
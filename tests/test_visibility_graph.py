@@ -0,0 +1,53 @@
+""" Sweep visibility graph compared with brute force one. """
+import random
+
+import pytest
+
+from algorithms import visibility_graph, visibility_graph_brute
+from algorithms.oracle import random_scene
+from algorithms.visibility_graph import Obstacles
+from benchmarks.scenes import SCENES
+from geometry import Collection, Point, Segment, Polygon
+
+
+@pytest.mark.parametrize('grid', [10, 3, None])
+@pytest.mark.parametrize('seed', range(40))
+def test_random_scene(seed, grid):
+    collection = random_scene(random.Random(seed), 10, grid)
+    expected = visibility_graph_brute(collection)
+    actual = visibility_graph(collection)
+    assert actual.points == expected.points
+    assert actual.segments == expected.segments
+
+
+def rounded_scene(rng: random.Random) -> Collection:
+    """
+    Returns grid scene moved off the grid, so that its collinear points are collinear only up to rounding.
+    Scenes whose obstacles cross are drawn again, since the sweep splits them at rounded crossings
+    (see visible_vertices) and brute force does not.
+    """
+    def move(p: Point) -> Point:
+        return Point(p.x * 0.1 + 0.3, p.y * 0.1 + 0.3)
+
+    while True:
+        scene = random_scene(rng, 5, 8)
+        collection = Collection(
+            points={move(p) for p in scene.points},
+            segments={Segment(move(s.p1), move(s.p2)) for s in scene.segments},
+            polygons={Polygon(*map(move, poly.points)) for poly in scene.polygons},
+        )
+        if all(p in collection.all_points for seg in Obstacles.from_collection(collection).origins for p in seg):
+            return collection
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_rounded_coordinates(seed):
+    collection = rounded_scene(random.Random(seed))
+    assert visibility_graph(collection).segments == visibility_graph_brute(collection).segments
+
+
+@pytest.mark.parametrize('scene, size', [('points', 60), ('segments', 40), ('convex', 16), ('nonconvex', 9),
+                                         ('maze', 36)])
+def test_benchmark_scene(scene, size):
+    collection = SCENES[scene](size)
+    assert visibility_graph(collection).segments == visibility_graph_brute(collection).segments
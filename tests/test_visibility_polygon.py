@@ -0,0 +1,66 @@
+""" Visibility polygons compared with visibility of sampled points checked by brute force. """
+import random
+from typing import List
+
+import numpy as np
+import pytest
+
+from algorithms import visibility_polygon, visibility_polygons
+from algorithms.oracle import random_scene
+from geometry import Point, Polygon, Segment, Collection, batch
+
+
+def contains(polygon: Polygon, p: Point) -> bool:
+    """ Returns whether point lies inside of polygon (even-odd rule). """
+    inside = False
+    for a, b in polygon.segments:
+        if (a.y > p.y) != (b.y > p.y) and p.x < a.x + (p.y - a.y) * (b.x - a.x) / (b.y - a.y):
+            inside = not inside
+    return inside
+
+
+def visible(collection: Collection, point: Point, p: Point) -> bool:
+    """ Returns whether segment from point to p crosses no obstacle. """
+    segments = batch.segments_array(collection.all_segments)
+    mask, _, _ = batch.intersection(np.array([*point, *p], dtype=float), segments, 'segment', 'segment')
+    return not mask.any()
+
+
+def sample(rng: random.Random, points: List[Point]) -> Point:
+    """ Returns random point from bounding box of given points. """
+    return Point(rng.uniform(min(p.x for p in points), max(p.x for p in points)),
+                 rng.uniform(min(p.y for p in points), max(p.y for p in points)))
+
+
+@pytest.mark.parametrize('seed', range(100))
+def test_sampled_points(seed):
+    rng = random.Random(seed)
+    collection = random_scene(rng, 10, None)
+    point = Point(rng.uniform(0, 100), rng.uniform(0, 100))
+    polygon = visibility_polygon(collection, point)
+    assert polygon.area > 0
+    for _ in range(200):
+        p = sample(rng, list(collection.all_points) + [point])
+        assert contains(polygon, p) == visible(collection, point, p)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_many_points(seed):
+    rng = random.Random(seed)
+    collection = random_scene(rng, 10, None)
+    points = [Point(rng.uniform(0, 100), rng.uniform(0, 100)) for _ in range(5)]
+    for point, polygon in zip(points, visibility_polygons(collection, points)):
+        for _ in range(50):
+            p = sample(rng, list(collection.all_points) + points)
+            assert contains(polygon, p) == visible(collection, point, p)
+
+
+def test_empty_scene():
+    polygon = visibility_polygon(Collection(), Point(1, 2))
+    assert contains(polygon, Point(1.5, 2.5)) and polygon.area > 0
+
+
+def test_point_on_obstacle():
+    collection = Collection(segments={Segment(Point(0, 0), Point(2, 0))})
+    with pytest.raises(ValueError):
+        visibility_polygon(collection, Point(1, 0))